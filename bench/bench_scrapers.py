@@ -0,0 +1,180 @@
+# bench/bench_scrapers.py
+# Latency / throughput of query_tnedistrict_status and scrape_by_ration against the local
+# mock upstream (bench/mock_upstream.py), at several concurrency levels.
+#
+#   python bench/bench_scrapers.py                            eDistrict, HTTP fast path + browser
+#   python bench/bench_scrapers.py --engine browser --concurrency 1,4 --requests 40
+#   python bench/bench_scrapers.py --cmchis --concurrency 1,2  also the Selenium CMCHIS flow
+#   python bench/bench_scrapers.py --json out.json --baseline last.json --max-regression 0.2
+#                                                             fail when p95 grows more than 20%
+import argparse, asyncio, json, statistics, sys, tempfile, time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import mock_upstream  # noqa: E402
+
+# eDistrict variant -> status the scraper should report
+EXPECT = {"approved": "approved", "pending": "pending", "rejected": "rejected",
+          "no_record": "no_record", "captcha": "captcha_required"}
+
+
+def percentiles(samples):
+    if len(samples) < 2:
+        v = samples[0] if samples else 0.0
+        return {"p50": v, "p95": v, "p99": v}
+    q = statistics.quantiles(samples, n=100, method="inclusive")
+    return {"p50": q[49], "p95": q[94], "p99": q[98]}
+
+
+def report(name, concurrency, latencies, wall_s, statuses, wrong):
+    p = percentiles(latencies)
+    row = {"name": name, "concurrency": concurrency, "requests": len(latencies),
+           "throughput_rps": len(latencies) / wall_s if wall_s else 0.0,
+           **{k: round(v * 1000, 1) for k, v in p.items()}, "statuses": dict(statuses), "wrong": wrong}
+    print(f"{name:<10} c={concurrency:<3} n={len(latencies):<4} "
+          f"p50 {row['p50']:>8.1f} ms  p95 {row['p95']:>8.1f} ms  p99 {row['p99']:>8.1f} ms  "
+          f"{row['throughput_rps']:>6.2f} req/s  wrong={wrong}  {dict(statuses)}")
+    return row
+
+
+def app_numbers(n, run):
+    # distinct numbers so the single-flight never merges two requests; variants round-robin
+    digits = list(mock_upstream.EDISTRICT_VARIANTS)
+    return [f"TN-{digits[i % len(digits)]}{run:02d}{i:08d}" for i in range(n)]
+
+
+# ---------- eDistrict ----------
+
+async def run_edistrict(scraper, numbers, concurrency):
+    sem = asyncio.Semaphore(concurrency)
+    latencies, statuses, wrong = [], Counter(), 0
+
+    async def one(app_no):
+        nonlocal wrong
+        async with sem:
+            t0 = time.perf_counter()
+            res = await scraper.query_tnedistrict_status_async(app_no, refresh=True)
+            latencies.append(time.perf_counter() - t0)
+        statuses[res["status"]] += 1
+        if res["status"] != EXPECT[mock_upstream.edistrict_variant(app_no)]:
+            wrong += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(a) for a in numbers))
+    return latencies, time.perf_counter() - t0, statuses, wrong
+
+
+async def bench_edistrict(scraper, levels, requests, warmup):
+    rows = []
+    try:
+        await run_edistrict(scraper, app_numbers(warmup, 99), max(levels))  # browsers / pages / connections
+        for run, c in enumerate(levels):
+            lat, wall, statuses, wrong = await run_edistrict(scraper, app_numbers(requests, run), c)
+            rows.append(report("edistrict", c, lat, wall, statuses, wrong))
+    finally:
+        await scraper.close_scraper()
+    return rows
+
+
+# ---------- CMCHIS ----------
+
+def bench_cmchis(cm, levels, requests):
+    rows = []
+    out_dir = Path(tempfile.mkdtemp(prefix="bench_cmchis_"))
+    for run, c in enumerate(levels):
+        rations = [f"{(i % 3) + 1}{run:02d}{i:09d}" for i in range(requests)]
+        latencies, statuses = [], Counter()
+        wrong = 0
+
+        def one(ration):
+            t0 = time.perf_counter()
+            res = cm.scrape_by_ration(ration, str(out_dir / f"{ration}.pdf"), headless=True)
+            return ration, res, time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=c) as pool:
+            for ration, res, dt in pool.map(one, rations):
+                latencies.append(dt)
+                outcome = res.get("error") or ("generate" if res.get("has_generate") else
+                                               "card" if res.get("has_card") else "no_card")
+                statuses[outcome] += 1
+                if res.get("has_generate") != (mock_upstream.cmchis_variant(ration) == "card_generate"):
+                    wrong += 1
+        rows.append(report("cmchis", c, latencies, time.perf_counter() - t0, statuses, wrong))
+    return rows
+
+
+# ---------- main ----------
+
+def compare(rows, baseline_path, max_regression):
+    base = {(r["name"], r["concurrency"]): r for r in json.loads(Path(baseline_path).read_text())["rows"]}
+    failed = False
+    for r in rows:
+        b = base.get((r["name"], r["concurrency"]))
+        if not b or not b["p95"]:
+            continue
+        change = r["p95"] / b["p95"] - 1
+        flag = "  <-- REGRESSION" if change > max_regression else ""
+        print(f"{r['name']:<10} c={r['concurrency']:<3} p95 {b['p95']:.1f} -> {r['p95']:.1f} ms ({change:+.0%}){flag}")
+        failed |= bool(flag) or r["wrong"] > b.get("wrong", 0)
+    return failed
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Scraper benchmarks against a local mock upstream")
+    ap.add_argument("--concurrency", default="1,4,8", help="comma-separated concurrency levels")
+    ap.add_argument("--requests", type=int, default=50, help="requests per level")
+    ap.add_argument("--warmup", type=int, default=5)
+    ap.add_argument("--latency-ms", type=float, default=200.0, help="mock response latency")
+    ap.add_argument("--jitter-ms", type=float, default=50.0)
+    ap.add_argument("--fixtures", type=Path, default=mock_upstream.FIXTURES)
+    ap.add_argument("--engine", choices=("auto", "http", "browser"), default="auto",
+                    help="auto: HTTP fast path with browser fallback (production); browser: Playwright only")
+    ap.add_argument("--rate-limit", action="store_true", help="keep the production upstream rate limit")
+    ap.add_argument("--no-edistrict", action="store_true")
+    ap.add_argument("--cmchis", action="store_true", help="also run the Selenium CMCHIS flow (needs Chrome)")
+    ap.add_argument("--json", type=Path, help="write results here")
+    ap.add_argument("--baseline", type=Path, help="earlier --json output to compare against")
+    ap.add_argument("--max-regression", type=float, default=0.2, help="allowed p95 growth vs baseline")
+    args = ap.parse_args()
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+
+    server = mock_upstream.start(fixtures=args.fixtures, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms)
+    print(f"mock upstream at {server.base_url}, latency {args.latency_ms}±{args.jitter_ms} ms")
+
+    # point both scrapers at the mock before they are imported
+    mock_upstream.point_scrapers_at(server, http_fast_path=args.engine != "browser", rate_limit=args.rate_limit)
+
+    rows = []
+    if not args.no_edistrict:
+        from utils import scraper
+        if args.engine == "http":
+            scraper._lookup_browser = _http_only
+        rows += asyncio.run(bench_edistrict(scraper, levels, args.requests, args.warmup))
+    if args.cmchis:
+        sys.path.insert(0, str(ROOT / "handlers" / "cmcard"))
+        import scraper as cm
+        rows += bench_cmchis(cm, levels, args.requests)
+    server.shutdown()
+    print(f"mock hits: {dict(server.hits)}")
+
+    if args.json:
+        args.json.write_text(json.dumps({"args": {k: str(v) for k, v in vars(args).items()}, "rows": rows},
+                                        indent=2) + "\n")
+    if args.baseline and compare(rows, args.baseline, args.max_regression):
+        sys.exit(1)
+
+
+async def _http_only(app_no, headless, timeout_ms, out, keep_raw, **_):
+    # --engine http: report fast-path escalations instead of launching a browser
+    out["status"] = "error"
+    out["raw_text"] = f"escalated: {out['debug'].get('http', {}).get('reason', '')}"
+    return out
+
+
+if __name__ == "__main__":
+    main()
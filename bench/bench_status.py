@@ -0,0 +1,172 @@
+# bench/bench_status.py
+# Accuracy + throughput of utils/tnega_status.extract on a labelled corpus, next to the
+# old substring chain (scraper._classify + bot.parse_tnega_status) it replaced.
+#
+#   python bench/bench_status.py                      run the corpus
+#   python bench/bench_status.py --add page.html --expect pending [--field status_text="Pending at VAO"]
+#                                                     add a captured page (HTML or text) as a sample
+import argparse, json, sys, time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+from utils.tnega_status import extract  # noqa: E402
+from utils.http_engine import _parse  # noqa: E402
+
+CORPUS = Path(__file__).resolve().parent / "status_corpus"
+MANIFEST = CORPUS / "manifest.json"
+
+
+# ---------- the previous implementation, kept here as the baseline ----------
+
+def legacy_classify(body: str) -> str:
+    lower = (body or "").lower()
+    if "captcha" in lower or "enter captcha" in lower or "recaptcha" in lower:
+        return "captcha_required"
+    elif "approved" in lower and ("application" in lower or "certificate" in lower):
+        return "approved"
+    elif "rejected" in lower:
+        return "rejected"
+    elif "pending" in lower or "in progress" in lower:
+        return "pending"
+    elif "no record" in lower or "record not found" in lower:
+        return "no_record"
+    return "filled_but_unknown"
+
+
+def legacy_parse(raw_text: str):
+    lines = [ln.strip() for ln in raw_text.splitlines() if ln.strip()]
+    parsed = dict.fromkeys(["app_no", "applicant_name", "father_name", "gender", "request_for",
+                            "date_of_request", "status_text", "remarks"], "")
+    for ln in lines:
+        parts = [p.strip() for p in ln.split("\t") if p.strip()]
+        if not parts:
+            continue
+        if "Application Number" in ln and not parsed["app_no"]:
+            if len(parts) >= 2:
+                parsed["app_no"] = parts[1]
+        elif "Applicant Name" in ln and not parsed["applicant_name"]:
+            if len(parts) >= 4:
+                parsed["applicant_name"] = parts[1]
+                parsed["father_name"] = parts[3]
+        elif ln.startswith("Gender") and not parsed["gender"]:
+            if len(parts) >= 2:
+                parsed["gender"] = parts[1]
+        elif "Request For" in ln and not parsed["request_for"]:
+            if len(parts) >= 2:
+                parsed["request_for"] = parts[1]
+            if "Date of Request" in ln and len(parts) >= 4:
+                parsed["date_of_request"] = parts[3]
+        elif ln.startswith("Status") and not parsed["status_text"]:
+            if len(parts) >= 2:
+                parsed["status_text"] = parts[1]
+        elif ln.startswith("Remarks") and not parsed["remarks"]:
+            if len(parts) >= 2:
+                parsed["remarks"] = parts[1]
+    if not parsed["app_no"]:
+        for ln in lines:
+            for token in ln.split():
+                if token.startswith("TN-") and len(token) > 5:
+                    parsed["app_no"] = token.strip(".,")
+                    break
+            if parsed["app_no"]:
+                break
+    return parsed
+
+
+def legacy_extract(text: str):
+    return legacy_classify(text), legacy_parse(text)
+
+
+# ---------- corpus ----------
+
+def load_corpus():
+    entries = json.loads(MANIFEST.read_text(encoding="utf-8"))
+    for e in entries:
+        e["text"] = (CORPUS / e["file"]).read_text(encoding="utf-8")
+    return entries
+
+
+def add_sample(src: Path, expect: str, fields, source: str):
+    raw = src.read_text(encoding="utf-8", errors="replace")
+    text = _parse(raw).text() if src.suffix.lower() in (".html", ".htm", ".xhtml") else raw
+    name = f"samples/{src.stem}.txt"
+    (CORPUS / name).write_text(text + "\n", encoding="utf-8")
+    entries = json.loads(MANIFEST.read_text(encoding="utf-8")) if MANIFEST.exists() else []
+    entries = [e for e in entries if e["file"] != name]
+    entry = {"file": name, "source": source or str(src), "expect": {"status": expect}}
+    if fields:
+        entry["expect"]["fields"] = dict(f.split("=", 1) for f in fields)
+    entries.append(entry)
+    MANIFEST.write_text(json.dumps(entries, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    status, _ = extract(text)
+    print(f"added {name}: expect={expect} extract={status}{'' if status == expect else '  <-- MISMATCH'}")
+
+
+# ---------- run ----------
+
+def score(fn, entries):
+    status_ok = field_ok = field_total = 0
+    misses = []
+    for e in entries:
+        status, fields = fn(e["text"])
+        exp = e["expect"]
+        if status == exp["status"]:
+            status_ok += 1
+        else:
+            misses.append(f"{e['file']}: status {status!r} != {exp['status']!r}")
+        for k, v in exp.get("fields", {}).items():
+            field_total += 1
+            if fields.get(k, "") == v:
+                field_ok += 1
+            else:
+                misses.append(f"{e['file']}: {k} {fields.get(k, '')!r} != {v!r}")
+    return status_ok, field_ok, field_total, misses
+
+
+def throughput(fn, entries, seconds: float):
+    n = 0
+    size = sum(len(e["text"]) for e in entries)
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < seconds:
+        for e in entries:
+            fn(e["text"])
+        n += 1
+    dt = time.perf_counter() - t0
+    return n * len(entries) / dt, n * size / dt / 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Status extractor accuracy and throughput")
+    ap.add_argument("--add", type=Path, help="captured page (HTML or text) to add to the corpus")
+    ap.add_argument("--expect", help="expected status for --add")
+    ap.add_argument("--field", action="append", default=[], help="expected field for --add, name=value")
+    ap.add_argument("--source", default="", help="where the --add page came from")
+    ap.add_argument("--seconds", type=float, default=2.0, help="time per throughput run")
+    args = ap.parse_args()
+
+    if args.add:
+        if not args.expect:
+            ap.error("--add needs --expect")
+        add_sample(args.add, args.expect, args.field, args.source)
+        return
+
+    entries = load_corpus()
+    print(f"corpus: {len(entries)} samples, {sum(len(e['text']) for e in entries)} chars")
+    failed = False
+    for name, fn in (("tnega_status.extract", extract), ("legacy chain", legacy_extract)):
+        s_ok, f_ok, f_total, misses = score(fn, entries)
+        docs, mb = throughput(fn, entries, args.seconds)
+        print(f"\n{name}")
+        print(f"  status accuracy: {s_ok}/{len(entries)} ({s_ok / len(entries):.0%})")
+        print(f"  field accuracy:  {f_ok}/{f_total} ({f_ok / f_total:.0%})" if f_total else "  field accuracy:  n/a")
+        print(f"  throughput:      {docs:,.0f} docs/s ({mb:.1f} MB/s)")
+        for m in misses:
+            print(f"    miss: {m}")
+        if fn is extract and misses:
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
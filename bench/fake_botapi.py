@@ -0,0 +1,164 @@
+# bench/fake_botapi.py
+# Minimal local Telegram Bot API for load tests: serves getUpdates from a queue the test
+# fills, and records every outgoing call (sendMessage, sendDocument, editMessageText, ...)
+# with its arrival time instead of delivering it.
+import email, itertools, json, threading, time
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+BOT_USER = {"id": 1000001, "is_bot": True, "first_name": "LoadTestBot", "username": "load_test_bot",
+            "can_join_groups": False, "can_read_all_group_messages": False, "supports_inline_queries": False}
+# calls that answer with a Message; everything else answers `true`
+_MESSAGE_METHODS = {"sendMessage", "sendDocument", "sendPhoto", "editMessageText", "editMessageCaption",
+                    "editMessageReplyMarkup", "copyMessage", "forwardMessage"}
+
+
+class FakeBotAPI(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, addr=("127.0.0.1", 0)):
+        super().__init__(addr, _Handler)
+        self._updates = []
+        self._cond = threading.Condition()
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self._file_ids = itertools.count(1)
+        self.sent = defaultdict(list)   # chat_id -> [(monotonic time, method)]
+        self.calls = Counter()          # method -> count
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/bot"
+
+    # ---------- incoming (test -> bot) ----------
+
+    def push_message(self, chat_id: int, text: str) -> float:
+        """Queue a private text message from `chat_id`; returns the queue time."""
+        msg = {"message_id": next(self._message_ids), "date": int(time.time()),
+               "chat": {"id": chat_id, "type": "private", "first_name": f"user{chat_id}"},
+               "from": {"id": chat_id, "is_bot": False, "first_name": f"user{chat_id}"}, "text": text}
+        if text.startswith("/"):
+            msg["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        return self._push({"message": msg})
+
+    def push_callback(self, chat_id: int, data: str) -> float:
+        message = {"message_id": next(self._message_ids), "date": int(time.time()),
+                   "chat": {"id": chat_id, "type": "private"}, "from": BOT_USER, "text": "..."}
+        return self._push({"callback_query": {"id": str(next(self._update_ids)), "chat_instance": str(chat_id),
+                                              "from": {"id": chat_id, "is_bot": False, "first_name": "u"},
+                                              "message": message, "data": data}})
+
+    def _push(self, update: dict) -> float:
+        update["update_id"] = next(self._update_ids)
+        with self._cond:
+            self._updates.append(update)
+            self._cond.notify_all()
+        return time.monotonic()
+
+    def _take(self, offset: int, timeout: float, limit: int):
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._updates = [u for u in self._updates if u["update_id"] >= offset]
+            while not self._updates and time.monotonic() < deadline:
+                self._cond.wait(deadline - time.monotonic())
+            return self._updates[:limit]
+
+    # ---------- outgoing (bot -> test) ----------
+
+    def record(self, method: str, params: dict):
+        chat_id = params.get("chat_id")
+        self.calls[method] += 1
+        if chat_id is not None:
+            self.sent[int(chat_id)].append((time.monotonic(), method))
+
+    def message_for(self, method: str, params: dict) -> dict:
+        msg = {"message_id": next(self._message_ids), "date": int(time.time()),
+               "chat": {"id": int(params.get("chat_id") or 0), "type": "private"}, "from": BOT_USER}
+        if "text" in params:
+            msg["text"] = params["text"]
+        if method == "sendDocument":
+            sent = params.get("document")
+            if isinstance(sent, str):  # resent by file_id
+                msg["document"] = {"file_id": sent, "file_unique_id": "u" + sent}
+            else:
+                n = next(self._file_ids)
+                msg["document"] = {"file_id": f"fake-doc-{n}", "file_unique_id": f"fake-udoc-{n}",
+                                   "file_name": (sent or {}).get("filename", "file")}
+        elif method == "sendPhoto":
+            n = next(self._file_ids)
+            msg["photo"] = [{"file_id": f"fake-photo-{n}", "file_unique_id": f"fake-uphoto-{n}",
+                             "width": 1, "height": 1}]
+        return msg
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: FakeBotAPI
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, result, status=200):
+        body = json.dumps({"ok": True, "result": result}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _params(self) -> dict:
+        ctype = self.headers.get("Content-Type", "")
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if ctype.startswith("application/json"):
+            return json.loads(body or b"{}")
+        if ctype.startswith("multipart/form-data"):
+            msg = email.message_from_bytes(b"Content-Type: " + ctype.encode() + b"\r\n\r\n" + body)
+            params = {}
+            for part in msg.get_payload():
+                name = part.get_param("name", header="content-disposition")
+                payload = part.get_payload(decode=True) or b""
+                if part.get_filename():
+                    params[name] = {"filename": part.get_filename(), "size": len(payload)}
+                else:
+                    params[name] = payload.decode("utf-8", "replace")
+        else:
+            params = {k: v[0] for k, v in parse_qs(body.decode("utf-8", "replace")).items()}
+        # PTB sends non-file parameters JSON-encoded
+        for k, v in params.items():
+            if isinstance(v, str):
+                try:
+                    params[k] = json.loads(v)
+                except ValueError:
+                    pass
+        return params
+
+    def do_GET(self):
+        # file downloads (base_file_url points here too)
+        data = b"%PDF-1.4\n% fake file from fake_botapi\n"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        method = self.path.rstrip("/").rsplit("/", 1)[-1]
+        params = self._params()
+        if method == "getMe":
+            return self._reply(BOT_USER)
+        if method == "getUpdates":
+            return self._reply(self.server._take(int(params.get("offset") or 0),
+                                                 float(params.get("timeout") or 0), int(params.get("limit") or 100)))
+        if method == "getFile":
+            return self._reply({"file_id": params.get("file_id"), "file_unique_id": "u", "file_size": 40,
+                                "file_path": "documents/file.pdf"})
+        self.server.record(method, params)
+        if method in _MESSAGE_METHODS:
+            return self._reply(self.server.message_for(method, params))
+        self._reply(True)
+
+
+def start(host: str = "127.0.0.1", port: int = 0) -> FakeBotAPI:
+    server = FakeBotAPI((host, port))
+    threading.Thread(target=server.serve_forever, name="fake-botapi", daemon=True).start()
+    return server
@@ -0,0 +1,185 @@
+# bench/load_bot.py
+# End-to-end load test of bot.py / cmchis_bot.py: the real Application (all handlers, real
+# concurrency settings) talks to a local fake Bot API (bench/fake_botapi.py) that feeds
+# /check or ration-number messages from many simulated chats and timestamps every reply.
+#
+#   python bench/load_bot.py --chats 200 --rate 20                  bot.py, stub scraper (1 s)
+#   python bench/load_bot.py --bot cmchis --chats 50 --stub-ms 3000  CMCHIS bot
+#   python bench/load_bot.py --backend mock --latency-ms 300         real scraper vs mock upstream
+#
+# Per chat: "first" is the time from the message to the bot's first reply (the "checking..."
+# ack), "final" to its last reply. Throughput is chats fully answered per second.
+import argparse, asyncio, json, logging, os, random, sys, tempfile, time
+from collections import Counter
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import fake_botapi, mock_upstream  # noqa: E402
+from bench_scrapers import percentiles  # noqa: E402
+
+TOKEN = "123456:LOADTEST"
+# config entries naming state files / directories, redirected to the scratch directory
+STATE_PATHS = {"JOBS_DB": "jobs.sqlite3", "DELIVERY_DB": "file_ids.sqlite3", "CERT_ARCHIVE_DB": "certificates.sqlite3",
+               "SESSION_DB": "sessions.sqlite3", "WATCH_DB": "watches.sqlite3",
+               "RESULT_CACHE_FILE": "result_cache.sqlite3", "SCRAPER_STRATEGY_CACHE": "strategy_cache.sqlite3",
+               "SCRAPER_ARTIFACT_DIR": "screenshots", "DOWNLOAD_DIR": "downloads"}
+FIRST_CHAT = 700000000
+
+
+# ---------- scraper stubs ----------
+
+def _stub_sleep(args):
+    return max(0.0, args.stub_ms + random.uniform(-args.stub_jitter_ms, args.stub_jitter_ms)) / 1000
+
+
+def stub_edistrict(args):
+    statuses = {"captcha": "captcha_required"}
+
+    async def query_tnedistrict_status_async(app_no, refresh=False, **_):
+        await asyncio.sleep(_stub_sleep(args))
+        status = mock_upstream.edistrict_variant(app_no)
+        status = statuses.get(status, status)
+        data = {"app_no": app_no, "applicant_name": "LOAD TEST", "request_for": "Community Certificate",
+                "status_text": status.title()}
+        return {"status": status, "data": data, "raw_text": "", "debug": {"stub": True}}
+    return query_tnedistrict_status_async
+
+
+def stub_cmchis(args):
+    async def scrape_by_ration_async(ration, pdf_path, headless=True, **_):
+        await asyncio.sleep(_stub_sleep(args))
+        variant = mock_upstream.cmchis_variant(ration)
+        if variant == "no_card":
+            return {"error": "NO_CARD", "has_card": False, "has_generate": False, "fields": {}}
+        fields = {"Card Holder Name": "LOAD TEST", "Card Holder URN Number": "URN" + ration[-6:]}
+        return {"error": None, "has_card": True, "has_generate": variant == "card_generate",
+                "fields": fields, "pdf": None, "preview_img": None}
+    return scrape_by_ration_async
+
+
+def load_bot_module(args):
+    """Import the bot (after the mock / stub is in place) and return (module, message_for_chat)."""
+    if args.bot == "tnega":
+        import bot
+        bot.TASK_FILE = Path.cwd() / "tasks.json"  # never import (and rename) the real one
+        if args.backend == "stub":
+            bot.query_tnedistrict_status_async = stub_edistrict(args)
+        digits = list(mock_upstream.EDISTRICT_VARIANTS)
+        return bot, lambda i: f"/check TN-{digits[i % len(digits)]}{os.getpid() % 100:02d}{i:08d}"
+    sys.path.insert(0, str(ROOT / "handlers" / "cmcard"))
+    import cmchis_bot
+    if args.backend == "stub":
+        cmchis_bot.scrape_by_ration_async = stub_cmchis(args)
+    return cmchis_bot, lambda i: f"{(i % 3) + 1}{i:011d}"
+
+
+# ---------- run ----------
+
+async def drive(app, api, message_for, args):
+    sent_at = {}
+    t0 = time.monotonic()
+    for i in range(args.chats):
+        if args.rate > 0:
+            await asyncio.sleep(max(0.0, t0 + i / args.rate - time.monotonic()))
+        chat_id = FIRST_CHAT + i
+        sent_at[chat_id] = api.push_message(chat_id, message_for(i))
+
+    # done once every chat has been answered and the bot has gone quiet for --settle-s
+    deadline = time.monotonic() + args.timeout
+    while time.monotonic() < deadline:
+        await asyncio.sleep(0.2)
+        last = max((r[-1][0] for r in api.sent.values() if r), default=0.0)
+        if len(api.sent) >= args.chats and time.monotonic() - last >= args.settle_s:
+            break
+    return sent_at, t0
+
+
+def summarize(api, sent_at, t0):
+    first, final = [], []
+    for chat_id, t in sent_at.items():
+        replies = api.sent.get(chat_id)
+        if replies:
+            first.append(replies[0][0] - t)
+            final.append(replies[-1][0] - t)
+    answered = len(final)
+    wall = (max(r[-1][0] for r in api.sent.values()) if api.sent else time.monotonic()) - t0
+    rows = []
+    for name, samples in (("first", first), ("final", final)):
+        p = percentiles(samples)
+        rows.append({"name": name, **{k: round(v * 1000, 1) for k, v in p.items()},
+                     "max": round(max(samples, default=0.0) * 1000, 1)})
+        print(f"{name:<6} reply  p50 {rows[-1]['p50']:>9.1f} ms  p95 {rows[-1]['p95']:>9.1f} ms  "
+              f"p99 {rows[-1]['p99']:>9.1f} ms  max {rows[-1]['max']:>9.1f} ms")
+    per_chat = Counter(len(api.sent.get(c, ())) for c in sent_at)
+    throughput = answered / wall if wall > 0 else 0.0
+    print(f"answered {answered}/{len(sent_at)} chats in {wall:.1f}s -> {throughput:.2f} chats/s; "
+          f"replies per chat {dict(sorted(per_chat.items()))}")
+    print(f"bot api calls: {dict(api.calls)}")
+    return {"chats": len(sent_at), "answered": answered, "wall_s": round(wall, 2),
+            "throughput_cps": round(throughput, 2), "latency": rows, "calls": dict(api.calls),
+            "replies_per_chat": {str(k): v for k, v in per_chat.items()}}
+
+
+async def run(module, message_for, args):
+    api = fake_botapi.start()
+    app = module.build_application(token=TOKEN, base_url=api.base_url)
+    async with app:
+        if app.post_init:
+            await app.post_init(app)
+        await app.updater.start_polling(poll_interval=0.0, timeout=1)
+        await app.start()
+        try:
+            sent_at, t0 = await drive(app, api, message_for, args)
+        finally:
+            await app.updater.stop()
+            await app.stop()
+            if app.post_shutdown:
+                await app.post_shutdown(app)
+    api.shutdown()
+    return summarize(api, sent_at, t0)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Load-test a bot end to end against a fake Bot API")
+    ap.add_argument("--bot", choices=("tnega", "cmchis"), default="tnega", help="bot.py or handlers/cmcard/cmchis_bot.py")
+    ap.add_argument("--chats", type=int, default=100, help="simulated users, one message each")
+    ap.add_argument("--rate", type=float, default=10.0, help="new chats per second (0: all at once)")
+    ap.add_argument("--backend", choices=("stub", "mock"), default="stub",
+                    help="stub: scraper replaced by a sleep; mock: real scraper vs bench/mock_upstream.py")
+    ap.add_argument("--stub-ms", type=float, default=1000.0, help="stub scraper latency")
+    ap.add_argument("--stub-jitter-ms", type=float, default=200.0)
+    ap.add_argument("--latency-ms", type=float, default=200.0, help="mock upstream latency")
+    ap.add_argument("--jitter-ms", type=float, default=50.0)
+    ap.add_argument("--rate-limit", action="store_true", help="keep the production upstream rate limit (mock)")
+    ap.add_argument("--settle-s", type=float, default=2.0, help="stop after this long without a reply")
+    ap.add_argument("--timeout", type=float, default=600.0)
+    ap.add_argument("--json", type=Path, help="write results here")
+    args = ap.parse_args()
+
+    if args.backend == "mock":
+        server = mock_upstream.start(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms)
+        mock_upstream.point_scrapers_at(server, rate_limit=args.rate_limit)
+        print(f"mock upstream at {server.base_url}, latency {args.latency_ms}±{args.jitter_ms} ms")
+    # every state file and directory (stores, downloads, scraper artifacts and bot.py's hourly
+    # prune of them) goes to a scratch directory instead of the repo root
+    workdir = tempfile.mkdtemp(prefix="load_bot_")
+    os.chdir(workdir)
+    import config
+    for name, default in STATE_PATHS.items():
+        if getattr(config, name, default):
+            setattr(config, name, str(Path(workdir) / default))
+    os.environ["SAVE_DIR"] = str(Path(workdir) / "cmchis_output")
+    module, message_for = load_bot_module(args)
+    logging.getLogger("httpx").setLevel(logging.WARNING)  # one line per Bot API call otherwise
+    print(f"{args.bot}: {args.chats} chats at {args.rate or 'all at once'}/s, backend {args.backend}, cwd {workdir}")
+
+    result = asyncio.run(run(module, message_for, args))
+    if args.json:
+        args.json.write_text(json.dumps({"args": {k: str(v) for k, v in vars(args).items()}, **result},
+                                        indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+# bench/mock_upstream.py
+# Local stand-in for tnedistrict VerifyCerti.xhtml and CMCHIS payermemberpolicyinfodetails.aspx,
+# served from HTML fixtures with configurable latency, for offline scraper benchmarks.
+#
+#   python bench/mock_upstream.py --port 8900 --latency-ms 300 --jitter-ms 100
+#
+# eDistrict variant by the first digit after "TN-": 1 approved, 2 pending, 3 rejected,
+# 4 no record, 5 captcha (anything else: pending). CMCHIS variant by the first digit of the
+# ration number: 1 card with "Generate e-card", 2 card without it, else no card.
+# --fixtures DIR swaps in captured pages with the same file names (see bench/fixtures/).
+import argparse, os, random, re, sys, threading, time, uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+VERIFY_PATH = "/tneda/VerifyCerti.xhtml"
+CMCHIS_PATH = "/payer/payermemberpolicyinfodetails.aspx"
+
+EDISTRICT_VARIANTS = {"1": "approved", "2": "pending", "3": "rejected", "4": "no_record", "5": "captcha"}
+CMCHIS_VARIANTS = {"1": "card_generate", "2": "card"}
+# one-pixel GIF for the search icon / captcha image, so pages do not 404 on images
+_GIF = bytes.fromhex("47494638396101000100800000000000ffffff21f90401000000002c00000000010001000002024401003b")
+
+
+def edistrict_variant(app_no: str) -> str:
+    m = re.match(r"TN-(\d)", app_no.strip().upper())
+    return EDISTRICT_VARIANTS.get(m.group(1), "pending") if m else "no_record"
+
+
+def cmchis_variant(ration: str) -> str:
+    return CMCHIS_VARIANTS.get(ration.strip()[:1], "no_card")
+
+
+class MockUpstream(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, addr, fixtures: Path = FIXTURES, latency_ms: float = 0.0, jitter_ms: float = 0.0):
+        super().__init__(addr, _Handler)
+        self.fixtures = Path(fixtures)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self._pages = {}
+        self.hits = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def page(self, site: str, name: str) -> str:
+        key = (site, name)
+        if key not in self._pages:
+            self._pages[key] = (self.fixtures / site / f"{name}.html").read_text(encoding="utf-8")
+        return self._pages[key]
+
+    def delay(self):
+        ms = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if ms > 0:
+            time.sleep(ms / 1000)
+
+    def count(self, what: str):
+        with self._lock:
+            self.hits[what] += 1
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: MockUpstream
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, body, ctype="text/html; charset=utf-8", status=200, cookie=False):
+        data = body.encode("utf-8") if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(data)))
+        if cookie:
+            self.send_header("Set-Cookie", f"JSESSIONID={uuid.uuid4().hex}; Path=/")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _form(self):
+        n = int(self.headers.get("Content-Length") or 0)
+        return {k: v[0] for k, v in parse_qs(self.rfile.read(n).decode("utf-8", "replace")).items()}
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path.endswith((".png", ".gif")):
+            return self._send(_GIF, "image/gif")
+        self.server.delay()
+        if path == VERIFY_PATH:
+            self.server.count("edistrict_get")
+            page = self.server.page("edistrict", "form").replace("%RESULT%", "")
+            return self._send(page.replace("%VIEWSTATE%", uuid.uuid4().hex), cookie=True)
+        if path == CMCHIS_PATH:
+            self.server.count("cmchis_get")
+            page = self.server.page("cmchis", "form").replace("%RESULT%", "").replace("%RATION%", "")
+            return self._send(page.replace("%VIEWSTATE%", uuid.uuid4().hex))
+        self._send("not found", "text/plain", 404)
+
+    def do_POST(self):
+        path = self.path.split("?")[0]
+        form = self._form()
+        self.server.delay()
+        if path == VERIFY_PATH:
+            app_no = form.get("form1:acknumber", "")
+            variant = edistrict_variant(app_no)
+            self.server.count(f"edistrict_{variant}")
+            fragment = self.server.page("edistrict", variant).replace("%APP_NO%", app_no)
+            if self.headers.get("Faces-Request") == "partial/ajax":
+                xml = ('<?xml version="1.0" encoding="UTF-8"?><partial-response><changes>'
+                       f'<update id="form1:resultPanel"><![CDATA[{fragment}]]></update>'
+                       f'<update id="j_id1:javax.faces.ViewState:0"><![CDATA[{uuid.uuid4().hex}]]></update>'
+                       '</changes></partial-response>')
+                return self._send(xml, "text/xml; charset=utf-8")
+            page = self.server.page("edistrict", "form").replace("%RESULT%", fragment)
+            return self._send(page.replace("%VIEWSTATE%", uuid.uuid4().hex))
+        if path == CMCHIS_PATH:
+            ration = form.get("txtSearchRationCArd", "")
+            variant = cmchis_variant(ration)
+            self.server.count(f"cmchis_{variant}")
+            page = self.server.page("cmchis", "form").replace("%RESULT%", self.server.page("cmchis", variant))
+            return self._send(page.replace("%RATION%", ration).replace("%VIEWSTATE%", uuid.uuid4().hex))
+        self._send("not found", "text/plain", 404)
+
+
+def start(port: int = 0, host: str = "127.0.0.1", **options) -> MockUpstream:
+    """Serve in a daemon thread; stop with server.shutdown()."""
+    server = MockUpstream((host, port), **options)
+    threading.Thread(target=server.serve_forever, name="mock-upstream", daemon=True).start()
+    return server
+
+
+def point_scrapers_at(server: MockUpstream, http_fast_path: bool = True, rate_limit: bool = False):
+    """Point both scrapers at `server`, with no result cache and no artifacts. Call before
+    utils.scraper / handlers/cmcard/scraper.py are imported: they read these at import."""
+    import config
+    config.VERIFY_URL = server.base_url + VERIFY_PATH
+    config.RESULT_CACHE_ENABLED = False
+    config.SCRAPER_ARTIFACTS = "off"
+    config.SCRAPER_HTTP_FAST_PATH = http_fast_path
+    if not rate_limit:
+        config.SCRAPER_RATE_LIMIT = {"rate": 10000, "burst": 10000}
+        os.environ["CMCHIS_RATE_PER_S"] = "10000"
+        os.environ["CMCHIS_RATE_BURST"] = "10000"
+    os.environ["CMCHIS_URL"] = server.base_url + CMCHIS_PATH
+    os.environ["CMCHIS_ARTIFACTS"] = "off"
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Mock eDistrict / CMCHIS server for scraper benchmarks")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8900)
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="added to every page response")
+    ap.add_argument("--jitter-ms", type=float, default=0.0, help="+/- uniform spread on the latency")
+    ap.add_argument("--fixtures", type=Path, default=FIXTURES)
+    args = ap.parse_args()
+    server = MockUpstream((args.host, args.port), fixtures=args.fixtures, latency_ms=args.latency_ms,
+                          jitter_ms=args.jitter_ms)
+    print(f"eDistrict: {server.base_url}{VERIFY_PATH}\nCMCHIS:    {server.base_url}{CMCHIS_PATH}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# bench/replay_har.py
+# Replay recorded scraper sessions (SCRAPER_HAR) offline and time them, to reproduce a
+# production failure or compare engine versions on identical input.
+#
+#   python bench/replay_har.py screenshots/blobs/ab/abcd....har.gz [--runs 5]
+#   python bench/replay_har.py --key TN-2120251031226     every session kept for that number
+import argparse, asyncio, json, statistics, sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+from utils import scraper  # noqa: E402
+
+
+async def replay(paths, runs, headless, app_no, verbose):
+    try:
+        for path in paths:
+            totals = []
+            for i in range(runs):
+                res = await scraper.replay_har(path, app_no=app_no, headless=headless)
+                total = res["debug"].get("timings", {}).get("total", 0.0)
+                totals.append(total)
+                print(f"{Path(path).name[:24]} run {i + 1}: {res['status']:<18} {total:>8.1f} ms  "
+                      f"{json.dumps(res['debug'].get('timings', {}))}")
+                if verbose:
+                    print(json.dumps({k: res[k] for k in ("data", "raw_text")}, ensure_ascii=False, indent=2))
+            if len(totals) > 1:
+                print(f"  median {statistics.median(totals):.1f} ms, min {min(totals):.1f}, max {max(totals):.1f}")
+    finally:
+        await scraper.close_scraper()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Replay recorded eDistrict sessions with the network cut off")
+    ap.add_argument("har", nargs="*", help=".har / .har.gz files")
+    ap.add_argument("--key", help="replay every HAR kept in the artifact store for this application number")
+    ap.add_argument("--app-no", default="", help="number to search (default: the one in the recording)")
+    ap.add_argument("--runs", type=int, default=1)
+    ap.add_argument("--headed", action="store_true")
+    ap.add_argument("-v", "--verbose", action="store_true", help="print parsed fields and raw text")
+    args = ap.parse_args()
+
+    paths = list(args.har)
+    if args.key:
+        paths += [a["path"] for a in scraper.find_artifacts(args.key) if a["kind"] == "har"]
+    if not paths:
+        ap.error("no HAR given (pass files or --key)")
+    asyncio.run(replay(paths, args.runs, not args.headed, args.app_no, args.verbose))
+
+
+if __name__ == "__main__":
+    main()
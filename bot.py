@@ -1,6 +1,5 @@
 import logging
 import os
-import json
 import time
 import asyncio
 from datetime import datetime
@@ -16,7 +15,27 @@ from telegram.ext import (
 )
 
 import config
-from utils.scraper import query_tnedistrict_status
+from utils.scraper import (
+    query_tnedistrict_status_async,
+    close_scraper,
+    invalidate_cached,
+    cache_stats,
+    flight_stats,
+    find_artifacts,
+    prune_artifacts,
+    artifact_stats,
+    expected_wait,
+    rate_stats,
+    upstream_health,
+)
+from utils.result_cache import cache_key
+from utils.watcher import FINAL_STATUSES, WatchScheduler
+from utils.jobs import JobStore, migrate_tasks_json
+from utils.dispatch import Dispatcher
+from utils.delivery import Delivery
+from utils.cert_archive import CertArchive
+from utils.sessions import SessionStore
+from utils import bulk
 
 # ---------- Logging ----------
 logging.basicConfig(
@@ -25,135 +44,69 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-TASK_FILE = "tasks.json"
-DOWNLOAD_DIR = getattr(config, "DOWNLOAD_DIR", "downloads")
-os.makedirs(DOWNLOAD_DIR, exist_ok=True)
-
+TASK_FILE = config.ROOT / "tasks.json"  # legacy job file, see on_startup
+DOWNLOAD_DIR = config.ROOT / getattr(config, "DOWNLOAD_DIR", "downloads")
+
+# State stores, opened by open_stores() (build_application calls it), so importing this
+# module creates no files:
+# documents go out by Telegram file_id; local files are uploaded once (utils/delivery.py)
+delivery = None
+# delivered certificates by application number, for instant repeat delivery (utils/cert_archive.py)
+cert_archive = None
+# per-user /check state (last app, parsed fields) shared by all webhook workers
+sessions = None
+
+
+# ---------- Jobs (utils/jobs.py) ----------
+
+# tasks.json is imported once at startup and renamed to tasks.json.imported
+job_store = None
+_bot = None  # set in on_startup; used by background tasks (job sweep, watcher)
+
+OFFER_NOTE = {
+    "expired": "⌛ முந்தைய operator lease முடிந்தது; இந்த JOB மீண்டும் queue ல.\n\n",
+    "rerouted": "↪️ இந்த JOB உங்களுக்கு மாற்றப்பட்டது.\n\n",
+    "queued": "⚠️ Online operator யாரும் இல்லை; JOB queue ல காத்திருக்கிறது.\n\n",
+}
+
+
+async def _offer_job(operator_id, job, reason):
+    """Send a job card with a take button to one operator."""
+    admin_text = (
+        OFFER_NOTE.get(reason, "")
+        + "🆕 புதிய JOB உருவாக்கப்பட்டது:\n\n"
+        f"🧾 Job ID: {job['job_id']}\n"
+        f"📄 Application: {job['app_no']}\n"
+        f"👤 Name: {job['name']}\n"
+        f"👨‍👧 Father: {job['father_name']}\n"
+        f"📑 Service: {job['service']}\n"
+        f"📅 Date: {job['date_of_request']}\n"
+        f"✅ Status: {job['status_text']}\n"
+        f"🗒️ Remarks: {job['remarks']}\n\n"
+        f"User Chat ID: {job['user_chat_id']}\n"
+        "👇 கீழே உள்ள button வழியாக job எடுத்துக் கொள்ளலாம்."
+    )
+    keyboard = [
+        [
+            InlineKeyboardButton(
+                "👨‍💻 இந்த JOB நான் எடுக்கிறேன்", callback_data=f"TAKE_JOB|{job['job_id']}"
+            )
+        ],
+        [
+            InlineKeyboardButton(
+                "🌐 TN eDistrict Open",
+                url="https://tnedistrict.tn.gov.in/tneda/VerifyCerti.xhtml",
+            )
+        ],
+    ]
+    await _bot.send_message(chat_id=operator_id, text=admin_text, reply_markup=InlineKeyboardMarkup(keyboard))
 
-# ---------- Helpers: tasks storage ----------
 
-def _load_tasks():
-    if not os.path.exists(TASK_FILE):
-        return {"jobs": []}
-    try:
-        with open(TASK_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        if "jobs" not in data:
-            data["jobs"] = []
-        return data
-    except Exception as e:
-        logger.error("Failed to load tasks.json: %s", e)
-        return {"jobs": []}
+dispatcher = None  # see open_stores()
 
 
-def _save_tasks(data):
-    try:
-        with open(TASK_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        logger.error("Failed to save tasks.json: %s", e)
-
-
-def _create_job(app_no, parsed, user_chat_id):
-    data = _load_tasks()
-    ts = int(time.time())
-    job_id = f"JOB-{ts}"
-    job = {
-        "job_id": job_id,
-        "app_no": app_no,
-        "name": parsed.get("applicant_name") or "",
-        "father_name": parsed.get("father_name") or "",
-        "service": parsed.get("request_for") or "",
-        "status_text": parsed.get("status_text") or "",
-        "remarks": parsed.get("remarks") or "",
-        "gender": parsed.get("gender") or "",
-        "date_of_request": parsed.get("date_of_request") or "",
-        "user_chat_id": user_chat_id,
-        "state": "pending_admin",  # pending_admin | in_progress | done
-        "created_at": ts,
-    }
-    data["jobs"].append(job)
-    _save_tasks(data)
-    return job
-
-
-def _find_job(job_id):
-    data = _load_tasks()
-    for j in data["jobs"]:
-        if j.get("job_id") == job_id:
-            return j, data
-    return None, data
-
-
-# ---------- Helpers: parse TN eDistrict text ----------
-
-def parse_tnega_status(raw_text: str):
-    """
-    Parse the status page text into structured fields.
-    Works on the text we saw for TN-2120251031226.
-    """
-    lines = [ln.strip() for ln in raw_text.splitlines() if ln.strip()]
-    parsed = {
-        "app_no": "",
-        "applicant_name": "",
-        "father_name": "",
-        "gender": "",
-        "request_for": "",
-        "date_of_request": "",
-        "status_text": "",
-        "remarks": "",
-    }
-
-    for ln in lines:
-        # Use \t splits when present
-        parts = [p.strip() for p in ln.split("\t") if p.strip()]
-        if not parts:
-            continue
-
-        if "Application Number" in ln and not parsed["app_no"]:
-            # e.g. ['Application Number', 'TN-2120251031226', 'Transaction Refernce No.', 'XXX']
-            if len(parts) >= 2:
-                parsed["app_no"] = parts[1]
-
-        elif "Applicant Name" in ln and not parsed["applicant_name"]:
-            # ['Applicant Name', 'Kokilavani V', 'Father/ Husband / Guardian / Mother Name', 'Venkatachalam']
-            if len(parts) >= 4:
-                parsed["applicant_name"] = parts[1]
-                parsed["father_name"] = parts[3]
-
-        elif ln.startswith("Gender") and not parsed["gender"]:
-            # ['Gender', 'Female']
-            if len(parts) >= 2:
-                parsed["gender"] = parts[1]
-
-        elif "Request For" in ln and not parsed["request_for"]:
-            # ['Request For', 'REV-120 Unmarried Certificate', 'Date of Request', '31-Oct-2025']
-            if len(parts) >= 2:
-                parsed["request_for"] = parts[1]
-            if "Date of Request" in ln and len(parts) >= 4:
-                parsed["date_of_request"] = parts[3]
-
-        elif ln.startswith("Status") and not parsed["status_text"]:
-            # ['Status', 'Application Approved']
-            if len(parts) >= 2:
-                parsed["status_text"] = parts[1]
-
-        elif ln.startswith("Remarks") and not parsed["remarks"]:
-            # ['Remarks', 'Tamil text ...']
-            if len(parts) >= 2:
-                parsed["remarks"] = parts[1]
-
-    # Fallback: if app_no still empty, try to guess from any TN- pattern
-    if not parsed["app_no"]:
-        for ln in lines:
-            for token in ln.split():
-                if token.startswith("TN-") and len(token) > 5:
-                    parsed["app_no"] = token.strip(".,")
-                    break
-            if parsed["app_no"]:
-                break
-
-    return parsed
+def _is_operator(user_id):
+    return user_id == config.ADMIN_CHAT_ID or dispatcher.is_operator(user_id)
 
 
 # ---------- Handlers ----------
@@ -178,15 +131,17 @@ async def cmd_check(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
 
-       app_no = parts[1].strip()
+    app_no = context.args[0].strip()
 
-    await update.message.reply_text(
-        f"🔍 {app_no} கான status check பண்ணுகிறேன்...\nசிறிது நேரம் காத்திருக்கவும்."
-    )
+    msg = f"🔍 {app_no} கான status check பண்ணுகிறேன்...\nசிறிது நேரம் காத்திருக்கவும்."
+    eta = expected_wait()
+    if eta["wait_s"] >= 5:
+        msg += f"\n⏳ வரிசையில் உங்கள் இடம்: {eta['position']} (சுமார் {eta['wait_s']:.0f} விநாடிகள்)"
+    await update.message.reply_text(msg)
 
     try:
-        # IMPORTANT: run sync scraper in thread, not directly
-        result = await asyncio.to_thread(query_tnedistrict_status, app_no)
+        # runs on this event loop; the scraper bounds its own concurrency
+        result = await query_tnedistrict_status_async(app_no)
     except Exception as e:
         logger.exception("Scraper crash for %s: %s", app_no, e)
         await update.message.reply_text(
@@ -195,11 +150,20 @@ async def cmd_check(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
 
-    logger.info("Scraper status for %s: %s", app_no, result.get("status"))
+    status = result.get("status")
+    logger.info("Scraper status for %s: %s", app_no, status)
+
+    if status == "unavailable":
+        minutes = max(1, round(result["debug"].get("retry_after_s", 60) / 60))
+        await update.message.reply_text(
+            "⚠️ அரசு eDistrict தளம் தற்போது இயங்கவில்லை.\n"
+            f"சுமார் {minutes} நிமிடங்களில் மீண்டும் முயற்சி செய்யுங்கள்."
+        )
+        return
 
     if status not in {"approved", "pending", "rejected", "no_record", "captcha_required"}:
         await update.message.reply_text(
-            "Unexpected result. Please try again later.\n\nDEBUG:\n" + raw[:1000]
+            "Unexpected result. Please try again later.\n\nDEBUG:\n" + (result.get("raw_text") or "")[:1000]
         )
         return
 
@@ -219,13 +183,12 @@ async def cmd_check(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
 
-    # approved / pending / rejected
-    parsed = parse_tnega_status(raw)
+    # approved / pending / rejected: fields come parsed from the scraper; keep only the filled ones
+    parsed = {k: v for k, v in (result.get("data") or {}).items() if v}
     parsed["status_flag"] = status
 
-    # Save to user_data for confirm step
-    context.user_data["last_app"] = app_no
-    context.user_data["last_parsed"] = parsed
+    # Save to the session for the confirm step (and /watch)
+    sessions.update(update.effective_user.id, last_app=app_no, last_parsed=parsed, last_result=None)
 
     # Tamil summary
     lines = []
@@ -269,8 +232,12 @@ async def cmd_check(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "உங்கள் விண்ணப்பம் தற்போது ஆய்வில் உள்ளது.\n"
             "சாதாரணமாக 2–3 நாட்களுக்குள் VAO / RI / Tahsildar அவர்கள்\n"
             "ஆவணங்களை சரிபார்த்து முடிவு எடுப்பார்கள்.\n"
-            "3 நாட்கள் ஆகியும் மாற்றமில்லையெனில் அருகிலுள்ள VAO அலுவலகத்தில் தொடர்பு கொள்ளவும்."
+            "3 நாட்கள் ஆகியும் மாற்றமில்லையெனில் அருகிலுள்ள VAO அலுவலகத்தில் தொடர்பு கொள்ளவும்.\n\n"
+            f"🔔 நிலை மாறும்போது தெரிவிக்க: /watch {app_no}"
         )
+        # /watch only needs the snapshot; debug (timings, reasons, HTML) is not persisted
+        sessions.update(update.effective_user.id,
+                        last_result={"status": status, "data": result.get("data") or {}})
         await update.message.reply_text(text)
     elif status == "rejected":
         text += (
@@ -282,6 +249,26 @@ async def cmd_check(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text(text)
 
 
+async def _send_archived(bot, chat_id, cert):
+    """Deliver an archived certificate by file_id, else from its local copy. False (and
+    the entry dropped) when neither works, so the normal job flow takes over."""
+    try:
+        await delivery.send_document(bot, chat_id, file_id=cert["file_id"])
+    except Exception as e:
+        logger.warning("Archived file_id for %s failed: %s", cert["app_no"], e)
+        if not cert["path"]:
+            cert_archive.forget(cert["app_no"])
+            return False
+        try:
+            await delivery.send_document(bot, chat_id, cert["path"])
+        except Exception as e:
+            logger.error("Archived copy of %s failed: %s", cert["app_no"], e)
+            cert_archive.forget(cert["app_no"])
+            return False
+    cert_archive.delivered(cert["app_no"])
+    return True
+
+
 async def on_confirm(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle user saying 'yes this is me' or 'not me'."""
     query = update.callback_query
@@ -301,8 +288,9 @@ async def on_confirm(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await query.edit_message_text("தவறான தேர்வு. மீண்டும் /check அனுப்பி முயற்சி பண்ணுங்க.")
         return
 
-    parsed = context.user_data.get("last_parsed")
-    app_no = context.user_data.get("last_app")
+    sess = sessions.get(query.from_user.id, {})
+    parsed = sess.get("last_parsed")
+    app_no = sess.get("last_app")
     if not parsed or not app_no:
         await query.edit_message_text(
             "Session காலாவதியானது.\nதயவு செய்து மீண்டும் `/check <AppNo>` அனுப்பி முயற்சி பண்ணுங்க.",
@@ -312,8 +300,17 @@ async def on_confirm(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     user_chat_id = query.from_user.id
 
+    # Certificate already fetched for this number (same user or family): send it now
+    cert = cert_archive.get(app_no)
+    if cert and await _send_archived(context.bot, user_chat_id, cert):
+        await query.edit_message_text(
+            "✅ இந்த விண்ணப்பத்தின் certificate ஏற்கனவே எங்களிடம் உள்ளது.\n"
+            "கீழே உள்ள PDF ஐ download செய்து பாதுகாப்பாக வைத்து கொள்ளவும்."
+        )
+        return
+
     # Create job immediately (Phase-1: payment bypass / manual)
-    job = _create_job(app_no, parsed, user_chat_id)
+    job = job_store.create(app_no, parsed, user_chat_id)
 
     # Message to user
     msg = (
@@ -328,52 +325,21 @@ async def on_confirm(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
     await query.edit_message_text(msg, parse_mode="Markdown")
 
-    # Notify admin
+    # Hand the job to the least-loaded online operator (utils/dispatch.py)
     try:
-        admin_text = (
-            "🆕 புதிய JOB உருவாக்கப்பட்டது:\n\n"
-            f"🧾 Job ID: {job['job_id']}\n"
-            f"📄 Application: {job['app_no']}\n"
-            f"👤 Name: {job['name']}\n"
-            f"👨‍👧 Father: {job['father_name']}\n"
-            f"📑 Service: {job['service']}\n"
-            f"📅 Date: {job['date_of_request']}\n"
-            f"✅ Status: {job['status_text']}\n"
-            f"🗒️ Remarks: {job['remarks']}\n\n"
-            f"User Chat ID: {job['user_chat_id']}\n"
-            "👇 கீழே உள்ள button வழியாக job எடுத்துக் கொள்ளலாம்."
-        )
-        keyboard = [
-            [
-                InlineKeyboardButton(
-                    "👨‍💻 இந்த JOB நான் எடுக்கிறேன்", callback_data=f"TAKE_JOB|{job['job_id']}"
-                )
-            ],
-            [
-                InlineKeyboardButton(
-                    "🌐 TN eDistrict Open",
-                    url="https://tnedistrict.tn.gov.in/tneda/VerifyCerti.xhtml",
-                )
-            ],
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-
-        await context.bot.send_message(
-            chat_id=config.ADMIN_CHAT_ID,
-            text=admin_text,
-            reply_markup=reply_markup,
-        )
+        if await dispatcher.route(job) is None:
+            await _offer_job(config.ADMIN_CHAT_ID, job, "queued")
     except Exception as e:
         logger.error("Failed to notify admin: %s", e)
 
 
 async def on_take_job(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Admin clicks 'take job' button."""
+    """Operator clicks 'take job' button: claims the job for JOB_LEASE_S."""
     query = update.callback_query
     await query.answer()
 
     user_id = query.from_user.id
-    if user_id != config.ADMIN_CHAT_ID:
+    if not _is_operator(user_id):
         await query.edit_message_text("இந்த செயல்பாடு admin க்கு மட்டும்.")
         return
 
@@ -384,15 +350,14 @@ async def on_take_job(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     job_id = parts[1]
 
-    job, all_data = _find_job(job_id)
+    job, reason = dispatcher.take(job_id, user_id)
+    if reason == "taken":
+        await query.edit_message_text(f"JOB {job_id} வேறு operator எடுத்துவிட்டார்.")
+        return
     if not job:
         await query.edit_message_text("இந்த JOB தற்போது இல்லை / முடிவடைந்துவிட்டது.")
         return
 
-    job["state"] = "in_progress"
-    job["taken_at"] = int(time.time())
-    _save_tasks(all_data)
-
     # Update admin message
     await query.edit_message_text(
         f"✅ Job {job_id} நீங்கள் எடுத்துக்கொண்டீர்கள்.\n"
@@ -402,7 +367,8 @@ async def on_take_job(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "- Captcha enter பண்ணி red SEARCH button\n"
         "- Download Certificate → PDF save பண்ணுங்க.\n\n"
         "பின்பு இந்த Telegram bot ல PDF ஐ upload பண்ணும்போது\n"
-        f"caption ல `{job_id}` மட்டும் எழுதுங்க.",
+        f"caption ல `{job_id}` மட்டும் எழுதுங்க.\n\n"
+        f"⏳ {config.JOB_LEASE_S // 60} நிமிடத்துக்குள் PDF வரவில்லையெனில் JOB மற்றொரு operator க்கு போகும்.",
         parse_mode="Markdown",
     )
 
@@ -421,14 +387,13 @@ async def on_take_job(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 async def cmd_jobs(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Admin: list pending/in_progress jobs."""
+    """Operators: list pending/in_progress jobs."""
     user_id = update.effective_user.id
-    if user_id != config.ADMIN_CHAT_ID:
+    if not _is_operator(user_id):
         await update.message.reply_text("இந்த கட்டளை admin க்கு மட்டும்.")
         return
 
-    data = _load_tasks()
-    jobs = [j for j in data["jobs"] if j.get("state") != "done"]
+    jobs = job_store.open_jobs()
 
     if not jobs:
         await update.message.reply_text("இப்போது pending / in-progress jobs எதுவும் இல்லை.")
@@ -437,21 +402,300 @@ async def cmd_jobs(update: Update, context: ContextTypes.DEFAULT_TYPE):
     lines = ["📋 Current Jobs:\n"]
     for j in jobs:
         created = datetime.fromtimestamp(j["created_at"]).strftime("%d-%m-%Y %H:%M")
+        owner = f" | 👨‍💻 {j['operator_id']}" if j.get("operator_id") else ""
+        lines.append(
+            f"{j['job_id']} | {j['app_no']} | {j['name']} | {j['state']} | {created}{owner}"
+        )
+
+    await update.message.reply_text("\n".join(lines))
+
+
+async def cmd_online(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Operators: /online and /offline toggle whether new jobs are routed to you."""
+    user_id = update.effective_user.id
+    if not dispatcher.is_operator(user_id):
+        await update.message.reply_text("இந்த கட்டளை operators க்கு மட்டும்.")
+        return
+
+    online = update.message.text.lstrip("/").lower().startswith("online")
+    dispatcher.set_online(user_id, online)
+    # jobs offered to you but not taken go to someone else now (or, coming online, to you)
+    rerouted = await dispatcher.sweep_once()
+    await update.message.reply_text(
+        ("🟢 Online: புதிய jobs உங்களுக்கு வரும்." if online else "⚪ Offline: புதிய jobs உங்களுக்கு வராது.")
+        + (f"\n{rerouted} waiting jobs மாற்றப்பட்டது." if rerouted else "")
+    )
+
+
+async def cmd_operators(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Admin: per-operator load and throughput."""
+    user_id = update.effective_user.id
+    if user_id != config.ADMIN_CHAT_ID:
+        await update.message.reply_text("இந்த கட்டளை admin க்கு மட்டும்.")
+        return
+
+    st = job_store.stats()
+    lines = [f"👥 Operators (lease {config.JOB_LEASE_S // 60} min)\n"]
+    for op in dispatcher.stats():
+        avg = f"{op['avg_handle_min']} min" if op["avg_handle_min"] is not None else "-"
         lines.append(
-            f"{j['job_id']} | {j['app_no']} | {j['name']} | {j['state']} | {created}"
+            f"{'🟢' if op['online'] else '⚪'} {op['operator_id']}: {op['open']} open, "
+            f"{op['done_recent']}/hour, {op['done_total']} total, avg {avg}, {op['expired']} expired"
         )
+    lines.append(f"\nQueue: {st['pending_admin']} waiting, {st['in_progress']} in progress, {st['done']} done")
+    await update.message.reply_text("\n".join(lines))
+
 
+async def cmd_refresh(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Admin: drop the cached /check result for one application and check it again."""
+    user_id = update.effective_user.id
+    if user_id != config.ADMIN_CHAT_ID:
+        await update.message.reply_text("இந்த கட்டளை admin க்கு மட்டும்.")
+        return
+
+    if not context.args:
+        st = cache_stats()
+        fl = flight_stats()
+        ws = watcher.stats()
+        rl = rate_stats()
+        dl = delivery.stats()
+        ca = cert_archive.stats()
+        await update.message.reply_text(
+            "Usage: /refresh TN-2120251031226\n\n"
+            f"Cache: {st.get('entries', 0)} entries, hit rate {st.get('hit_rate', 0):.0%} "
+            f"({st.get('hits', 0)} hits / {st.get('misses', 0)} misses)\n"
+            f"Coalesced: {fl['coalesced']} scrapes saved, {fl['in_flight']} in flight\n"
+            f"Watches: {ws['watches']} ({ws['numbers']} numbers, {ws['due']} due), "
+            f"budget {ws['budget_used_last_hour']}/{ws['budget_per_hour']} per hour, "
+            f"{ws['notifications']} notifications sent\n"
+            f"Upstream rate: {rl['rate']}/{rl['base_rate']} req/s, {rl['waiting']} waiting, "
+            f"{rl['penalties']} slowdowns\n"
+            f"Delivery: {dl['by_file_id'] + dl['cache_hits']} sent by file_id, {dl['uploads']} uploads, "
+            f"{dl['archiving']} archiving\n"
+            f"Certificates: {ca['certificates']} archived ({ca['local_files']} on disk), "
+            f"{ca['redeliveries']} instant re-deliveries"
+        )
+        return
+
+    app_no = context.args[0].strip()
+    dropped = invalidate_cached(app_no)
+    result = await query_tnedistrict_status_async(app_no, refresh=True)
+    await update.message.reply_text(
+        f"🔄 {app_no}: cache {'cleared' if dropped else 'was empty'}.\n"
+        f"Fresh status: {result.get('status')}"
+    )
+
+
+async def cmd_health(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Admin: upstream breaker state and request rate."""
+    user_id = update.effective_user.id
+    if user_id != config.ADMIN_CHAT_ID:
+        await update.message.reply_text("இந்த கட்டளை admin க்கு மட்டும்.")
+        return
+
+    lines = ["Upstream health:"]
+    for name, b in upstream_health().items():
+        line = f"{name}: {b['state']} ({b['failures']} failures in a row, opened {b['opened']}x)"
+        if b["state"] != "closed":
+            line += f", retry in ~{b['retry_after_s']}s, last error: {b['last_error']}"
+        lines.append(line)
+    rl = rate_stats()
+    lines.append(f"Rate: {rl['rate']}/{rl['base_rate']} req/s, {rl['waiting']} waiting, "
+                 f"expected wait {rl['expected_wait_s']}s")
     await update.message.reply_text("\n".join(lines))
 
 
+async def cmd_artifacts(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Admin: list the scraper screenshots kept for one application."""
+    user_id = update.effective_user.id
+    if user_id != config.ADMIN_CHAT_ID:
+        await update.message.reply_text("இந்த கட்டளை admin க்கு மட்டும்.")
+        return
+
+    if not context.args:
+        st = artifact_stats()["store"]
+        await update.message.reply_text(
+            "Usage: /artifacts TN-2120251031226\n\n"
+            f"Store: {st['artifacts']} artifacts, {st['files']} files, "
+            f"{st['bytes'] / 1048576:.1f} / {st['max_bytes'] / 1048576:.0f} MB"
+        )
+        return
+
+    app_no = context.args[0].strip()
+    rows = find_artifacts(app_no)
+    if not rows:
+        await update.message.reply_text(f"No artifacts kept for {app_no}.")
+        return
+    lines = [f"Artifacts for {app_no}:"]
+    for r in rows[:20]:
+        when = datetime.fromtimestamp(r["created"]).strftime("%d-%m-%Y %H:%M")
+        lines.append(f"{when} | {r['kind']} | {r['name']} | {r['path']}")
+    await update.message.reply_text("\n".join(lines))
+
+
+# ---------- /watch ----------
+
+STATUS_TA = {
+    "approved": "✅ Approved",
+    "pending": "⏳ Pending",
+    "rejected": "❌ Rejected",
+    "no_record": "⚠️ No record",
+}
+
+
+async def _watch_check(app_no):
+    return await query_tnedistrict_status_async(app_no)
+
+
+async def _watch_notify(chat_id, app_no, old, result):
+    data = result.get("data") or {}
+    status = result.get("status")
+    lines = [f"🔔 {app_no} நிலை மாறியுள்ளது:"]
+    if not old.get("status"):
+        lines.append(STATUS_TA.get(status, status))
+    elif status != old.get("status"):
+        lines.append(f"{STATUS_TA.get(old.get('status'), old.get('status'))} → {STATUS_TA.get(status, status)}")
+    if data.get("status_text"):
+        lines.append(f"✅ தற்போதைய நிலை: {data['status_text']}")
+    if data.get("remarks"):
+        lines.append(f"🗒️ Remarks: {data['remarks']}")
+    if status == "approved":
+        lines.append(f"\nCertificate பெற: /check {app_no}")
+    elif status == "pending":
+        lines.append(f"\nநிறுத்த: /unwatch {app_no}")
+    await _bot.send_message(chat_id=chat_id, text="\n".join(lines))
+
+
+def _watch_final_text(app_no, result):
+    data = result.get("data") or {}
+    status = result.get("status")
+    if status == "no_record":
+        return (f"⚠️ {app_no} க்கு எந்த பதிவும் இல்லை என்று அரசு தளம் சொல்கிறது.\n"
+                "எண் சரியா check பண்ணி மீண்டும் முயற்சி பண்ணுங்க.")
+    lines = [f"{app_no} ஏற்கனவே இறுதி நிலையில் உள்ளது, கவனிக்க தேவையில்லை:",
+             STATUS_TA.get(status, status)]
+    if data.get("status_text"):
+        lines.append(f"✅ தற்போதைய நிலை: {data['status_text']}")
+    if data.get("remarks"):
+        lines.append(f"🗒️ Remarks: {data['remarks']}")
+    if status == "approved":
+        lines.append(f"\nCertificate பெற: /check {app_no}")
+    return "\n".join(lines)
+
+
+watcher = None  # see open_stores()
+
+
+async def cmd_watch(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Subscribe to status changes of one application; no args lists the current watches."""
+    chat_id = update.effective_chat.id
+    if not context.args:
+        rows = watcher.list_for(chat_id)
+        if not rows:
+            await update.message.reply_text(
+                "நீங்கள் எந்த விண்ணப்பத்தையும் கவனிக்கவில்லை.\n"
+                "`/watch TN-2120251031226` என்று அனுப்புங்க.",
+                parse_mode="Markdown",
+            )
+            return
+        lines = ["🔔 கவனிக்கப்படும் விண்ணப்பங்கள்:"]
+        for r in rows:
+            nxt = datetime.fromtimestamp(r["next_check"]).strftime("%d-%m-%Y %H:%M")
+            lines.append(f"{r['app_no']} | {STATUS_TA.get(r['last_status'], '-')} | அடுத்த check: {nxt}")
+        await update.message.reply_text("\n".join(lines))
+        return
+
+    app_no = cache_key(context.args[0])
+    sess = sessions.get(update.effective_user.id, {})
+    last = sess.get("last_result") if cache_key(sess.get("last_app") or "") == app_no else None
+    if last is None:
+        # a number that is already decided would only be watched until the first check
+        try:
+            last = await query_tnedistrict_status_async(app_no)
+        except Exception as e:
+            logger.error("Watch pre-check failed for %s: %s", app_no, e)
+        if (last or {}).get("status") not in (*FINAL_STATUSES, "pending"):
+            last = None  # captcha / error / unavailable: the scheduler checks it on its first tick
+    outcome = watcher.add(app_no, chat_id, snapshot=last)
+    if outcome == "final":
+        await update.message.reply_text(_watch_final_text(app_no, last))
+    elif outcome == "exists":
+        await update.message.reply_text(f"{app_no} ஏற்கனவே கவனிக்கப்படுகிறது.")
+    elif outcome == "limit":
+        await update.message.reply_text(
+            f"அதிகபட்சம் {config.WATCH_MAX_PER_USER} விண்ணப்பங்களை மட்டுமே கவனிக்க முடியும்.\n"
+            "ஒன்றை நிறுத்த: /unwatch TN-..."
+        )
+    else:
+        await update.message.reply_text(
+            f"🔔 {app_no} கவனிக்கப்படுகிறது.\n"
+            "Status அல்லது Remarks மாறும்போது மட்டும் உங்களுக்கு message வரும்.\n"
+            f"நிறுத்த: /unwatch {app_no}"
+        )
+
+
+async def cmd_unwatch(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not context.args:
+        await update.message.reply_text("`/unwatch TN-2120251031226`", parse_mode="Markdown")
+        return
+    app_no = cache_key(context.args[0])
+    if watcher.remove(app_no, update.effective_chat.id):
+        await update.message.reply_text(f"🔕 {app_no} கவனிப்பு நிறுத்தப்பட்டது.")
+    else:
+        await update.message.reply_text(f"{app_no} கவனிக்கப்படவில்லை.")
+
+
+async def artifact_cleanup_task():
+    """Hourly: apply the artifact store's and the certificate archive's age and size limits;
+    drop expired sessions."""
+    while True:
+        try:
+            pruned = await asyncio.to_thread(prune_artifacts)
+            logger.info("Scraper artifacts pruned: %s", pruned)
+        except Exception as e:
+            logger.error("Artifact prune failed: %s", e)
+        try:
+            pruned = await asyncio.to_thread(cert_archive.prune)
+            logger.info("Certificate archive pruned: %s", pruned)
+        except Exception as e:
+            logger.error("Certificate archive prune failed: %s", e)
+        try:
+            await asyncio.to_thread(sessions.prune)
+        except Exception as e:
+            logger.error("Session prune failed: %s", e)
+        await asyncio.sleep(3600)
+
+
+async def on_startup(app):
+    global _bot
+    _bot = app.bot
+    # webhook.py: with several workers only one runs the background tasks
+    if not app.bot_data.get("background", True):
+        return
+    try:
+        migrate_tasks_json(job_store, TASK_FILE)
+    except Exception as e:
+        logger.error("tasks.json import failed (file left in place): %s", e)
+    app.create_task(artifact_cleanup_task())
+    watcher.start()
+    dispatcher.start()
+
+
+async def on_shutdown(app):
+    await dispatcher.stop()
+    await watcher.stop()
+    await delivery.drain()
+    await close_scraper()
+
+
 async def on_admin_pdf(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
-    Admin uploads final certificate PDF with caption = JOB-xxxx
+    Operator uploads final certificate PDF with caption = JOB-xxxx
     """
     msg = update.message
     user_id = msg.from_user.id
 
-    if user_id != config.ADMIN_CHAT_ID:
+    if not _is_operator(user_id):
         await msg.reply_text("இந்த PDF upload admin க்கு மட்டும் அனுமதிக்கப்படுகிறது.")
         return
 
@@ -466,33 +710,22 @@ async def on_admin_pdf(update: Update, context: ContextTypes.DEFAULT_TYPE):
     caption = msg.caption.strip()
     job_id = caption.split()[0].strip()
 
-    job, all_data = _find_job(job_id)
+    # Mark job done; the uploader gets the credit in /operators. A second upload, or one for
+    # a job another operator holds, is refused before anything reaches the user.
+    job, reason = dispatcher.complete(job_id, user_id)
+    if reason == "done":
+        await msg.reply_text(f"JOB {job_id} ஏற்கனவே முடிக்கப்பட்டது; PDF மீண்டும் அனுப்பப்படவில்லை.")
+        return
+    if reason == "taken":
+        await msg.reply_text(f"JOB {job_id} வேறு operator எடுத்துள்ளார். இது உங்கள் JOB இல்லை.")
+        return
     if not job:
         await msg.reply_text(f"JOB {job_id} கிடைக்கவில்லை. caption சரியா check பண்ணுங்க.")
         return
 
-    # Download PDF
     doc = msg.document
-    file = await doc.get_file()
-
-    # Build nice filename
-    def _safe(s):
-        return "".join(c for c in s if c.isalnum() or c in (" ", "_", "-", ".")).strip().replace(" ", "_")
-
-    base_name = f"{job['service']}_{job['name']}_{job['app_no']}".strip() or job_id
-    base_name = _safe(base_name)
-    if not base_name.lower().endswith(".pdf"):
-        base_name += ".pdf"
 
-    dest_path = os.path.join(DOWNLOAD_DIR, base_name)
-    await file.download_to_drive(dest_path)
-
-    # Mark job done
-    job["state"] = "done"
-    job["done_at"] = int(time.time())
-    _save_tasks(all_data)
-
-    # Send to user
+    # Send to user: the operator's upload is already on Telegram, so forward it by file_id
     try:
         await context.bot.send_message(
             chat_id=job["user_chat_id"],
@@ -502,35 +735,156 @@ async def on_admin_pdf(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 "எந்த issue இருந்தாலும் இந்த chat லவே reply பண்ணுங்க."
             ),
         )
-        await context.bot.send_document(
-            chat_id=job["user_chat_id"],
-            document=InputFile(dest_path),
-        )
+        await delivery.send_document(context.bot, job["user_chat_id"], file_id=doc.file_id)
     except Exception as e:
         logger.error("Failed to send PDF to user: %s", e)
         await msg.reply_text("User க்கு PDF அனுப்பும் போது ஒரு பிரச்சனை ஏற்பட்டது. Logs check பண்ணவும்.")
 
+    # Next request for this application number is answered from the archive; the local
+    # copy is recorded once its download has finished
+    cert_archive.put(
+        job["app_no"], doc.file_id, doc.file_unique_id, path=None,
+        service=job["service"], name=job["name"], job_id=job_id, operator_id=user_id,
+    )
+
+    # Local copy, downloaded in the background (DELIVERY_ARCHIVE)
+    if config.DELIVERY_ARCHIVE:
+        def _safe(s):
+            return "".join(c for c in s if c.isalnum() or c in (" ", "_", "-", ".")).strip().replace(" ", "_")
+
+        base_name = f"{job['service']}_{job['name']}_{job['app_no']}".strip() or job_id
+        base_name = _safe(base_name)
+        if not base_name.lower().endswith(".pdf"):
+            base_name += ".pdf"
+        dest_path = os.path.join(DOWNLOAD_DIR, base_name)
+        app_no = job["app_no"]
+        delivery.archive(context.bot, doc.file_id, dest_path,
+                         on_saved=lambda path, size: cert_archive.set_path(app_no, path, size))
+
     await msg.reply_text(f"✅ JOB {job_id} completed & PDF sent to user.")
 
 
+async def on_admin_bulk(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Admin uploads a .csv / .txt of TN-... numbers; replies with a results CSV.
+    """
+    msg = update.message
+    if msg.from_user.id != config.ADMIN_CHAT_ID:
+        await msg.reply_text("இந்த செயல்பாடு admin க்கு மட்டும்.")
+        return
+
+    data = await (await msg.document.get_file()).download_as_bytearray()
+    app_nos = bulk.read_app_numbers(bytes(data).decode("utf-8-sig", errors="replace"))
+    if not app_nos:
+        await msg.reply_text("File ல TN-... application number எதுவும் இல்லை.")
+        return
+    if len(app_nos) > config.BULK_MAX_NUMBERS:
+        await msg.reply_text(f"ஒரு file ல அதிகபட்சம் {config.BULK_MAX_NUMBERS} numbers மட்டும்.")
+        return
+
+    progress_msg = await msg.reply_text(f"📋 Bulk check: 0/{len(app_nos)}")
+    last_edit = 0.0
+
+    async def on_progress(done, total, counts):
+        nonlocal last_edit
+        # Telegram rate-limits edits; one every few seconds is plenty for a progress line
+        if done < total and time.monotonic() - last_edit < config.BULK_PROGRESS_EVERY_S:
+            return
+        last_edit = time.monotonic()
+        try:
+            await progress_msg.edit_text(f"📋 Bulk check: {done}/{total}\n{bulk.summary(counts)}")
+        except Exception as e:
+            logger.warning("Bulk progress edit failed: %s", e)
+
+    t0 = time.monotonic()
+    rows = await bulk.check_many(app_nos, query_tnedistrict_status_async,
+                                 concurrency=config.BULK_CONCURRENCY, on_progress=on_progress)
+    name = f"status_{datetime.now():%Y%m%d_%H%M}.csv"
+    await msg.reply_document(
+        document=InputFile(bulk.to_csv(rows).encode("utf-8-sig"), filename=name),
+        caption=f"✅ {len(rows)} numbers checked in {time.monotonic() - t0:.0f}s",
+    )
+
+
 async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE):
     logger.error("Exception in handler: %s", context.error)
 
 
-def main():
-    app = ApplicationBuilder().token(config.BOT_TOKEN).build()
+def open_stores():
+    """Open the SQLite stores and the services built on them (once; later calls are no-ops).
+    Paths in config are resolved against config.ROOT."""
+    global delivery, cert_archive, sessions, job_store, dispatcher, watcher
+    if job_store is not None:
+        return
+    os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+    delivery = Delivery(config.ROOT / config.DELIVERY_DB)
+    cert_archive = CertArchive(
+        config.ROOT / config.CERT_ARCHIVE_DB,
+        max_age_s=config.CERT_ARCHIVE_MAX_AGE_DAYS * 24 * 3600,
+        max_bytes=config.CERT_ARCHIVE_MAX_BYTES,
+    )
+    sessions = SessionStore(config.ROOT / config.SESSION_DB, "tnega", ttl_s=config.SESSION_TTL_S)
+    job_store = JobStore(config.ROOT / config.JOBS_DB)
+    dispatcher = Dispatcher(
+        job_store,
+        operators=config.OPERATOR_CHAT_IDS,
+        offer=_offer_job,
+        lease_s=config.JOB_LEASE_S,
+        sweep_s=config.JOB_SWEEP_S,
+    )
+    watcher = WatchScheduler(
+        config.ROOT / config.WATCH_DB,
+        check=_watch_check,
+        notify=_watch_notify,
+        batch_size=config.WATCH_BATCH_SIZE,
+        tick_s=config.WATCH_TICK_S,
+        base_interval_s=config.WATCH_BASE_INTERVAL_S,
+        max_interval_s=config.WATCH_MAX_INTERVAL_S,
+        jitter=config.WATCH_JITTER,
+        budget_per_hour=config.WATCH_BUDGET_PER_HOUR,
+        max_per_chat=config.WATCH_MAX_PER_USER,
+        max_age_s=config.WATCH_MAX_AGE_DAYS * 24 * 3600,
+    )
+
+
+def build_application(token=None, base_url=None, base_file_url=None):
+    """The bot with all handlers registered. base_url / base_file_url point it at another
+    Bot API server (a local one, or the fake in bench/load_bot.py)."""
+    open_stores()
+    # concurrent_updates: one user's /check must not wait behind another's scrape
+    builder = ApplicationBuilder().token(token or config.BOT_TOKEN).concurrent_updates(True)
+    if base_url:
+        builder = builder.base_url(base_url).base_file_url(base_file_url or base_url)
+    app = builder.build()
 
     app.add_handler(CommandHandler("start", start))
     app.add_handler(CommandHandler("check", cmd_check))
     app.add_handler(CommandHandler("jobs", cmd_jobs))
+    app.add_handler(CommandHandler("refresh", cmd_refresh))
+    app.add_handler(CommandHandler("artifacts", cmd_artifacts))
+    app.add_handler(CommandHandler("health", cmd_health))
+    app.add_handler(CommandHandler("watch", cmd_watch))
+    app.add_handler(CommandHandler("unwatch", cmd_unwatch))
+    app.add_handler(CommandHandler(["online", "offline"], cmd_online))
+    app.add_handler(CommandHandler("operators", cmd_operators))
     app.add_handler(CallbackQueryHandler(on_confirm, pattern="^CONFIRM_"))
     app.add_handler(CallbackQueryHandler(on_take_job, pattern="^TAKE_JOB"))
 
     # Admin PDF upload (any PDF document)
     app.add_handler(MessageHandler(filters.Document.PDF, on_admin_pdf))
+    # Admin bulk check (CSV / text file of application numbers)
+    app.add_handler(MessageHandler(
+        filters.Document.FileExtension("csv") | filters.Document.FileExtension("txt"), on_admin_bulk
+    ))
 
     app.add_error_handler(error_handler)
+    app.post_init = on_startup
+    app.post_shutdown = on_shutdown
+    return app
 
+
+def main():
+    app = build_application()
     logger.info("Starting TNEGA bot (Phase-1, no Razorpay automation)...")
     app.run_polling()
 
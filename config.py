@@ -1,3 +1,9 @@
+from pathlib import Path
+
+# relative file and directory names in this file are resolved against the repo root
+# (config.ROOT / name), never the working directory
+ROOT = Path(__file__).resolve().parent
+
 BOT_TOKEN = "8567046771:AAG5q0YWgssJfqo52MiocatGn0so_tYT9fU"
 
 OWNER_CHAT_ID = 1538155602
@@ -8,3 +14,100 @@ PAYMENT_LINK_ID = "plink_Rkon4hnEYouxp3"
 STATUS_URL = "https://tnedistrict.tn.gov.in/tneda/out_status.xhtml"
 VERIFY_URL = "https://tnedistrict.tn.gov.in/tneda/VerifyCerti.xhtml"
 ADMIN_CHAT_ID = 1538155602
+
+# Scraper browser pool (utils/browser_pool.py)
+SCRAPER_POOL_SIZE = 2              # pre-launched Chromium processes
+SCRAPER_CONTEXTS_PER_BROWSER = 2   # reusable contexts per browser
+SCRAPER_POOL_MAX_WAITERS = 20      # callers allowed to queue for a free context
+SCRAPER_MAX_CONCURRENCY = 8        # lookups allowed in flight at once per event loop
+SCRAPER_PAGE_POOL_SIZE = None      # VerifyCerti pages kept pre-loaded (None = one per context)
+SCRAPER_PAGE_MAX_USES = 25         # queries per parked page before a full reload
+
+# Scraper stage budgets (ms); each stage returns as soon as its readiness signal fires
+SCRAPER_FORM_TIMEOUT_MS = 10000
+SCRAPER_CLICK_CONFIRM_MS = 3000
+SCRAPER_RESULT_TIMEOUT_MS = 20000
+SCRAPER_RESULT_SETTLE_MS = 2000
+SCRAPER_STRATEGY_CACHE = "strategy_cache.sqlite3"  # last winning fill/click strategy, shared by all workers
+
+# Browserless JSF fast path (utils/http_engine.py); falls back to the browser on captcha/odd markup
+SCRAPER_HTTP_FAST_PATH = True
+SCRAPER_HTTP_TIMEOUT_S = 15
+SCRAPER_HTTP_MAX_CONNECTIONS = 20
+
+# Request blocking on scraper page loads (rules per site in utils/resource_rules.py)
+SCRAPER_BLOCK_RESOURCES = True
+SCRAPER_BLOCK_RULES = {}   # e.g. {"tnedistrict.tn.gov.in": {"block_types": ["image", "font"]}}
+
+# /check result cache (utils/result_cache.py); captcha/error results are never cached
+RESULT_CACHE_ENABLED = True
+RESULT_CACHE_TTL_S = {
+    "approved": 7 * 24 * 3600,
+    "rejected": 7 * 24 * 3600,
+    "pending": 30 * 60,
+    "no_record": 10 * 60,
+}
+RESULT_CACHE_MAX_ENTRIES = 5000
+RESULT_CACHE_MAX_BYTES = 8 * 1024 * 1024
+RESULT_CACHE_FILE = "result_cache.sqlite3"   # shared by all workers; None = memory only, per process
+
+# Scraper debug screenshots in screenshots/ (utils/artifacts.py)
+SCRAPER_ARTIFACTS = "failure"          # off | failure | sample (failures + 1 in N) | always
+SCRAPER_ARTIFACT_SAMPLE_EVERY = 20
+SCRAPER_ARTIFACT_FORMAT = "jpeg"       # jpeg | png
+SCRAPER_ARTIFACT_QUALITY = 60
+SCRAPER_ARTIFACT_FULL_PAGE = False     # viewport only
+SCRAPER_ARTIFACT_MAX_BYTES = 200 * 1024 * 1024   # total budget of screenshots/ (utils/artifact_store.py)
+SCRAPER_ARTIFACT_MAX_AGE_S = {"screenshot": 7 * 24 * 3600, "html": 3 * 24 * 3600, "har": 2 * 24 * 3600}
+SCRAPER_HAR = "off"                    # off | failure | always: record browser sessions as HAR (kind "har")
+SCRAPER_HAR_SAMPLE_EVERY = 1           # record 1 in N lookups; recorded ones skip the HTTP fast path
+
+# Upstream request rate for tnedistrict (utils/ratelimit.py); slows down on timeouts / 5xx / captcha
+SCRAPER_RATE_LIMIT = {"rate": 1.0, "burst": 4, "min_rate": 0.1}   # requests per second
+SCRAPER_RATE_MAX_WAIT_S = 120          # longer queues answer "busy" instead of waiting
+
+# Fail fast while tnedistrict is down (utils/breaker.py): opens after N timeouts / 5xx / refused
+# connections in a row, a background GET probes until it answers again
+SCRAPER_BREAKER = {"failure_threshold": 5, "open_s": 30, "max_open_s": 600, "probe_interval_s": 15}
+
+# Admin bulk check: upload a .csv / .txt of TN-... numbers to the bot (utils/bulk.py)
+BULK_CONCURRENCY = 4                   # lookups in flight; the rate limiter still applies
+BULK_MAX_NUMBERS = 500
+BULK_PROGRESS_EVERY_S = 3              # progress message edit interval
+
+# Certificate jobs (utils/jobs.py); an old tasks.json is imported into it on startup
+JOBS_DB = "jobs.sqlite3"
+# Job dispatch (utils/dispatch.py): each new job goes to the least-loaded online operator
+OPERATOR_CHAT_IDS = [ADMIN_CHAT_ID]    # who may take and deliver jobs; /online, /offline
+JOB_LEASE_S = 30 * 60                  # a taken job returns to the queue if no PDF arrives by then
+JOB_SWEEP_S = 60                       # how often expired leases / orphaned jobs are re-routed
+
+# Document delivery (utils/delivery.py): file_ids of sent files, reused instead of re-uploading
+DELIVERY_DB = "file_ids.sqlite3"
+DELIVERY_ARCHIVE = True                # also save delivered certificates to downloads/ (in the background)
+
+# Certificate archive (utils/cert_archive.py): repeat requests for an application are answered at once
+CERT_ARCHIVE_DB = "certificates.sqlite3"
+CERT_ARCHIVE_MAX_AGE_DAYS = 90         # entries (and their local copies) older than this are dropped
+CERT_ARCHIVE_MAX_BYTES = 500 * 1024 * 1024   # local copies beyond this go, least recently delivered first
+
+# Per-user conversation state (utils/sessions.py), shared by webhook workers
+SESSION_DB = "sessions.sqlite3"
+SESSION_TTL_S = 7 * 24 * 3600
+
+# /watch subscriptions (utils/watcher.py): pending applications re-checked in the background
+WATCH_DB = "watches.sqlite3"
+WATCH_TICK_S = 60                      # how often due watches are looked for
+WATCH_BATCH_SIZE = 10                  # numbers checked per tick
+WATCH_BASE_INTERVAL_S = 6 * 3600       # first re-check; doubles per day pending
+WATCH_MAX_INTERVAL_S = 48 * 3600
+WATCH_JITTER = 0.2                     # +/- fraction applied to every interval
+WATCH_BUDGET_PER_HOUR = 60             # upstream checks the watcher may spend per rolling hour
+WATCH_MAX_PER_USER = 5
+WATCH_MAX_AGE_DAYS = 30
+
+# Webhook mode (webhook.py): updates arrive through a reverse proxy instead of run_polling()
+WEBHOOK_BASE_URL = ""                  # public https URL of the proxy, e.g. https://bot.example.com
+WEBHOOK_SECRET = ""                    # X-Telegram-Bot-Api-Secret-Token (A-Z a-z 0-9 _ -); env WEBHOOK_SECRET wins
+WEBHOOK_PATHS = {"tnega": "/telegram/tnega", "cmchis": "/telegram/cmchis"}
+WEBHOOK_LOCK_FILE = "webhook.lock"     # the worker holding it runs the background tasks
@@ -4,7 +4,7 @@ import time
 from telegram import Update, InputFile
 from telegram.ext import ContextTypes
 import config
-from utils.scraper import query_tnedistrict_status
+from utils.scraper import query_tnedistrict_status_async
 
 # Map admin handler
 admin_file_handler = handle_admin_file
@@ -27,20 +27,20 @@ async def cmd_getcert(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text("⏳ Checking status... Please wait...")
 
     # call scraper
-    result = query_tnedistrict_status(app_no, headless=True)
+    result = await query_tnedistrict_status_async(app_no, headless=True)
 
     if result["status"] == "pending":
         await update.message.reply_text("🟡 Status: PENDING\nPlease wait 1–2 days. Approval is in process.")
         return
 
     if result["status"] == "rejected":
-        remarks = result["data"].get("remarks", "No remarks")
+        remarks = result["data"].get("remarks") or "No remarks"
         await update.message.reply_text(f"🔴 Status: REJECTED\nRemarks: {remarks}\nVisit VAO with valid documents.")
         return
 
     if result["status"] == "approved":
-        name = result["data"].get("name", "Name not found")
-        service = result["data"].get("service", "Service not found")
+        name = result["data"].get("applicant_name") or "Name not found"
+        service = result["data"].get("request_for") or "Service not found"
         await update.message.reply_text(
             f"🟢 Status: APPROVED\n"
             f"Name: {name}\n"
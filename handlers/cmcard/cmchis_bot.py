@@ -7,18 +7,23 @@ from functools import wraps
 from dotenv import load_dotenv
 load_dotenv()
 
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, InputFile
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ApplicationBuilder, CommandHandler, MessageHandler, CallbackQueryHandler, ContextTypes, filters
 
 import razorpay
 
-from scraper import scrape_by_ration
+from scraper import scrape_by_ration_async, prune_artifacts, expected_wait, upstream_health
+from utils.delivery import Delivery  # repo root is on sys.path via scraper
+from utils.sessions import SessionStore
 
 # Config
 TOKEN = os.getenv("TELEGRAM_TOKEN")
 OWNER_CHAT_ID = int(os.getenv("OWNER_CHAT_ID") or 0)
-SAVE_DIR = Path(os.getenv("SAVE_DIR", "./cmchis_output"))
-SAVE_DIR.mkdir(parents=True, exist_ok=True)
+# relative to this file, not the working directory (webhook.py runs from the repo root)
+SAVE_DIR = Path(__file__).resolve().parent / os.getenv("SAVE_DIR", "cmchis_output")
+# e-cards and the enrolment form go out by Telegram file_id after their first upload;
+# opened by open_stores() with SESSION below
+delivery = None
 
 RZP_ID = os.getenv("RAZORPAY_KEY_ID")
 RZP_SECRET = os.getenv("RAZORPAY_KEY_SECRET")
@@ -27,7 +32,8 @@ USE_RAZORPAY = bool(RZP_ID and RZP_SECRET)
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 log = logging.getLogger("cmchis")
 
-SESSION = {}  # chat_id -> session dict
+# chat_id -> session dict, in SQLite so webhook workers share it (webhook.py)
+SESSION = None
 AUDIT_FILE = SAVE_DIR / "audit.csv"
 AUDIT_HEADERS = ["ts_utc","chat_id","ration","action","status","order_id","file_path","note"]
 
@@ -62,6 +68,11 @@ def pdf_valid(path):
     except Exception:
         return False
 
+def site_down_text(res: dict) -> str:
+    minutes = max(1, round(res.get("retry_after_s", 60) / 60))
+    return ("⚠️ CMCHIS தளம் தற்போது இயங்கவில்லை.\n"
+            f"The CMCHIS site is down right now. Please try again in about {minutes} min.")
+
 def owner_only(func):
     @wraps(func)
     async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -93,7 +104,13 @@ async def handle_ration(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not is_ration(text):
         return await update.message.reply_text("❗ Send only 12-digit ration card number.")
     ration = text
-    await update.message.reply_text("⏳ Checking the site for details...")
+    eta = expected_wait()
+    if eta["wait_s"] >= 5:
+        await update.message.reply_text(
+            f"⏳ Checking the site for details... You are #{eta['position']} in the queue (~{eta['wait_s']:.0f}s)."
+        )
+    else:
+        await update.message.reply_text("⏳ Checking the site for details...")
 
     append_audit(chat_id, ration, "check_started")
     outdir = SAVE_DIR / ration
@@ -101,7 +118,11 @@ async def handle_ration(update: Update, context: ContextTypes.DEFAULT_TYPE):
     pdf_path = outdir / f"ecard_{ration}.pdf"
 
     # call blocking scraper in thread
-    res = await asyncio.to_thread(scrape_by_ration, ration, str(pdf_path), True)
+    res = await scrape_by_ration_async(ration, str(pdf_path), True)
+
+    if res.get("error") == "UPSTREAM_DOWN":
+        append_audit(chat_id, ration, "check_failed", status="UPSTREAM_DOWN")
+        return await update.message.reply_text(site_down_text(res))
 
     # if scraper returned an error and no detection, show friendly no-card
     if res.get("error") and not res.get("has_generate") and not res.get("has_card"):
@@ -112,7 +133,7 @@ async def handle_ration(update: Update, context: ContextTypes.DEFAULT_TYPE):
         no_card_text = ("❌ இந்த ரேஷன் அட்டைக்கு பதிவில்லை அல்லது தளம் பதில் தரவில்லை.\n\n"
                         "👉 புதிய அட்டை பெற: படிவத்தை பூர்த்தி செய்து VAO-இல் சேர்க்கவும். (படிவம் 24 மணி முந்தையதாக நீக்கப்படும்).")
         if form:
-            await update.message.reply_document(InputFile(str(form)), caption=no_card_text)
+            await delivery.send_document(context.bot, chat_id, form, caption=no_card_text)
         else:
             await update.message.reply_text(no_card_text)
         return
@@ -125,9 +146,9 @@ async def handle_ration(update: Update, context: ContextTypes.DEFAULT_TYPE):
         urn = fields.get("Card Holder URN Number", "") or ""
         remain = fields.get("Remaining Sum Assured", "") or ""
         caption = f"✅ Card Found!\nName: *{name}*\nURN: *{urn}*\nRemaining: *{remain}*"
-        # preview screenshot if debug exists
-        preview = Path("debug_output") / f"preview_{ration}.png"
-        if preview.exists():
+        # preview screenshot taken by the scraper when the card was found
+        preview = Path(res["preview_img"]) if res.get("preview_img") else None
+        if preview and preview.exists():
             with open(preview, "rb") as f:
                 await update.message.reply_photo(f, caption=caption, parse_mode="Markdown")
         else:
@@ -156,17 +177,30 @@ async def handle_ration(update: Update, context: ContextTypes.DEFAULT_TYPE):
     no_card_text = ("❌ Generate e-Card option not present. This means you do not have a usable e-Card yet.\n\n"
                     "👉 How to enroll:\n1) Print & fill enrollment form.\n2) Get VAO signature & submit at District Collectorate / CMCHIS camp.\n3) After 10–20 days re-check here.")
     if form:
-        await update.message.reply_document(InputFile(str(form)), caption=no_card_text)
+        await delivery.send_document(context.bot, chat_id, form, caption=no_card_text)
     else:
         await update.message.reply_text(no_card_text)
     return
 
 async def on_buttons(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    chat_id = update.callback_query.message.chat.id
+    s = SESSION.get(chat_id, {})
+    before = dict(s)
+    try:
+        await _on_button(update, context, s)
+    finally:
+        # SESSION hands out copies (utils/sessions.py): merge only the keys this button
+        # changed, so whatever other updates wrote during a long scrape is kept; a new
+        # ration looked up meanwhile wins outright
+        changed = {k: v for k, v in s.items() if k not in before or before[k] != v}
+        if changed and SESSION.get(chat_id, {}).get("ration") == s.get("ration"):
+            SESSION.update(chat_id, **changed)
+
+async def _on_button(update: Update, context: ContextTypes.DEFAULT_TYPE, s: dict):
     q = update.callback_query
     await q.answer()
     data = q.data
     chat_id = q.message.chat.id
-    s = SESSION.get(chat_id, {})
 
     if data == "regen_pdf":
         ration = s.get("ration")
@@ -176,14 +210,17 @@ async def on_buttons(update: Update, context: ContextTypes.DEFAULT_TYPE):
         outdir = SAVE_DIR / ration
         outdir.mkdir(parents=True, exist_ok=True)
         pdf_path = outdir / f"ecard_{ration}.pdf"
-        res = await asyncio.to_thread(scrape_by_ration, ration, str(pdf_path), True)
+        res = await scrape_by_ration_async(ration, str(pdf_path), True)
         if res.get("pdf") and pdf_valid(res.get("pdf")):
             s["pdf"] = res.get("pdf")
             append_audit(chat_id, ration, "pdf_generated", status="ok", file_path=res.get("pdf"))
             await q.edit_message_text("✅ PDF ready. Proceed to payment.")
-            await context.bot.send_document(chat_id, InputFile(res["pdf"], filename=f"CMCHIS_{ration}.pdf"))
+            await delivery.send_document(context.bot, chat_id, res["pdf"], filename=f"CMCHIS_{ration}.pdf")
             kb = [[InlineKeyboardButton("Proceed to Pay ₹10", callback_data="pay")]]
             await context.bot.send_message(chat_id, "Proceed:", reply_markup=InlineKeyboardMarkup(kb))
+        elif res.get("error") == "UPSTREAM_DOWN":
+            append_audit(chat_id, ration, "pdf_failed", status="UPSTREAM_DOWN")
+            await q.edit_message_text(site_down_text(res))
         else:
             append_audit(chat_id, ration, "pdf_failed", status=res.get("error","error"))
             await q.edit_message_text("❌ Unable to create valid PDF. Please contact support or try later.")
@@ -192,7 +229,7 @@ async def on_buttons(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if data == "preview_pdf":
         pdf = s.get("pdf")
         if pdf and pdf_valid(pdf):
-            await context.bot.send_document(chat_id, InputFile(pdf, filename=f"CMCHIS_{s.get('ration')}.pdf"))
+            await delivery.send_document(context.bot, chat_id, pdf, filename=f"CMCHIS_{s.get('ration')}.pdf")
         else:
             await q.edit_message_text("PDF missing or invalid. Use Generate e-Card PDF first.")
         return
@@ -277,7 +314,7 @@ async def on_buttons(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # send pdf if valid else regenerate
         if s.get("pdf") and pdf_valid(s.get("pdf")):
             await q.edit_message_text("✅ Payment confirmed. Sending your e-Card PDF now.")
-            await context.bot.send_document(chat_id, InputFile(s.get("pdf"), filename=f"CMCHIS_{s.get('ration')}.pdf"))
+            await delivery.send_document(context.bot, chat_id, s.get("pdf"), filename=f"CMCHIS_{s.get('ration')}.pdf")
             append_audit(chat_id, s.get("ration"), "pdf_sent", status="ok", file_path=s.get("pdf"))
             return
         # regenerate once
@@ -285,13 +322,16 @@ async def on_buttons(update: Update, context: ContextTypes.DEFAULT_TYPE):
         outdir = SAVE_DIR / s.get("ration")
         outdir.mkdir(parents=True, exist_ok=True)
         pdf_path = outdir / f"ecard_{s.get('ration')}.pdf"
-        res = await asyncio.to_thread(scrape_by_ration, s.get("ration"), str(pdf_path), True)
+        res = await scrape_by_ration_async(s.get("ration"), str(pdf_path), True)
         if res.get("pdf") and pdf_valid(res.get("pdf")):
             s["pdf"] = res.get("pdf")
-            await context.bot.send_document(chat_id, InputFile(res["pdf"], filename=f"CMCHIS_{s.get('ration')}.pdf"))
+            await delivery.send_document(context.bot, chat_id, res["pdf"], filename=f"CMCHIS_{s.get('ration')}.pdf")
             append_audit(chat_id, s.get("ration"), "pdf_regen_sent", status="ok", file_path=res.get("pdf"))
             return
-        await context.bot.send_message(chat_id, "❌ Unable to generate PDF. Support will follow up.")
+        if res.get("error") == "UPSTREAM_DOWN":
+            await context.bot.send_message(chat_id, site_down_text(res) + "\nYour payment is recorded; support will follow up.")
+        else:
+            await context.bot.send_message(chat_id, "❌ Unable to generate PDF. Support will follow up.")
         append_audit(chat_id, s.get("ration"), "pdf_regen_failed", status=res.get("error","error"))
         return
 
@@ -321,6 +361,16 @@ async def verify_paid(session: dict) -> bool:
         log.exception("verify_paid error")
         return False
 
+@owner_only
+async def health_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    b = upstream_health()
+    text = f"cmchistn: {b['state']} ({b['failures']} failures in a row, opened {b['opened']}x)"
+    if b["state"] != "closed":
+        text += f"\nretry in ~{b['retry_after_s']}s\nlast error: {b['last_error']}"
+    eta = expected_wait()
+    text += f"\nqueue: {eta['position'] - 1} waiting, ~{eta['wait_s']:.0f}s"
+    return await update.message.reply_text(text)
+
 @owner_only
 async def release_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     parts = (update.message.text or "").split()
@@ -335,7 +385,7 @@ async def release_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return await update.message.reply_text("No session for that chat_id.")
     pdf = s.get("pdf")
     if pdf and pdf_valid(pdf):
-        await context.bot.send_document(target, InputFile(pdf, filename=f"CMCHIS_{s.get('ration')}.pdf"))
+        await delivery.send_document(context.bot, target, pdf, filename=f"CMCHIS_{s.get('ration')}.pdf")
         append_audit(target, s.get("ration"), "manual_release", status="ok", file_path=pdf)
         return await update.message.reply_text("Released.")
     return await update.message.reply_text("No valid PDF to release.")
@@ -359,24 +409,54 @@ async def hourly_cleanup_task():
                         pass
         except Exception:
             log.exception("cleanup error")
+        try:
+            pruned = await asyncio.to_thread(prune_artifacts)
+            log.info("debug artifacts pruned: %s", pruned)
+        except Exception:
+            log.exception("artifact prune error")
+        try:
+            await asyncio.to_thread(SESSION.prune)
+        except Exception:
+            log.exception("session prune error")
         await asyncio.sleep(3600)
 
 async def on_startup(app):
+    # webhook.py: with several workers only one runs the cleanup
+    if not app.bot_data.get("background", True):
+        return
     # start background cleanup
     app.create_task(hourly_cleanup_task())
 
-def main():
-    if not TOKEN:
-        print("Missing TELEGRAM_TOKEN in .env")
+def open_stores():
+    """Create SAVE_DIR and open the file_id and session stores (once)."""
+    global delivery, SESSION
+    if SESSION is not None:
         return
-    app = ApplicationBuilder().token(TOKEN).build()
+    SAVE_DIR.mkdir(parents=True, exist_ok=True)
+    delivery = Delivery(os.getenv("CMCHIS_FILE_ID_DB") or SAVE_DIR / "file_ids.sqlite3")
+    SESSION = SessionStore(os.getenv("CMCHIS_SESSION_DB") or SAVE_DIR / "sessions.sqlite3", "cmchis")
+
+def build_application(token=None, base_url=None, base_file_url=None):
+    """The bot with all handlers registered; base_url / base_file_url select another Bot API server."""
+    open_stores()
+    builder = ApplicationBuilder().token(token or TOKEN)
+    if base_url:
+        builder = builder.base_url(base_url).base_file_url(base_file_url or base_url)
+    app = builder.build()
     app.add_handler(CommandHandler("start", start))
     app.add_handler(CommandHandler("help", help_cmd))
     app.add_handler(CommandHandler("release", release_cmd))
+    app.add_handler(CommandHandler("health", health_cmd))
     app.add_handler(MessageHandler(filters.TEXT & (~filters.COMMAND), handle_ration))
     app.add_handler(CallbackQueryHandler(on_buttons))
     app.post_init = on_startup
+    return app
 
+def main():
+    if not TOKEN:
+        print("Missing TELEGRAM_TOKEN in .env")
+        return
+    app = build_application()
     log.info("CMCHIS bot running...")
     app.run_polling()
 
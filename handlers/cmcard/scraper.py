@@ -2,12 +2,20 @@
 # Robust Selenium-based scraper for CMCHIS site.
 # Returns dict: { has_card, has_generate, fields, pdf (path) , preview_img (optional), error }
 
-import time, traceback, base64, os
+import asyncio, time, traceback, base64, os, sys
 from pathlib import Path
 from typing import Dict, Any
 import requests
 from bs4 import BeautifulSoup
 
+# shared helpers live in the repo-level utils/ package
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from utils.resource_rules import rules_for, blocked_url_patterns
+from utils.singleflight import SingleFlight
+from utils import ratelimit, breaker
+from utils.artifacts import ArtifactPolicy
+from utils.artifact_store import ArtifactStore
+
 # Selenium
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -15,21 +23,78 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service as ChromeService
 from webdriver_manager.chrome import ChromeDriverManager
 
-DEBUG_DIR = Path("debug_output")
+DEBUG_DIR = Path(__file__).resolve().parent / "debug_output"
 DEBUG_DIR.mkdir(exist_ok=True)
 
-CMCHIS_URL = "https://claim.cmchistn.com/payer/payermemberpolicyinfodetails.aspx"
+CMCHIS_URL = os.getenv("CMCHIS_URL", "https://claim.cmchistn.com/payer/payermemberpolicyinfodetails.aspx")
+BLOCK_RESOURCES = os.getenv("CMCHIS_BLOCK_RESOURCES", "1") != "0"
+# claim.cmchistn.com request budget shared by every worker thread (utils/ratelimit.py)
+LIMIT = ratelimit.configure(
+    CMCHIS_URL,
+    rate=float(os.getenv("CMCHIS_RATE_PER_S", "0.5")),
+    burst=int(os.getenv("CMCHIS_RATE_BURST", "2")),
+)
+RATE_MAX_WAIT_S = float(os.getenv("CMCHIS_RATE_MAX_WAIT_S", "120"))
+# answer at once while the site is down instead of waiting out Selenium's page-load timeout
+BREAKER = breaker.configure(
+    "cmchistn",
+    probe=breaker.http_probe(CMCHIS_URL),
+    failure_threshold=int(os.getenv("CMCHIS_BREAKER_FAILURES", "3")),
+    open_s=float(os.getenv("CMCHIS_BREAKER_OPEN_S", "60")),
+)
+# debug_output/ is a bounded store: byte budget, per-kind age limits, deduplicated gzip HTML
+STORE = ArtifactStore(
+    DEBUG_DIR,
+    max_bytes=int(os.getenv("CMCHIS_ARTIFACT_MAX_MB", "200")) * 1024 * 1024,
+    max_age_s={"html": 3 * 24 * 3600, "screenshot": 7 * 24 * 3600, "preview": 24 * 3600},
+)
+# HTML dumps and screenshots are kept only for runs this policy selects (off|failure|sample|always)
+ARTIFACTS = ArtifactPolicy(
+    DEBUG_DIR,
+    store=STORE,
+    mode=os.getenv("CMCHIS_ARTIFACTS", "failure"),
+    sample_every=int(os.getenv("CMCHIS_ARTIFACT_SAMPLE_EVERY", "20")),
+    image_format=os.getenv("CMCHIS_ARTIFACT_FORMAT", "jpeg"),
+)
+
+# transfer size of the page and everything it loaded, from the Performance API
+_NETWORK_JS = """
+const res = performance.getEntriesByType('resource');
+const nav = performance.getEntriesByType('navigation')[0] || {};
+return {requests: res.length + 1, bytes: res.reduce((a, e) => a + (e.transferSize || 0), nav.transferSize || 0)};
+"""
+
+def _write_debug(dumps: list | None, name: str, html: str | None = None):
+    """Hold an HTML dump until the run's outcome is known (written by _flush_debug)."""
+    if dumps is not None and html is not None and ARTIFACTS.mode != "off":
+        dumps.append((name, "html", html))
 
-def _write_debug(name: str, html: str | None = None, img_bytes: bytes | None = None):
+def _screenshot(driver, fmt: str = "jpeg", quality: int = 60) -> tuple[bytes, str] | None:
+    """Viewport screenshot; JPEG through CDP, PNG if that is unavailable."""
     try:
-        if html is not None:
-            p = DEBUG_DIR / f"{name}.html"
-            p.write_text(html, encoding="utf-8")
-        if img_bytes is not None:
-            p2 = DEBUG_DIR / f"{name}.png"
-            p2.write_bytes(img_bytes)
+        if fmt == "jpeg":
+            shot = driver.execute_cdp_cmd("Page.captureScreenshot", {"format": "jpeg", "quality": quality})
+            return base64.b64decode(shot["data"]), "jpg"
     except Exception:
         pass
+    try:
+        return driver.get_screenshot_as_png(), "png"
+    except Exception:
+        return None
+
+def _flush_debug(dumps: list, failed: bool, driver=None, name: str = "", key: str = ""):
+    """Write the held dumps, plus a screenshot while the driver is still open, if the
+    artifact policy keeps this run. Writes happen on the policy's background thread."""
+    if not ARTIFACTS.wants(failed):
+        dumps.clear()
+        return
+    if driver is not None:
+        shot = _screenshot(driver, ARTIFACTS.image_format, ARTIFACTS.jpeg_quality)
+        if shot:
+            dumps.append((name, shot[1], shot[0]))
+    for n, ext, data in dumps:
+        ARTIFACTS.save(n, ext, data, key=key)
+    dumps.clear()
 
 def _start_driver(headless=True):
     opts = Options()
@@ -46,6 +111,13 @@ def _start_driver(headless=True):
     service = ChromeService(ChromeDriverManager().install())
     driver = webdriver.Chrome(service=service, options=opts)
     driver.set_page_load_timeout(45)
+    if BLOCK_RESOURCES:
+        # CDP only matches URLs, so resource types become extension patterns (see utils/resource_rules.py)
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": blocked_url_patterns(rules_for(CMCHIS_URL))})
+        except Exception:
+            pass
     return driver
 
 def _print_pdf_via_cdp(driver, out_pdf_path: str) -> bool:
@@ -67,12 +139,19 @@ def _print_pdf_via_cdp(driver, out_pdf_path: str) -> bool:
     except Exception:
         return False
 
-def _requests_quick_check(ration: str) -> Dict[str, Any]:
+def _requests_quick_check(ration: str, dumps: list | None = None) -> Dict[str, Any]:
     """Lightweight HTML check to see if the page contains 'Generate e-card' (fast path)."""
     try:
+        LIMIT.acquire(RATE_MAX_WAIT_S)
         r = requests.get(CMCHIS_URL, headers={"User-Agent": "Mozilla/5.0"}, timeout=12)
+        if r.status_code >= 500:
+            LIMIT.penalize()
+            BREAKER.failure(f"HTTP {r.status_code}")
+            return {"ok": False, "error": f"HTTP {r.status_code}"}
+        LIMIT.success()
+        BREAKER.success()
         html = r.text
-        _write_debug(f"req_start_{ration}", html=html)
+        _write_debug(dumps, f"req_start_{ration}", html=html)
         lower = html.lower()
         has_generate = ("generate e-card" in lower) or ("generate e card" in lower)
         has_ration = ration in lower
@@ -87,10 +166,17 @@ def _requests_quick_check(ration: str) -> Dict[str, Any]:
                 if k:
                     fields[k] = v
         return {"ok": True, "has_generate": has_generate, "has_card": has_generate or has_ration, "fields": fields, "html": html}
+    except requests.Timeout as e:
+        LIMIT.penalize()
+        BREAKER.failure(f"Timeout: {e}")
+        return {"ok": False, "error": str(e)}
+    except requests.ConnectionError as e:
+        BREAKER.failure(f"ConnectionError: {e}")
+        return {"ok": False, "error": str(e)}
     except Exception as e:
         return {"ok": False, "error": str(e)}
 
-def _selenium_flow(ration: str, out_pdf_path: str, headless=True) -> Dict[str, Any]:
+def _selenium_flow(ration: str, out_pdf_path: str, headless=True, dumps: list | None = None) -> Dict[str, Any]:
     """
     Full selenium flow:
      - open page
@@ -101,7 +187,10 @@ def _selenium_flow(ration: str, out_pdf_path: str, headless=True) -> Dict[str, A
     """
     OUT = {"has_card": False, "has_generate": False, "fields": {}, "pdf": None, "preview_img": None}
     driver = None
+    dumps = [] if dumps is None else dumps
+    failed = True
     try:
+        LIMIT.acquire(RATE_MAX_WAIT_S)  # before Chrome starts, so queued runs hold no browser
         driver = _start_driver(headless=headless)
         driver.get(CMCHIS_URL)
         time.sleep(0.8)
@@ -156,17 +245,7 @@ def _selenium_flow(ration: str, out_pdf_path: str, headless=True) -> Dict[str, A
 
         time.sleep(1.0)
         page_html = driver.page_source
-        _write_debug(f"selenium_after_search_{ration}", html=page_html)
-
-        # take quick screenshot preview
-        try:
-            png = driver.get_screenshot_as_png()
-            _write_debug(f"selenium_preview_{ration}", img_bytes=png)
-            preview_path = DEBUG_DIR / f"preview_{ration}.png"
-            preview_path.write_bytes(png)
-            OUT["preview_img"] = str(preview_path)
-        except Exception:
-            pass
+        _write_debug(dumps, f"selenium_after_search_{ration}", html=page_html)
 
         # extract table fields heuristically
         fields = {}
@@ -186,13 +265,33 @@ def _selenium_flow(ration: str, out_pdf_path: str, headless=True) -> Dict[str, A
             pass
         OUT["fields"] = fields
 
+        try:
+            OUT["network"] = driver.execute_script(_NETWORK_JS)
+            OUT["network"]["blocked_patterns"] = len(blocked_url_patterns(rules_for(CMCHIS_URL))) if BLOCK_RESOURCES else 0
+        except Exception:
+            pass
+
         page_lower = page_html.lower()
+        if "captcha" in page_lower:
+            LIMIT.penalize()
+        elif fields or ration in page_lower:
+            LIMIT.success()
+        BREAKER.success()
         if "generate e-card" in page_lower or "generate e card" in page_lower:
             OUT["has_generate"] = True
             OUT["has_card"] = True
         elif ration in page_lower:
             OUT["has_card"] = True
 
+        # preview photo for the user (only shown when a card is found)
+        if OUT["has_generate"]:
+            shot = _screenshot(driver, "jpeg", 80)
+            if shot:
+                try:
+                    OUT["preview_img"] = STORE.put(ration, f"preview_{ration}", shot[1], shot[0], kind="preview")
+                except Exception:
+                    pass
+
         # If generate present, attempt PDF
         if OUT["has_generate"]:
             for attempt in range(1, 4):
@@ -201,11 +300,23 @@ def _selenium_flow(ration: str, out_pdf_path: str, headless=True) -> Dict[str, A
                     OUT["pdf"] = out_pdf_path
                     break
                 time.sleep(0.6 * attempt)
+        failed = not OUT["has_card"] or (OUT["has_generate"] and not OUT["pdf"])
         return OUT
 
+    except ratelimit.RateLimited as e:
+        return {"error": "BUSY", "error_msg": str(e)}
     except Exception as e:
+        if "timeout" in type(e).__name__.lower() or "timed out" in str(e).lower():
+            LIMIT.penalize()
+            BREAKER.failure(f"{type(e).__name__}: {e}")
+        elif "net::ERR_" in str(e):
+            BREAKER.failure(str(e))
         return {"error": "SEL_FAIL", "error_msg": str(e), "trace": traceback.format_exc()}
     finally:
+        try:
+            _flush_debug(dumps, failed, driver, f"selenium_{ration}", key=ration)
+        except Exception:
+            pass
         try:
             if driver:
                 driver.quit()
@@ -217,17 +328,51 @@ def scrape_by_ration(ration: str, out_pdf_path: str, headless=True) -> Dict[str,
     Public function to call from bot.
     Returns dict { has_card, has_generate, fields, pdf (path) or None, error (optional), preview_img (optional) }
     """
-    # Quick HTTP check
-    rq = _requests_quick_check(ration)
+    if not BREAKER.allow():
+        return {"error": "UPSTREAM_DOWN", "error_msg": BREAKER.last_error, "retry_after_s": round(BREAKER.retry_after())}
+    # Quick HTTP check; its HTML dump is written with the browser run's artifacts, if at all
+    dumps = []
+    rq = _requests_quick_check(ration, dumps)
     # If request-level HTML contains generate text, prefer that path
     if rq.get("ok") and rq.get("has_generate"):
         try:
-            res = _selenium_flow(ration, out_pdf_path, headless=headless)
+            res = _selenium_flow(ration, out_pdf_path, headless=headless, dumps=dumps)
             # merge quick parsed fields if selenium missed
             if not res.get("fields"):
                 res["fields"] = rq.get("fields", {})
             return res
         except Exception:
             return {"has_card": True, "has_generate": True, "fields": rq.get("fields", {}), "pdf": None, "error": "NO_CHROME_OR_PDF"}
+    if BREAKER.state == breaker.OPEN:
+        return {"error": "UPSTREAM_DOWN", "error_msg": BREAKER.last_error, "retry_after_s": round(BREAKER.retry_after())}
     # Otherwise run selenium to render JS and check
-    return _selenium_flow(ration, out_pdf_path, headless=headless)
+    return _selenium_flow(ration, out_pdf_path, headless=headless, dumps=dumps)
+
+# concurrent requests for the same ration share one browser run (and one PDF write)
+_flights = SingleFlight()
+
+async def scrape_by_ration_async(ration: str, out_pdf_path: str, headless=True) -> Dict[str, Any]:
+    """
+    scrape_by_ration() in a worker thread. Callers asking for a ration that is already
+    being scraped get that run's result instead of starting another browser.
+    """
+    key = ((ration or "").strip(), str(out_pdf_path), headless)
+    return await _flights.do(key, lambda: asyncio.to_thread(scrape_by_ration, ration, out_pdf_path, headless))
+
+def flight_stats() -> Dict[str, Any]:
+    return _flights.stats()
+
+def upstream_health() -> Dict[str, Any]:
+    return BREAKER.stats()
+
+def expected_wait() -> Dict[str, Any]:
+    """What a new scrape would wait for a CMCHIS request slot now: {wait_s, position}."""
+    return {"wait_s": LIMIT.expected_wait(), "position": LIMIT.waiting + 1}
+
+def find_artifacts(ration: str) -> list:
+    """Dumps, screenshots and previews kept for one ration, newest first."""
+    return STORE.find(ration)
+
+def prune_artifacts() -> Dict[str, int]:
+    """Apply debug_output/ age limits and byte budget (blocking)."""
+    return STORE.prune()
@@ -1,8 +1,7 @@
 # handlers/status_handler.py
-import asyncio
 from telegram import Update, InputFile
 from telegram.ext import ContextTypes
-from utils.scraper import query_tnedistrict_status
+from utils.scraper import query_tnedistrict_status_async, upstream_failed
 
 async def cmd_check(update: Update, context: ContextTypes.DEFAULT_TYPE):
     args = context.args or []
@@ -13,19 +12,20 @@ async def cmd_check(update: Update, context: ContextTypes.DEFAULT_TYPE):
     app_no = args[0].strip()
     info_msg = await update.message.reply_text(f"Checking status for {app_no} ... please wait (may take a few seconds).")
 
-    # run scraper in a thread so we do not block the event loop
+    # async scraper: runs on this event loop, no executor thread per check
     try:
         # first try
-        result = await asyncio.to_thread(query_tnedistrict_status, app_no, True, 60000)
+        result = await query_tnedistrict_status_async(app_no, True, 60000)
     except Exception as e:
         await update.message.reply_text(f"Error while checking (exception): {e}")
         return
 
-    # If ambiguous or error, try one quick retry
-    if not result or result.get("status") in ("error", "ambiguous", None):
+    # If ambiguous or error, try one quick retry (not when the site timed out or refused
+    # the connection: that would only double the wait)
+    if not result or (result.get("status") in ("error", "ambiguous", None) and not upstream_failed(result)):
         try:
             await info_msg.edit_text(f"Retrying check for {app_no} ...")
-            result = await asyncio.to_thread(query_tnedistrict_status, app_no, True, 60000)
+            result = await query_tnedistrict_status_async(app_no, True, 60000)
         except Exception as e:
             await update.message.reply_text(f"Second attempt failed: {e}")
             return
@@ -33,6 +33,11 @@ async def cmd_check(update: Update, context: ContextTypes.DEFAULT_TYPE):
     status = result.get("status", "error")
     data = result.get("data", {})
 
+    if status == "unavailable":
+        minutes = max(1, round(result["debug"].get("retry_after_s", 60) / 60))
+        await info_msg.edit_text(f"The eDistrict site is down right now. Please try again in about {minutes} min.")
+        return
+
     # Normal flows
     if status == "pending":
         await update.message.reply_text("Status: PENDING — your application is under review. Please check after 48 hours.")
@@ -41,8 +46,8 @@ async def cmd_check(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if status == "approved":
         text = (
             f"Status: APPROVED ✅\n"
-            f"Application: {data.get('application_number', app_no)}\n"
-            f"Name: {data.get('applicant_name') or data.get('name') or 'N/A'}\n"
+            f"Application: {data.get('app_no') or app_no}\n"
+            f"Name: {data.get('applicant_name') or 'N/A'}\n"
             f"Father: {data.get('father_name') or 'N/A'}\n"
             f"Remarks: {data.get('remarks') or 'N/A'}\n\n"
             f"If you want to download the certificate, use /getcert {app_no}"
@@ -51,7 +56,7 @@ async def cmd_check(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     if status == "rejected":
-        remarks = data.get("remarks", "No remarks provided.")
+        remarks = data.get("remarks") or "No remarks provided."
         await update.message.reply_text(f"Status: REJECTED ❌\nRemarks: {remarks}\nPlease reapply with corrected documents or visit VAO.")
         return
 
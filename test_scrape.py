@@ -1,6 +1,50 @@
-from utils.scraper import query_tnedistrict_status
-import json
-app_no = "TN-2120251031226"
-print("Running debug scrape for", app_no)
-res = query_tnedistrict_status(app_no, headless=False, timeout_ms=60000)
-print(json.dumps(res, indent=2, ensure_ascii=False))
+from utils.scraper import query_tnedistrict_status, query_tnedistrict_status_async, close_scraper
+from utils import bulk
+import argparse, asyncio, json, sys, time
+
+# python test_scrape.py [TN-...]                       debug scrape of one number (visible browser)
+# python test_scrape.py --csv numbers.csv [--out results.csv] [--concurrency 4]
+#                                                      bulk check, results as CSV
+ap = argparse.ArgumentParser(description="TN eDistrict status check, single or bulk")
+ap.add_argument("app_no", nargs="?", default="TN-2120251031226")
+ap.add_argument("--csv", help="CSV / text file with TN-... numbers to check in bulk")
+ap.add_argument("--out", help="results CSV (default: stdout)")
+ap.add_argument("--concurrency", type=int, default=4)
+ap.add_argument("--refresh", action="store_true", help="ignore cached results")
+args = ap.parse_args()
+
+if not args.csv:
+    print("Running debug scrape for", args.app_no)
+    res = query_tnedistrict_status(args.app_no, headless=False, timeout_ms=60000, refresh=args.refresh)
+    print(json.dumps(res, indent=2, ensure_ascii=False))
+    sys.exit(0)
+
+
+async def progress(done, total, counts):
+    print(f"\r{done}/{total}  {bulk.summary(counts)}", end="", file=sys.stderr, flush=True)
+
+
+async def run(app_nos):
+    try:
+        return await bulk.check_many(
+            app_nos,
+            lambda a: query_tnedistrict_status_async(a, refresh=args.refresh),
+            concurrency=args.concurrency,
+            on_progress=progress,
+        )
+    finally:
+        await close_scraper()
+
+
+with open(args.csv, encoding="utf-8-sig", errors="replace") as f:
+    app_nos = bulk.read_app_numbers(f.read())
+print(f"Checking {len(app_nos)} numbers from {args.csv}", file=sys.stderr)
+t0 = time.monotonic()
+rows = asyncio.run(run(app_nos))
+print(f"\nDone in {time.monotonic() - t0:.1f}s", file=sys.stderr)
+out = bulk.to_csv(rows)
+if args.out:
+    with open(args.out, "w", encoding="utf-8-sig", newline="") as f:
+        f.write(out)
+else:
+    sys.stdout.write(out)
@@ -0,0 +1,6 @@
+# tests/conftest.py
+# Run from the repo root: python -m pytest tests
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,37 @@
+import os
+import time
+
+from utils.artifact_store import ArtifactStore
+
+
+def test_put_dedupes_and_find_by_key(tmp_path):
+    store = ArtifactStore(tmp_path)
+    p1 = store.put("TN-1", "afterclick", "html", "<html>same</html>")
+    p2 = store.put("TN-2", "afterclick", "html", "<html>same</html>")
+    assert p1 == p2 and p1.endswith(".html.gz")
+    assert store.read(p1) == b"<html>same</html>"
+    assert [a["key"] for a in store.find("TN-1")] == ["TN-1"]
+    assert store.stats()["files"] == 1
+
+
+def test_prune_applies_age_and_budget(tmp_path):
+    store = ArtifactStore(tmp_path, max_bytes=10**6, max_age_s={"html": 60})
+    old = store.put("TN-1", "a", "html", "old")
+    store._db.execute("UPDATE artifacts SET created = ?", (time.time() - 120,))
+    store.put("TN-2", "b", "png", b"\x89PNG" + os.urandom(100))
+    out = store.prune()
+    assert out["artifacts_removed"] == 1
+    assert not os.path.exists(old)
+
+    store.max_bytes = 1
+    store.prune()
+    assert store.stats()["artifacts"] == 0 and store.stats()["bytes"] == 0
+
+
+def test_prune_leaves_foreign_files_alone(tmp_path):
+    legacy = tmp_path / "after_search_123456789012.html"
+    legacy.write_text("committed capture")
+    os.utime(legacy, (0, 0))
+    store = ArtifactStore(tmp_path, default_max_age_s=1)
+    store.prune()
+    assert legacy.exists()
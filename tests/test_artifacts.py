@@ -0,0 +1,51 @@
+import pytest
+
+from utils.artifact_store import ArtifactStore
+from utils.artifacts import ArtifactPolicy
+
+
+def kept(mode, outcomes, **kw):
+    policy = ArtifactPolicy("unused", mode=mode, **kw)
+    return [policy.wants(failed) for failed in outcomes]
+
+
+def test_modes_decide_which_runs_are_kept():
+    runs = [False, True, False, False, True, False]
+    assert kept("off", runs) == [False] * 6
+    assert kept("always", runs) == [True] * 6
+    assert kept("failure", runs) == runs
+    # every failure, plus every 2nd successful run
+    assert kept("sample", runs, sample_every=2) == [False, True, True, False, True, True]
+
+
+def test_counters_and_bad_mode():
+    policy = ArtifactPolicy("unused", mode="failure")
+    policy.wants(True)
+    policy.wants(False)
+    assert policy.stats()["kept"] == 1 and policy.stats()["skipped"] == 1
+    with pytest.raises(ValueError):
+        ArtifactPolicy("unused", mode="sometimes")
+
+
+def test_screenshot_options():
+    assert ArtifactPolicy("d").screenshot_options() == {"type": "jpeg", "full_page": False, "quality": 60}
+    png = ArtifactPolicy("d", image_format="png", full_page=True)
+    assert png.screenshot_options() == {"type": "png", "full_page": True} and png.image_ext == "png"
+
+
+def test_save_wait_writes_into_the_store_before_returning(tmp_path):
+    store = ArtifactStore(tmp_path / "shots")
+    policy = ArtifactPolicy(tmp_path / "loose", store=store)
+    path = policy.save("TN-1_fail", "jpg", b"\xff\xd8jpeg", wait=True, key="TN-1")
+    assert store.read(path) == b"\xff\xd8jpeg"
+    assert [a["name"] for a in store.find("TN-1")] == ["TN-1_fail"]
+    assert not (tmp_path / "loose").exists()
+    assert policy.stats()["written"] == 1
+
+
+def test_background_save_lands_after_flush(tmp_path):
+    policy = ArtifactPolicy(tmp_path)
+    path = policy.save("TN-1_page", "html", "<html></html>")
+    policy.flush()
+    assert open(path).read() == "<html></html>"
+    assert policy.stats()["pending"] == 0 and policy.counters["bytes"] == 13
@@ -0,0 +1,98 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import bot
+from utils.cert_archive import CertArchive
+from utils.delivery import Delivery
+from utils.jobs import JobStore
+from utils.sessions import SessionStore
+
+PARSED = {"applicant_name": "A", "request_for": "Community Certificate", "status_text": "Approved"}
+
+
+class FakeBot:
+    id = 1
+
+    def __init__(self):
+        self.sent = []
+
+    async def send_document(self, chat_id, document, **kwargs):
+        self.sent.append((chat_id, document))
+        return SimpleNamespace(document=None)
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent.append((chat_id, text))
+
+
+class FakeQuery:
+    def __init__(self, user_id, data):
+        self.from_user = SimpleNamespace(id=user_id)
+        self.data = data
+        self.edits = []
+
+    async def answer(self, *args, **kwargs):
+        pass
+
+    async def edit_message_text(self, text, **kwargs):
+        self.edits.append(text)
+
+
+@pytest.fixture
+def stores(tmp_path, monkeypatch):
+    monkeypatch.setattr(bot, "sessions", SessionStore(tmp_path / "s.sqlite3", "tnega"))
+    monkeypatch.setattr(bot, "cert_archive", CertArchive(tmp_path / "c.sqlite3"))
+    monkeypatch.setattr(bot, "delivery", Delivery(tmp_path / "f.sqlite3"))
+    monkeypatch.setattr(bot, "job_store", JobStore(tmp_path / "j.sqlite3"))
+    return bot
+
+
+def confirm(user_id, fake_bot):
+    query = FakeQuery(user_id, "CONFIRM_YES")
+    update = SimpleNamespace(callback_query=query)
+    asyncio.run(bot.on_confirm(update, SimpleNamespace(bot=fake_bot)))
+    return query
+
+
+def test_archived_certificate_goes_to_any_chat_confirming_the_number(stores):
+    job = stores.job_store.create("TN-1", PARSED, 100)
+    stores.cert_archive.put("TN-1", "archived-fid", job_id=job["job_id"])
+    stores.sessions.update(200, last_app="TN-1", last_parsed=PARSED)  # a family member
+
+    fake_bot = FakeBot()
+    query = confirm(200, fake_bot)
+    assert fake_bot.sent == [(200, "archived-fid")]
+    assert "certificate" in query.edits[0]
+    assert len(stores.job_store.for_user(200)) == 0
+
+
+def test_bulk_file_from_a_non_admin_is_refused():
+    replies = []
+
+    class Message:
+        from_user = SimpleNamespace(id=bot.config.ADMIN_CHAT_ID + 1)
+        document = None  # never downloaded
+
+        async def reply_text(self, text, **kwargs):
+            replies.append(text)
+
+    asyncio.run(bot.on_admin_bulk(SimpleNamespace(message=Message()), SimpleNamespace()))
+    assert replies == ["இந்த செயல்பாடு admin க்கு மட்டும்."]
+
+
+def test_pending_check_keeps_only_status_and_data_in_the_session(stores, monkeypatch):
+    result = {"status": "pending", "data": {"status_text": "At VAO", "remarks": ""},
+              "raw_text": "page", "debug": {"timings": {"get": 1}, "html": "<html>"}}
+
+    async def lookup(app_no, *args, **kwargs):
+        return result
+
+    class Message:
+        async def reply_text(self, text, **kwargs):
+            pass
+
+    monkeypatch.setattr(bot, "query_tnedistrict_status_async", lookup)
+    update = SimpleNamespace(message=Message(), effective_user=SimpleNamespace(id=5))
+    asyncio.run(bot.cmd_check(update, SimpleNamespace(args=["TN-1"])))
+    assert stores.sessions.get(5)["last_result"] == {"status": "pending", "data": result["data"]}
@@ -0,0 +1,63 @@
+import time
+
+from utils import breaker
+from utils.breaker import CircuitBreaker
+
+
+def test_opens_after_threshold_and_rejects():
+    b = CircuitBreaker("t", failure_threshold=2, open_s=60)
+    b.failure("Timeout")
+    assert b.allow()
+    b.failure("Timeout")
+    assert b.state == breaker.OPEN
+    assert not b.allow()
+    assert 55 < b.retry_after() <= 60
+
+
+def test_success_resets_failure_count():
+    b = CircuitBreaker("t", failure_threshold=2)
+    b.failure("Timeout")
+    b.success()
+    b.failure("Timeout")
+    assert b.state == breaker.CLOSED
+
+
+def test_half_open_trial_success_closes():
+    b = CircuitBreaker("t", failure_threshold=1, open_s=0.01)
+    b.failure("Timeout")
+    time.sleep(0.02)
+    assert b.allow()                      # no probe: the next real call is the trial
+    assert b.state == breaker.HALF_OPEN
+    b.success()
+    assert b.state == breaker.CLOSED
+    assert b.allow() and b.allow()
+
+
+def test_half_open_trial_failure_reopens_with_longer_wait():
+    b = CircuitBreaker("t", failure_threshold=1, open_s=0.01)
+    b.failure("Timeout")
+    time.sleep(0.02)
+    assert b.allow()
+    b.failure("Timeout again")
+    assert b.state == breaker.OPEN
+    assert b.stats()["open_s"] == 0.02
+
+
+def test_half_open_retry_after_is_not_zero_while_trial_runs():
+    b = CircuitBreaker("t", failure_threshold=1, open_s=5)
+    b.failure("Timeout")
+    b._opened_at -= 5                     # open_s elapsed
+    assert b.allow()                      # the trial
+    assert not b.allow()                  # everyone else waits for it
+    assert b.state == breaker.HALF_OPEN
+    assert b.retry_after() >= 1
+
+
+def test_probe_moves_open_to_half_open():
+    b = CircuitBreaker("t", probe=lambda: True, failure_threshold=1, open_s=0, probe_interval_s=0.01)
+    b.failure("ConnectError")
+    deadline = time.monotonic() + 2
+    while b.state == breaker.OPEN and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert b.state == breaker.HALF_OPEN
+    assert b.allow()
@@ -0,0 +1,56 @@
+import asyncio
+import csv
+import io
+from collections import Counter
+
+from utils import bulk
+
+
+def test_read_app_numbers_from_csv_skips_bad_rows_and_repeats():
+    text = ("name,application\n"
+            "Ravi,tn-2120251031226\n"
+            "Mala,TN-12\n"            # too short
+            "Arun,not a number\n"
+            ",\n"
+            "Ravi again,TN-2120251031226\n"
+            "Devi,TN-2120251031999;extra\n")
+    assert bulk.read_app_numbers(text) == ["TN-2120251031226", "TN-2120251031999"]
+    assert bulk.read_app_numbers("") == []
+
+
+def test_check_many_keeps_input_order_and_bounds_concurrency():
+    running, peak, progress = [0], [0], []
+
+    async def check(app_no):
+        running[0] += 1
+        peak[0] = max(peak[0], running[0])
+        await asyncio.sleep(0.01 if app_no.endswith("1") else 0)
+        running[0] -= 1
+        if app_no == "TN-003":
+            raise RuntimeError("boom")
+        return {"status": "pending", "data": {"applicant_name": "A", "unknown": "x"}}
+
+    async def on_progress(done, total, counts):
+        progress.append((done, total))
+
+    rows = asyncio.run(bulk.check_many(["TN-001", "TN-002", "TN-003"], check, concurrency=2,
+                                       on_progress=on_progress))
+    assert [r["input"] for r in rows] == ["TN-001", "TN-002", "TN-003"]
+    assert [r["status"] for r in rows] == ["pending", "pending", "error"]
+    assert rows[2]["error"] == "Exception: boom"
+    assert peak[0] == 2 and progress[-1] == (3, 3)
+
+
+def test_csv_output_columns():
+    rows = [bulk.result_row("TN-1", {"status": "approved", "data": {"status_text": "Issued", "debug": "x"}}),
+            bulk.result_row("TN-2", {"status": "unavailable", "raw_text": "site down\nmore"})]
+    out = list(csv.reader(io.StringIO(bulk.to_csv(rows))))
+    assert out[0] == list(bulk.COLUMNS)
+    assert out[0][:2] == ["input", "status"] and out[0][-2:] == ["error", "elapsed_s"]
+    first = dict(zip(out[0], out[1]))
+    assert first["status_text"] == "Issued" and first["error"] == ""
+    assert dict(zip(out[0], out[2]))["error"] == "site down"
+
+
+def test_summary():
+    assert bulk.summary(Counter({"pending": 1, "approved": 3})) == "approved 3, pending 1"
@@ -0,0 +1,54 @@
+import os
+import time
+
+from utils.cert_archive import CertArchive
+
+
+def write(path, size):
+    path.write_bytes(b"x" * size)
+    return str(path)
+
+
+def test_get_normalizes_and_reports_missing_copy(tmp_path):
+    a = CertArchive(tmp_path / "c.sqlite3")
+    a.put(" tn-1 ", "fid", path=str(tmp_path / "gone.pdf"), job_id="JOB-1")
+    entry = a.get("TN-1")
+    assert entry["file_id"] == "fid" and entry["path"] is None
+    assert a.get("TN-2") is None
+
+
+def test_prune_drops_old_entries_with_their_files(tmp_path):
+    a = CertArchive(tmp_path / "c.sqlite3", max_age_s=60)
+    old = write(tmp_path / "old.pdf", 10)
+    a.put("TN-1", "f1", path=old, size=10)
+    a.put("TN-2", "f2")
+    a._db.execute("UPDATE certificates SET fetched_at = ? WHERE app_no = 'TN-1'", (time.time() - 120,))
+    out = a.prune()
+    assert out == {"entries_removed": 1, "files_removed": 1, "bytes": 10}
+    assert not os.path.exists(old)
+    assert a.get("TN-1") is None and a.get("TN-2") is not None
+
+
+def test_prune_keeps_recently_delivered_copies_within_budget(tmp_path):
+    a = CertArchive(tmp_path / "c.sqlite3", max_bytes=25)
+    paths = {}
+    for i, app_no in enumerate(("TN-1", "TN-2", "TN-3")):
+        paths[app_no] = write(tmp_path / f"{app_no}.pdf", 10)
+        a.put(app_no, f"f{i}", path=paths[app_no], size=10)
+    a._db.execute("UPDATE certificates SET fetched_at = fetched_at - 100 WHERE app_no = 'TN-1'")
+    a.delivered("TN-1")                      # used most recently: kept
+    out = a.prune()
+    assert out["files_removed"] == 1 and out["entries_removed"] == 0
+    kept = {k for k, p in paths.items() if os.path.exists(p)}
+    assert "TN-1" in kept and len(kept) == 2
+    dropped = (set(paths) - kept).pop()
+    entry = a.get(dropped)
+    assert entry is not None and entry["path"] is None   # file_id alone still delivers
+
+
+def test_set_path_after_download(tmp_path):
+    a = CertArchive(tmp_path / "c.sqlite3")
+    a.put("TN-1", "fid", path=None)
+    p = write(tmp_path / "TN-1.pdf", 7)
+    a.set_path("tn-1", p, 7)
+    assert a.get("TN-1")["path"] == p and a.stats()["bytes"] == 7
@@ -0,0 +1,104 @@
+import asyncio
+import os
+from types import SimpleNamespace
+
+from telegram import InputFile
+from telegram.error import BadRequest
+
+from utils.delivery import Delivery
+
+
+class FakeBot:
+    id = 9
+
+    def __init__(self, rejected=()):
+        self.rejected = set(rejected)
+        self.sent = []
+        self.uploads = 0
+
+    async def send_document(self, chat_id, document, **kwargs):
+        if isinstance(document, InputFile):
+            self.uploads += 1
+            self.sent.append((chat_id, "upload"))
+            return SimpleNamespace(document=SimpleNamespace(file_id=f"fid-{self.uploads}", file_unique_id="u"))
+        if document in self.rejected:
+            raise BadRequest("Wrong file identifier")
+        self.sent.append((chat_id, document))
+        return SimpleNamespace(document=SimpleNamespace(file_id=document, file_unique_id="u"))
+
+    async def get_file(self, file_id):
+        if file_id == "missing":
+            raise BadRequest("File not found")
+
+        async def download_to_drive(dest):
+            dest.write_bytes(b"%PDF-1.4 archived")
+
+        return SimpleNamespace(file_unique_id="u", download_to_drive=download_to_drive)
+
+
+def pdf(tmp_path, name="card.pdf", data=b"%PDF-1.4 card"):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return path
+
+
+def test_local_file_is_uploaded_once_then_sent_by_file_id(tmp_path):
+    d, bot, path = Delivery(tmp_path / "f.sqlite3"), FakeBot(), pdf(tmp_path)
+    asyncio.run(d.send_document(bot, 1, path))
+    asyncio.run(d.send_document(bot, 2, path))
+    assert bot.sent == [(1, "upload"), (2, "fid-1")]
+    assert d.counters["uploads"] == 1 and d.counters["cache_hits"] == 1
+
+
+def test_changed_file_is_uploaded_again(tmp_path):
+    d, bot, path = Delivery(tmp_path / "f.sqlite3"), FakeBot(), pdf(tmp_path)
+    asyncio.run(d.send_document(bot, 1, path))
+    pdf(tmp_path, data=b"%PDF-1.4 regenerated card")
+    assert d.cached(bot.id, path) is None
+    asyncio.run(d.send_document(bot, 1, path))
+    assert bot.uploads == 2
+
+
+def test_rejected_file_id_falls_back_to_a_local_upload(tmp_path):
+    d, path = Delivery(tmp_path / "f.sqlite3"), pdf(tmp_path)
+    asyncio.run(d.send_document(FakeBot(), 1, path))  # caches fid-1
+    bot = FakeBot(rejected={"fid-1"})
+    bot.uploads = 1
+    asyncio.run(d.send_document(bot, 1, path))
+    assert bot.sent == [(1, "upload")]
+    assert d.counters["stale"] == 1 and d.cached(bot.id, path) == "fid-2"
+
+
+def test_explicit_file_id_is_forwarded(tmp_path):
+    d, bot = Delivery(tmp_path / "f.sqlite3"), FakeBot()
+    asyncio.run(d.send_document(bot, 1, file_id="operator-fid"))
+    assert bot.sent == [(1, "operator-fid")] and d.counters["by_file_id"] == 1
+
+
+def test_archive_calls_on_saved_once_the_file_is_on_disk(tmp_path):
+    d, bot = Delivery(tmp_path / "f.sqlite3"), FakeBot()
+    dest = tmp_path / "downloads" / "TN-1.pdf"
+    saved = []
+
+    def on_saved(path, size):
+        saved.append((path, size, os.path.getsize(path)))
+
+    async def run():
+        task = d.archive(bot, "op-fid", dest, on_saved=on_saved)
+        assert saved == []  # the download runs in the background
+        await task
+
+    asyncio.run(run())
+    assert saved == [(str(dest), 17, 17)]
+    assert d.cached(bot.id, dest) == "op-fid"  # the saved copy reuses the same file_id
+
+
+def test_failed_archive_skips_on_saved(tmp_path):
+    d, saved = Delivery(tmp_path / "f.sqlite3"), []
+
+    async def run():
+        await d.archive(FakeBot(), "missing", tmp_path / "x.pdf", on_saved=lambda *a: saved.append(a))
+        await d.drain()
+
+    asyncio.run(run())
+    assert saved == [] and d.counters["archive_failed"] == 1
@@ -0,0 +1,61 @@
+import asyncio
+import time
+
+from utils.dispatch import Dispatcher
+from utils.jobs import JobStore
+
+PARSED = {"applicant_name": "A", "request_for": "Community Certificate", "status_text": "Approved"}
+
+
+def make_dispatcher(tmp_path, operators=(1, 2)):
+    offers = []
+
+    async def offer(operator_id, job, reason):
+        offers.append((operator_id, job["job_id"], reason))
+
+    store = JobStore(tmp_path / "jobs.sqlite3")
+    return Dispatcher(store, operators, offer, lease_s=60), offers
+
+
+def test_jobs_go_to_the_least_loaded_operator(tmp_path):
+    disp, offers = make_dispatcher(tmp_path)
+    for i in range(4):
+        asyncio.run(disp.route(disp.store.create(f"TN-{i}", PARSED, 42)))
+    assert sorted(o[0] for o in offers) == [1, 1, 2, 2]
+    assert all(reason == "new" for _, _, reason in offers)
+
+
+def test_nobody_online_queues_until_the_sweep(tmp_path):
+    disp, offers = make_dispatcher(tmp_path)
+    disp.set_online(1, False)
+    disp.set_online(2, False)
+    job = disp.store.create("TN-1", PARSED, 42)
+    assert asyncio.run(disp.route(job)) is None
+    assert asyncio.run(disp.sweep_once()) == 0
+    disp.set_online(2, True)
+    assert asyncio.run(disp.sweep_once()) == 1
+    assert offers == [(2, job["job_id"], "rerouted")]
+
+
+def test_take_refusals(tmp_path):
+    disp, _ = make_dispatcher(tmp_path)
+    job = disp.store.create("TN-1", PARSED, 42)
+    assert disp.take(job["job_id"], 1)[0]["operator_id"] == 1
+    assert disp.take(job["job_id"], 1)[1] == ""  # own claim renews
+    assert disp.take(job["job_id"], 2) == (None, "taken")
+    assert disp.complete(job["job_id"], 1)[1] == ""
+    assert disp.take(job["job_id"], 2) == (None, "done")
+    assert disp.take("JOB-0", 2) == (None, "missing")
+
+
+def test_expired_lease_returns_to_the_queue(tmp_path):
+    disp, offers = make_dispatcher(tmp_path)
+    job = disp.store.create("TN-1", PARSED, 42)
+    disp.take(job["job_id"], 1)
+    disp.store._db.execute("UPDATE jobs SET lease_until = ?", (int(time.time()) - 1,))
+    assert asyncio.run(disp.sweep_once()) == 1
+    assert disp.counters["expired"] == 1
+    assert offers[0][1:] == (job["job_id"], "expired")
+    assert disp.store.get(job["job_id"])["state"] == "pending_admin"
+    expired = {s["operator_id"]: s["expired"] for s in disp.stats()}
+    assert expired[1] == 1
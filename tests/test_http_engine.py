@@ -0,0 +1,98 @@
+import asyncio
+import functools
+from pathlib import Path
+from urllib.parse import parse_qs
+
+import httpx
+
+from utils import http_engine
+from utils.tnega_status import extract
+
+FIXTURES = Path(__file__).resolve().parents[1] / "bench" / "fixtures" / "edistrict"
+URL = "https://tnedistrict.example/tneda/VerifyCerti.xhtml"
+
+
+def fixture(name, app_no="TN-1"):
+    page = (FIXTURES / f"{name}.html").read_text(encoding="utf-8")
+    return page.replace("%RESULT%", "").replace("%VIEWSTATE%", "vs-1").replace("%APP_NO%", app_no)
+
+
+def partial(fragment):
+    return ('<?xml version="1.0" encoding="UTF-8"?><partial-response><changes>'
+            f'<update id="form1:resultPanel"><![CDATA[{fragment}]]></update>'
+            '<update id="j_id1:javax.faces.ViewState:0"><![CDATA[vs-2]]></update>'
+            '</changes></partial-response>')
+
+
+class Upstream:
+    """VerifyCerti as the site serves it: the first GET is redirected once, setting the
+    session cookie on the redirect; a POST without that session gets the JSF redirect."""
+
+    def __init__(self, result="approved"):
+        self.result = result
+        self.posts = []
+
+    def __call__(self, request):
+        if request.method == "GET" and "redirected" not in request.url.query.decode():
+            return httpx.Response(302, headers={"Location": URL + "?redirected=1",
+                                                "Set-Cookie": "JSESSIONID=s1; Path=/tneda"})
+        if request.method == "GET":
+            return httpx.Response(200, text=fixture("form"))
+        form = {k: v[0] for k, v in parse_qs(request.content.decode()).items()}
+        self.posts.append((dict(request.headers), form))
+        if "JSESSIONID=s1" not in request.headers.get("cookie", ""):
+            return httpx.Response(200, text="<partial-response><redirect url='/expired'/></partial-response>")
+        return httpx.Response(200, text=partial(fixture(self.result, form.get("form1:acknumber", ""))))
+
+
+def fetch(monkeypatch, handler, app_no="TN-1"):
+    monkeypatch.setattr(http_engine.httpx, "AsyncClient",
+                        functools.partial(httpx.AsyncClient, transport=httpx.MockTransport(handler)))
+
+    async def run():
+        try:
+            return await http_engine.fetch_status(app_no, URL)
+        finally:
+            await http_engine.close_client()
+
+    return asyncio.run(run())
+
+
+def test_parser_reads_the_jsf_form():
+    page = http_engine._parse(fixture("form"))
+    form = page.forms[0]
+    assert form["id"] == "form1" and form["action"] == "/tneda/VerifyCerti.xhtml"
+    assert form["inputs"]["javax.faces.ViewState"] == {"type": "hidden", "value": "vs-1"}
+    assert http_engine.ACK_FIELD in form["inputs"]
+    assert "form1:acksearch" in page.ids and not page.captcha
+
+
+def test_parser_text_has_tab_separated_cells():
+    text = http_engine._parse(fixture("approved", "TN-5")).text()
+    assert "Application Number\tTN-5" in text
+    assert extract(text)[0] == "approved"
+    assert http_engine._parse(fixture("captcha")).captcha
+
+
+def test_form_post_keeps_the_session_cookie_from_the_redirect(monkeypatch):
+    upstream = Upstream()
+    res = fetch(monkeypatch, upstream, "TN-2120251031226")
+    assert res["ok"], res["reason"]
+    assert extract(res["text"])[1]["app_no"] == "TN-2120251031226"
+    headers, form = upstream.posts[0]
+    assert "JSESSIONID=s1" in headers["cookie"]
+    assert headers["faces-request"] == "partial/ajax"
+    assert form["javax.faces.ViewState"] == "vs-1"
+    assert form["form1:acknumber"] == "TN-2120251031226"
+    assert form["javax.faces.source"] == "form1:acksearch"
+    assert "vs-2" not in res["text"]
+
+
+def test_captcha_escalates(monkeypatch):
+    res = fetch(monkeypatch, Upstream("captcha"))
+    assert not res["ok"] and res["reason"] == "captcha"
+
+
+def test_server_error_on_get(monkeypatch):
+    res = fetch(monkeypatch, lambda request: httpx.Response(503))
+    assert not res["ok"] and res["reason"] == "GET 503"
@@ -0,0 +1,66 @@
+import time
+
+from utils.jobs import JobStore
+
+PARSED = {"applicant_name": "A", "request_for": "Community Certificate", "status_text": "Approved"}
+
+
+def make_store(tmp_path):
+    return JobStore(tmp_path / "jobs.sqlite3")
+
+
+def test_complete_only_once(tmp_path):
+    store = make_store(tmp_path)
+    job = store.create("TN-1", PARSED, 42)
+    assert store.take(job["job_id"], 1, lease_s=60)
+    assert store.complete(job["job_id"], 1)["state"] == "done"
+    assert store.complete(job["job_id"], 1) is None
+
+
+def test_complete_refused_while_another_operator_holds_the_lease(tmp_path):
+    store = make_store(tmp_path)
+    job = store.create("TN-1", PARSED, 42)
+    store.take(job["job_id"], 1, lease_s=60)
+    assert store.complete(job["job_id"], 2) is None
+    store._db.execute("UPDATE jobs SET lease_until = ?", (int(time.time()) - 1,))
+    assert store.complete(job["job_id"], 2)["operator_id"] == 2
+
+
+def test_complete_waiting_job_without_take(tmp_path):
+    store = make_store(tmp_path)
+    job = store.create("TN-1", PARSED, 42)
+    assert store.complete(job["job_id"], 7)["operator_id"] == 7
+    assert store.complete("JOB-0", 7) is None
+
+
+def test_ids_are_unique_within_a_second(tmp_path):
+    store = make_store(tmp_path)
+    ids = [store.create(f"TN-{i}", PARSED, 42)["job_id"] for i in range(3)]
+    assert len(set(ids)) == 3
+    assert all(i.startswith("JOB-") for i in ids)
+
+
+def test_create_copies_parsed_fields_and_lists(tmp_path):
+    store = make_store(tmp_path)
+    job = store.create("TN-1", PARSED, 42)
+    got = store.get(job["job_id"])
+    assert got["name"] == "A" and got["service"] == "Community Certificate" and got["state"] == "pending_admin"
+    assert [j["job_id"] for j in store.open_jobs()] == [job["job_id"]]
+    assert [j["job_id"] for j in store.for_user(42)] == [job["job_id"]]
+    assert store.stats() == {"pending_admin": 1, "in_progress": 0, "done": 0}
+
+
+def test_import_tasks_json_keeps_unknown_keys(tmp_path):
+    import json
+    from utils.jobs import migrate_tasks_json
+
+    path = tmp_path / "tasks.json"
+    path.write_text(json.dumps({"jobs": [
+        {"job_id": "JOB-1", "app_no": "TN-1", "user_chat_id": 5, "state": "done", "created_at": 1, "note": "x"},
+        {"app_no": "no id"},
+    ]}))
+    store = make_store(tmp_path)
+    assert migrate_tasks_json(store, path) == 1
+    assert not path.exists() and (tmp_path / "tasks.json.imported").exists()
+    assert store.get("JOB-1")["note"] == "x"
+    assert migrate_tasks_json(store, path) == 0
@@ -0,0 +1,104 @@
+import asyncio
+
+from utils.browser_pool import BrowserPool, PagePool, _Slot
+
+
+class FakePage:
+    def __init__(self, context):
+        self.context = context
+        self.url = ""
+        self._closed = False
+
+    async def goto(self, url, **kw):
+        self.url = url
+
+    async def wait_for_selector(self, selector, **kw):
+        pass
+
+    async def evaluate(self, js):
+        return "form"
+
+    def is_closed(self):
+        return self._closed
+
+    async def close(self):
+        self._closed = True
+
+
+class FakeContext:
+    def __init__(self):
+        self.pages = []
+        self.closed = False
+
+    async def new_page(self):
+        page = FakePage(self)
+        self.pages.append(page)
+        return page
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def is_connected(self):
+        return True
+
+    async def new_context(self, **kw):
+        return FakeContext()
+
+    async def close(self):
+        pass
+
+
+class FakeBrowserPool(BrowserPool):
+    async def start(self):
+        if self._started:
+            return
+        self._browsers = [FakeBrowser() for _ in range(self.size)]
+        self._relaunch_locks = [asyncio.Lock() for _ in range(self.size)]
+        self._idle = asyncio.Queue()
+        for i in range(self.size):
+            for _ in range(self.contexts_per_browser):
+                slot = _Slot(i)
+                await self._ensure_context(slot)
+                self._idle.put_nowait(slot)
+        self._started = True
+
+    async def close(self):
+        self._started = False
+
+
+def test_pooled_page_recycles_its_context():
+    async def run():
+        browsers = FakeBrowserPool(size=1, contexts_per_browser=1, max_context_uses=3)
+        pool = PagePool(browsers, "https://example.test/form", "#ack", reset_js="() => 0")
+        contexts = []
+        for _ in range(7):
+            async with pool.page() as lease:
+                contexts.append(lease.slot.lease.context)
+            await asyncio.gather(*pool._tasks)
+        return browsers, pool, contexts
+
+    browsers, pool, contexts = asyncio.run(run())
+    assert len({id(c) for c in contexts}) == 3  # 3 + 3 + 1 queries
+    assert contexts[0] is contexts[2] and contexts[3] is not contexts[2]
+    assert contexts[0].closed and contexts[3].closed and not contexts[6].closed
+    assert pool.counters["context_recycles"] == 2
+    assert browsers.counters["context_creates"] == 3
+    assert browsers.counters["checkins"] == 2 and browsers._in_use == 1
+
+
+def test_broken_page_discards_context_early():
+    async def run():
+        browsers = FakeBrowserPool(size=1, contexts_per_browser=1, max_context_uses=50)
+        pool = PagePool(browsers, "https://example.test/form", "#ack")
+        lease = await pool.acquire()
+        first = lease.slot.lease.context
+        pool.release(lease, broken=True)
+        await asyncio.gather(*pool._tasks)
+        lease = await pool.acquire()
+        return pool, first, lease.slot.lease.context
+
+    pool, first, second = asyncio.run(run())
+    assert first.closed and second is not first
+    assert pool.counters["broken"] == 1 and pool.counters["context_recycles"] == 0
@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from utils import ratelimit
+from utils.ratelimit import RateLimited, TokenBucket
+
+
+def test_burst_then_wait():
+    b = TokenBucket(rate=10, burst=2)
+    assert b.reserve() == 0
+    assert b.reserve() == 0
+    assert 0.05 < b.reserve() <= 0.1
+    assert b.expected_wait() > 0.1
+
+
+def test_max_wait_rejects_without_taking_a_token():
+    b = TokenBucket(rate=1, burst=1)
+    b.reserve()
+    with pytest.raises(RateLimited):
+        b.reserve(max_wait=0.1)
+    assert b.counters["rejected"] == 1
+    assert b.counters["acquired"] == 1
+
+
+def test_penalize_once_per_gap_and_floor():
+    b = TokenBucket(rate=1, burst=1, min_rate=0.3, backoff=0.5, backoff_gap_s=60)
+    b.penalize()
+    b.penalize()                          # same incident
+    assert b.rate == 0.5
+    b._penalized_at -= 60
+    b.penalize()
+    assert b.rate == 0.3
+
+
+def test_success_recovers_after_cooldown():
+    b = TokenBucket(rate=1, burst=1, recover=0.5, cooldown_s=30)
+    b.penalize()
+    b.success()
+    assert b.rate == 0.5                  # still cooling down
+    b._penalized_at -= 30
+    b.success()
+    b.success()
+    assert b.rate == 1.0
+
+
+def test_cancelled_async_wait_returns_token():
+    b = TokenBucket(rate=1, burst=1)
+    b.reserve()
+
+    async def go():
+        task = asyncio.ensure_future(b.acquire_async())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(go())
+    assert b.waiting == 0
+    assert b.expected_wait() < 1.0
+
+
+def test_registry_keys_by_host_and_port():
+    assert ratelimit.host_of("https://Example.org/a") == "example.org"
+    assert ratelimit.host_of("http://127.0.0.1:8081/x") == "127.0.0.1:8081"
+    assert ratelimit.limiter("http://h.test/a") is ratelimit.limiter("http://h.test/b")
@@ -0,0 +1,42 @@
+from utils import resource_rules
+from utils.resource_rules import block_reason, blocked_url_patterns, rules_for
+
+
+def test_site_rules_match_subdomains_and_fall_back_to_default():
+    assert rules_for("https://www.tnedistrict.tn.gov.in/tneda/x")["block_third_party"] is True
+    assert rules_for("claim.cmchistn.com")["block_types"] == ["media"]
+    assert rules_for("https://example.org/") == resource_rules.DEFAULT_RULES
+
+
+def test_overrides_merge_over_the_site_rules(monkeypatch):
+    monkeypatch.setattr(resource_rules, "_OVERRIDES", {
+        "tnedistrict.tn.gov.in": {"block_types": ["image"]},
+        "new.example.org": {"block_third_party": True, "first_party": ["new.example.org"]},
+    })
+    rules = rules_for("tnedistrict.tn.gov.in")
+    assert rules["block_types"] == ["image"]
+    assert rules["first_party"] == ["tnedistrict.tn.gov.in"]  # kept from SITE_RULES
+    new = rules_for("https://new.example.org/page")
+    assert new["block_third_party"] is True and new["block_types"] == ["media"]  # rest from DEFAULT_RULES
+    assert rules_for("tnedistrict.tn.gov.in") is not rules_for("tnedistrict.tn.gov.in")
+
+
+def test_block_reasons():
+    rules = rules_for("tnedistrict.tn.gov.in")
+    site = "https://tnedistrict.tn.gov.in/tneda/"
+    assert block_reason(rules, site + "VerifyCerti.xhtml", "document") is None
+    assert block_reason(rules, site + "logo.png", "image") == "type:image"
+    assert block_reason(rules, "https://www.google-analytics.com/a.js", "script") == "host"
+    assert block_reason(rules, "https://cdn.example.net/jquery.js", "script") == "third_party"
+    assert block_reason(rules, site + "app.js", "script") is None
+    assert block_reason(rules, "data:image/png;base64,xx", "image") is None
+
+
+def test_blocked_url_patterns_cover_hosts_and_types():
+    rules = {"block_hosts": ["doubleclick.net"], "block_types": ["font", "stylesheet", "xhr"]}
+    pats = blocked_url_patterns(rules)
+    assert pats[0] == "*doubleclick.net*"
+    assert "*.woff*" in pats and "*.css*" in pats
+    assert len(pats) == 1 + 4 + 1  # xhr has no URL pattern
+    cmchis = blocked_url_patterns(rules_for("claim.cmchistn.com"))
+    assert "*.png*" not in cmchis and "*.mp4*" in cmchis
@@ -0,0 +1,64 @@
+import time
+
+from utils.result_cache import ResultCache
+
+
+def approved(text="Approved"):
+    return {"status": "approved", "data": {"status_text": text}, "raw_text": "", "page_url": "u",
+            "screenshot": "shot.png", "debug": {"engine": "http"}}
+
+
+def test_hit_strips_lookup_artifacts():
+    cache = ResultCache()
+    assert cache.put("tn-1 ", approved())
+    hit = cache.get("TN-1")
+    assert hit["data"] == {"status_text": "Approved"}
+    assert hit["screenshot"] == "" and hit["debug"]["cache"]["hit"] is True
+    assert cache.stats()["hits"] == 1
+
+
+def test_error_and_captcha_are_never_stored():
+    cache = ResultCache()
+    assert not cache.put("TN-1", {"status": "error"})
+    assert not cache.put("TN-1", {"status": "captcha_required"})
+    assert cache.get("TN-1") is None
+    assert cache.counters["skipped"] == 2
+
+
+def test_expired_entry_is_a_miss():
+    cache = ResultCache(ttl_s={"pending": 60})
+    cache.put("TN-1", {"status": "pending", "data": {}})
+    cache._db.execute("UPDATE results SET expires = ?", (time.time() - 1,))
+    assert cache.get("TN-1") is None
+    assert cache.counters["expired"] == 1 and cache.stats()["entries"] == 0
+
+
+def test_shared_file_across_instances(tmp_path):
+    a = ResultCache(path=tmp_path / "results.sqlite3")
+    b = ResultCache(path=tmp_path / "results.sqlite3")
+    a.put("TN-1", approved())
+    assert b.get("TN-1")["status"] == "approved"
+    assert b.invalidate("TN-1")
+    assert a.get("TN-1") is None
+
+
+def test_lru_eviction_by_count():
+    cache = ResultCache(max_entries=2)
+    cache.put("TN-1", approved())
+    cache.put("TN-2", approved())
+    cache._db.execute("UPDATE results SET used = used - 10 WHERE key = 'TN-2'")
+    cache.get("TN-1")
+    cache.put("TN-3", approved())
+    assert cache.get("TN-2") is None
+    assert cache.get("TN-1") and cache.get("TN-3")
+    assert cache.counters["evictions"] == 1
+
+
+def test_eviction_by_bytes_keeps_newest():
+    big = approved("x" * 400)
+    cache = ResultCache(max_bytes=1000)
+    for i in range(4):
+        cache.put(f"TN-{i}", big)
+        time.sleep(0.002)
+    assert cache.stats()["bytes"] <= 1000
+    assert cache.get("TN-3") is not None and cache.get("TN-0") is None
@@ -0,0 +1,35 @@
+import time
+
+import pytest
+
+from utils.sessions import SessionStore
+
+
+def test_get_returns_copies(tmp_path):
+    store = SessionStore(tmp_path / "s.sqlite3", "t")
+    store[1] = {"ration": "R1", "pdf": None}
+    s = store.get(1)
+    s["pdf"] = "x.pdf"
+    assert store[1]["pdf"] is None
+    assert 1 in store and 2 not in store
+    with pytest.raises(KeyError):
+        store[2]
+
+
+def test_update_merges_into_what_another_worker_wrote(tmp_path):
+    path = tmp_path / "s.sqlite3"
+    w1, w2 = SessionStore(path, "t"), SessionStore(path, "t")
+    w1[1] = {"ration": "R1", "pdf": None}
+    w2.update(1, order_id="order_1")          # meanwhile, on another worker
+    w1.update(1, pdf="ecard.pdf")
+    assert w2[1] == {"ration": "R1", "pdf": "ecard.pdf", "order_id": "order_1"}
+
+
+def test_namespaces_and_ttl(tmp_path):
+    path = tmp_path / "s.sqlite3"
+    a, b = SessionStore(path, "a", ttl_s=60), SessionStore(path, "b", ttl_s=60)
+    a[1] = {"x": 1}
+    assert b.get(1) is None
+    a._db.execute("UPDATE sessions SET updated = ?", (time.time() - 120,))
+    assert a.get(1) is None
+    assert a.prune() == 1
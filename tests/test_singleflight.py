@@ -0,0 +1,84 @@
+import asyncio
+
+from utils.singleflight import SingleFlight
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_concurrent_callers_share_one_run_and_get_copies():
+    flights, runs = SingleFlight(), []
+
+    async def fn():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return {"status": "approved", "data": {}}
+
+    async def go():
+        return await asyncio.gather(*(flights.do("k", fn) for _ in range(3)))
+
+    a, b, c = run(go())
+    assert len(runs) == 1
+    assert a == b == c
+    a["data"]["x"] = 1
+    assert b["data"] == {} and c["data"] == {}
+    assert flights.stats() == {"in_flight": 0, "calls": 3, "executions": 1, "coalesced": 2, "abandoned": 0}
+
+
+def test_cancelling_one_caller_keeps_the_run():
+    flights = SingleFlight()
+
+    async def go():
+        started = asyncio.Event()
+
+        async def fn():
+            started.set()
+            await asyncio.sleep(0.02)
+            return "done"
+
+        first = asyncio.ensure_future(flights.do("k", fn))
+        await started.wait()
+        second = asyncio.ensure_future(flights.do("k", fn))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert run(go()) == "done"
+
+
+def test_cancelling_the_last_caller_cancels_the_run():
+    flights, state = SingleFlight(), {}
+
+    async def go():
+        async def fn():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                state["cancelled"] = True
+                raise
+
+        caller = asyncio.ensure_future(flights.do("k", fn))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        await asyncio.sleep(0.01)
+        assert flights.in_flight() == 0
+        # a later caller starts a fresh run instead of joining the cancelled one
+        return await flights.do("k", lambda: asyncio.sleep(0, result="again"))
+
+    assert run(go()) == "again"
+    assert state == {"cancelled": True}
+    assert flights.counters["abandoned"] == 1
+
+
+def test_errors_reach_every_caller():
+    flights = SingleFlight()
+
+    async def fn():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def go():
+        return await asyncio.gather(flights.do("k", fn), flights.do("k", fn), return_exceptions=True)
+
+    assert [type(r) for r in run(go())] == [RuntimeError, RuntimeError]
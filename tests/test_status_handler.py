@@ -0,0 +1,51 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from handlers import status_handler
+
+
+class FakeMessage:
+    def __init__(self):
+        self.replies = []
+
+    async def reply_text(self, text, **kwargs):
+        self.replies.append(text)
+        return self
+
+    async def edit_text(self, text, **kwargs):
+        self.replies.append(text)
+
+
+def run_check(monkeypatch, results):
+    calls = []
+
+    async def lookup(app_no, *args, **kwargs):
+        calls.append(app_no)
+        return results[len(calls) - 1]
+
+    monkeypatch.setattr(status_handler, "query_tnedistrict_status_async", lookup)
+    message = FakeMessage()
+    update = SimpleNamespace(message=message, effective_chat=SimpleNamespace(id=1))
+    asyncio.run(status_handler.cmd_check(update, SimpleNamespace(args=["TN-1"], bot=None)))
+    return calls, message.replies
+
+
+@pytest.mark.parametrize("result", [
+    {"status": "error", "raw_text": "Timeout: page.goto: Timeout 60000ms exceeded", "debug": {}},
+    {"status": "error", "raw_text": "", "debug": {"http": {"reason": "ConnectError: refused"}}},
+    {"status": "error", "raw_text": "Playwright error: net::ERR_CONNECTION_RESET", "debug": {}},
+])
+def test_no_retry_after_an_upstream_failure(monkeypatch, result):
+    calls, replies = run_check(monkeypatch, [result])
+    assert calls == ["TN-1"]
+    assert not any("Retrying" in r for r in replies)
+
+
+def test_other_errors_are_retried_once(monkeypatch):
+    odd = {"status": "error", "raw_text": "Exception: selector not found", "debug": {}}
+    ok = {"status": "pending", "data": {}, "debug": {}}
+    calls, replies = run_check(monkeypatch, [odd, ok])
+    assert calls == ["TN-1", "TN-1"]
+    assert "PENDING" in replies[-1]
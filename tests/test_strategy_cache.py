@@ -0,0 +1,22 @@
+from utils.strategy_cache import StrategyCache
+
+
+def test_last_winner_first_then_success_rate(tmp_path):
+    c = StrategyCache(tmp_path / "s.sqlite3")
+    assert c.order("fill", ["a", "b", "c"]) == ["a", "b", "c"]
+    c.record("fill", "a", False)
+    c.record("fill", "c", True)
+    c.record("fill", "b", True)
+    c.record("fill", "c", True)
+    assert c.order("fill", ["a", "b", "c"]) == ["c", "b", "a"]
+
+
+def test_workers_share_counts(tmp_path):
+    path = tmp_path / "s.sqlite3"
+    w1, w2 = StrategyCache(path), StrategyCache(path)
+    w1.record("click", "x", True)
+    w2.record("click", "x", True)
+    w1.outcome("click", True)
+    w2.outcome("click", False)
+    assert w2.order("click", ["y", "x"]) == ["x", "y"]
+    assert w1.stats() == {"click": {"last": "x", "hits": 1, "misses": 1, "hit_rate": 0.5}}
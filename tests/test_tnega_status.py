@@ -0,0 +1,47 @@
+from utils.tnega_status import classify, extract, extract_rows
+
+
+def table(status, remarks=""):
+    return ("Application Number\tTN-2120251031226\n"
+            "Applicant Name\tRAVI K\tGender\tMale\n"
+            "Request For\tCommunity Certificate\n"
+            f"Status\t{status}\n"
+            f"Remarks\t{remarks}\n")
+
+
+def test_fields_from_tab_separated_rows():
+    status, fields = extract(table("Approved"))
+    assert status == "approved"
+    assert fields["app_no"] == "TN-2120251031226"
+    assert fields["applicant_name"] == "RAVI K" and fields["gender"] == "Male"
+    assert fields["request_for"] == "Community Certificate"
+
+
+def test_status_field_beats_page_keywords():
+    assert classify(table("Not Approved", "approved by mistake")) == "rejected"
+    assert classify(table("Pending with VAO", "earlier approved")) == "pending"
+
+
+def test_remarks_never_decide_the_status():
+    assert classify(table("Something new", "rejected twice")) == "filled_but_unknown"
+
+
+def test_page_markers_without_a_status_field():
+    assert classify("No record found for the given number") == "no_record"
+    assert classify("Please enter the captcha") == "captcha_required"
+    assert classify("Your certificate is approved") == "approved"
+    assert classify("approved") == "filled_but_unknown"  # needs an application / certificate mention
+
+
+def test_colon_labels_and_search_form_cell():
+    text = "Application Number\tSearch\nApplication No: TN-99\nStatus: Under Process\n"
+    status, fields = extract(text)
+    assert fields["app_no"] == "TN-99" and status == "pending"
+
+
+def test_extract_rows_with_notice_and_captcha():
+    rows = [["Application Number", "TN-1"], ["Current Status", "Issued"]]
+    status, fields = extract_rows(rows)
+    assert status == "approved" and fields["app_no"] == "TN-1"
+    assert extract_rows([], notice="Record not found")[0] == "no_record"
+    assert extract_rows([], captcha=True)[0] == "captcha_required"
@@ -0,0 +1,93 @@
+import asyncio
+
+from utils.watcher import WatchScheduler
+
+
+def make_scheduler(tmp_path, results, **kw):
+    notes = []
+
+    async def check(app_no):
+        return results[app_no]
+
+    async def notify(chat_id, app_no, old, result):
+        notes.append((chat_id, app_no, old.get("status"), result["status"]))
+
+    sched = WatchScheduler(tmp_path / "watches.sqlite3", check=check, notify=notify, jitter=0.0, **kw)
+    return sched, notes
+
+
+def pending(text="At VAO"):
+    return {"status": "pending", "data": {"status_text": text, "remarks": ""}}
+
+
+def force_due(sched):
+    sched._db.execute("UPDATE watches SET next_check = 0")
+    sched._db.commit()
+
+
+def test_final_snapshot_is_not_watched(tmp_path):
+    sched, _ = make_scheduler(tmp_path, {})
+    assert sched.add("TN-1", 7, snapshot={"status": "approved", "data": {}}) == "final"
+    assert sched.list_for(7) == []
+
+
+def test_add_exists_and_limit(tmp_path):
+    sched, _ = make_scheduler(tmp_path, {}, max_per_chat=2)
+    assert sched.add("TN-1", 7, snapshot=pending()) == "added"
+    assert sched.add("TN-1", 7) == "exists"
+    assert sched.add("TN-2", 7) == "added"
+    assert sched.add("TN-3", 7) == "limit"
+    assert sched.remove("TN-1", 7)
+    assert sched.add("TN-3", 7) == "added"
+
+
+def test_change_notifies_every_watcher_once(tmp_path):
+    results = {"TN-1": pending()}
+    sched, notes = make_scheduler(tmp_path, results)
+    sched.add("TN-1", 7, snapshot=pending())
+    sched.add("TN-1", 8, snapshot=pending())
+    force_due(sched)
+    assert asyncio.run(sched.run_once()) == 1
+    assert notes == []  # nothing changed
+
+    results["TN-1"] = {"status": "approved", "data": {"status_text": "Approved", "remarks": ""}}
+    force_due(sched)
+    asyncio.run(sched.run_once())
+    assert sorted(notes) == [(7, "TN-1", "pending", "approved"), (8, "TN-1", "pending", "approved")]
+    assert sched.list_for(7) == [] and sched.list_for(8) == []
+
+
+def test_first_check_with_final_status_still_notifies(tmp_path):
+    sched, notes = make_scheduler(tmp_path, {"TN-1": {"status": "rejected", "data": {}}})
+    sched.add("TN-1", 7)  # no snapshot: checked on the next tick
+    asyncio.run(sched.run_once())
+    assert notes == [(7, "TN-1", "", "rejected")]
+    assert sched.list_for(7) == []
+
+
+def test_first_pending_check_is_not_news(tmp_path):
+    sched, notes = make_scheduler(tmp_path, {"TN-1": pending()})
+    sched.add("TN-1", 7)
+    asyncio.run(sched.run_once())
+    assert notes == []
+    assert sched.list_for(7)[0]["last_status"] == "pending"
+
+
+def test_failed_check_keeps_snapshot(tmp_path):
+    sched, notes = make_scheduler(tmp_path, {"TN-1": {"status": "captcha_required", "data": {}}})
+    sched.add("TN-1", 7, snapshot=pending())
+    force_due(sched)
+    asyncio.run(sched.run_once())
+    assert notes == []
+    assert sched.list_for(7)[0]["last_status"] == "pending"
+    assert sched.counters["failures"] == 1
+
+
+def test_hourly_budget_caps_checks(tmp_path):
+    results = {f"TN-{i}": pending() for i in range(5)}
+    sched, _ = make_scheduler(tmp_path, results, budget_per_hour=3, max_per_chat=10)
+    for app_no in results:
+        sched.add(app_no, 7)
+    assert asyncio.run(sched.run_once()) == 3
+    assert asyncio.run(sched.run_once()) == 0
+    assert sched.counters["budget_waits"] == 1
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+
+import pytest
+from fastapi.testclient import TestClient
+
+import config
+import webhook
+
+
+class FakeApplication:
+    def __init__(self):
+        self.update_queue = asyncio.Queue()
+        self.bot = None
+        self.bot_data = {}
+        self.post_init = self.post_shutdown = None
+        self.calls = []
+
+    async def initialize(self):
+        self.calls.append("initialize")
+
+    async def start(self):
+        self.calls.append("start")
+
+    async def stop(self):
+        self.calls.append("stop")
+
+    async def shutdown(self):
+        self.calls.append("shutdown")
+
+
+@pytest.fixture
+def served(tmp_path, monkeypatch):
+    tg = FakeApplication()
+    monkeypatch.setattr(webhook, "SECRET", "s3cret")
+    monkeypatch.setattr(webhook, "WORKERS", 1)
+    monkeypatch.setattr(config, "WEBHOOK_LOCK_FILE", str(tmp_path / "webhook.lock"))
+    monkeypatch.setattr(webhook, "_build", lambda name: tg if name == "tnega" else None)
+    api = webhook.create_app({"tnega": "/t", "cmchis": "/c"})
+    with TestClient(api) as client:
+        yield client, tg
+    assert tg.calls == ["initialize", "start", "stop", "shutdown"]
+
+
+def test_update_with_the_secret_is_queued(served):
+    client, tg = served
+    r = client.post("/t", json={"update_id": 7}, headers={"X-Telegram-Bot-Api-Secret-Token": "s3cret"})
+    assert r.status_code == 200
+    assert tg.update_queue.get_nowait().update_id == 7
+    assert tg.bot_data["background"] is True  # the only worker holds the lock
+
+
+@pytest.mark.parametrize("token", ["", "wrong"])
+def test_wrong_or_missing_secret_is_refused(served, token):
+    client, tg = served
+    r = client.post("/t", json={"update_id": 7}, headers={"X-Telegram-Bot-Api-Secret-Token": token})
+    assert r.status_code == 403 and tg.update_queue.empty()
+
+
+def test_unmounted_bot_is_404(served):
+    client, _ = served
+    r = client.post("/c", json={"update_id": 7}, headers={"X-Telegram-Bot-Api-Secret-Token": "s3cret"})
+    assert r.status_code == 404
+    assert client.get("/healthz").json()["bots"] == ["tnega"]
+
+
+def test_empty_secret_refuses_to_start(monkeypatch, tmp_path):
+    monkeypatch.setattr(webhook, "SECRET", "")
+    with pytest.raises(RuntimeError):
+        with TestClient(webhook.create_app({"tnega": "/t"})):
+            pass
+
+
+def test_only_one_holder_of_the_lock(tmp_path):
+    path = tmp_path / "webhook.lock"
+    first = webhook._try_lock(path)
+    assert first is not None
+    assert webhook._try_lock(path) is None
+    first.close()
+    again = webhook._try_lock(path)
+    assert again is not None
+    again.close()
+
+
+def test_upstream_limits_split_between_workers(monkeypatch):
+    monkeypatch.setattr(config, "SCRAPER_RATE_LIMIT", {"rate": 1.0, "burst": 8, "min_rate": 0.2})
+    monkeypatch.delenv("CMCHIS_RATE_PER_S", raising=False)
+    monkeypatch.delenv("CMCHIS_RATE_BURST", raising=False)
+    webhook._share_upstream_limits(4)
+    assert config.SCRAPER_RATE_LIMIT == {"rate": 0.25, "burst": 2, "min_rate": 0.05}
+    assert float(webhook.os.environ["CMCHIS_RATE_PER_S"]) * 4 == pytest.approx(0.5)
+    assert webhook.os.environ["CMCHIS_RATE_BURST"] == "1"  # 2 // 4, floored at one
+
+
+def test_split_never_goes_below_one_and_says_so(monkeypatch, caplog):
+    monkeypatch.setattr(config, "SCRAPER_RATE_LIMIT", {"rate": 1.0, "burst": 2})
+    monkeypatch.delenv("CMCHIS_RATE_PER_S", raising=False)
+    monkeypatch.setenv("CMCHIS_RATE_BURST", "2")
+    with caplog.at_level(logging.WARNING, logger="webhook"):
+        webhook._share_upstream_limits(4)
+    assert config.SCRAPER_RATE_LIMIT["burst"] == 1
+    assert "4 in total" in caplog.text
+
+
+def test_single_worker_keeps_the_config(monkeypatch):
+    limits = {"rate": 1.0, "burst": 4}
+    monkeypatch.setattr(config, "SCRAPER_RATE_LIMIT", limits)
+    monkeypatch.setattr(config, "SCRAPER_POOL_SIZE", 2)
+    webhook._share_upstream_limits(1)
+    webhook._share_browser_pool(1)
+    assert config.SCRAPER_RATE_LIMIT is limits and config.SCRAPER_POOL_SIZE == 2
+
+
+def test_browser_pool_split_between_workers(monkeypatch):
+    monkeypatch.setattr(config, "SCRAPER_POOL_SIZE", 4)
+    monkeypatch.setattr(config, "SCRAPER_MAX_CONCURRENCY", 8)
+    webhook._share_browser_pool(3)
+    assert (config.SCRAPER_POOL_SIZE, config.SCRAPER_MAX_CONCURRENCY) == (1, 2)
+    assert webhook._per_worker("x", 5, 2) == 2  # rounds down, never over the total
@@ -0,0 +1,185 @@
+# utils/artifact_store.py
+# Bounded on-disk store for scraper debug artifacts (HTML dumps, screenshots), with a
+# sqlite index so everything captured for one application / ration can be found by key.
+import gzip, hashlib, sqlite3, threading, time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+DEFAULT_MAX_AGE_S = {
+    "html": 3 * 24 * 3600,
+    "screenshot": 7 * 24 * 3600,
+    "preview": 24 * 3600,
+}
+_COMPRESS = {"html", "txt", "json", "har"}
+_IMAGE = {"png", "jpg", "jpeg", "webp"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    blob TEXT NOT NULL REFERENCES blobs(hash),
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS artifacts_key ON artifacts(key, created);
+CREATE INDEX IF NOT EXISTS artifacts_kind ON artifacts(kind, created);
+CREATE INDEX IF NOT EXISTS artifacts_blob ON artifacts(blob);
+"""
+
+
+def kind_for(ext: str) -> str:
+    ext = ext.lower()
+    if ext in _IMAGE:
+        return "screenshot"
+    return ext
+
+
+class ArtifactStore:
+    """Content-addressed files under `root`: identical payloads are stored once (text
+    gzipped, images as-is so the path can be sent directly) and every capture gets an
+    index row (key, kind, name, created). prune() drops rows past their kind's age limit,
+    then the oldest rows until the files fit in `max_bytes`, then unreferenced files.
+    Only files under blobs/ are ever deleted: anything else in `root` is left alone."""
+
+    def __init__(self, root, max_bytes: int = 200 * 1024 * 1024,
+                 max_age_s: Optional[Dict[str, int]] = None, default_max_age_s: int = 7 * 24 * 3600):
+        self.root = Path(root)
+        self.blob_dir = self.root / "blobs"
+        self.max_bytes = max_bytes
+        self.max_age_s = dict(DEFAULT_MAX_AGE_S if max_age_s is None else max_age_s)
+        self.default_max_age_s = default_max_age_s
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._bytes = 0
+        self.counters = {"stored": 0, "deduped": 0, "pruned": 0, "files_removed": 0}
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        """Opened on first use (callers hold the lock), so creating a store touches no files."""
+        if self._conn is None:
+            self.blob_dir.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self.root / "index.sqlite3"), check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(_SCHEMA)
+            self._bytes = db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+            self._conn = db
+        return self._conn
+
+    # ---------- write / read ----------
+
+    def path_for(self, ext: str, data: Union[bytes, str]) -> str:
+        """Where put() will keep this payload (known before it is written)."""
+        raw = data.encode("utf-8") if isinstance(data, str) else data
+        return str(self._blob_path(hashlib.sha256(raw).hexdigest(), ext))
+
+    def _blob_path(self, digest: str, ext: str) -> Path:
+        name = f"{digest}.{ext}.gz" if ext.lower() in _COMPRESS else f"{digest}.{ext}"
+        return self.blob_dir / digest[:2] / name
+
+    def put(self, key: str, name: str, ext: str, data: Union[bytes, str], kind: Optional[str] = None) -> str:
+        """Store one capture and return the path of its file."""
+        raw = data.encode("utf-8") if isinstance(data, str) else data
+        digest = hashlib.sha256(raw).hexdigest()
+        kind = kind or kind_for(ext)
+        with self._lock:
+            row = self._db.execute("SELECT path FROM blobs WHERE hash = ?", (digest,)).fetchone()
+            if row and Path(row[0]).exists():
+                path = row[0]
+                self.counters["deduped"] += 1
+            else:
+                path = self._write_blob(digest, ext, raw)
+            self._db.execute("INSERT INTO artifacts (key, kind, name, blob, created) VALUES (?, ?, ?, ?, ?)",
+                             (key or "", kind, name, digest, time.time()))
+            self._db.commit()
+            self.counters["stored"] += 1
+            over = self._bytes > self.max_bytes
+        if over:
+            self.prune()
+        return path
+
+    def _write_blob(self, digest: str, ext: str, raw: bytes) -> str:
+        path = self._blob_path(digest, ext)
+        path.parent.mkdir(exist_ok=True)
+        payload = gzip.compress(raw, compresslevel=6) if path.suffix == ".gz" else raw
+        path.write_bytes(payload)
+        old = self._db.execute("SELECT size FROM blobs WHERE hash = ?", (digest,)).fetchone()
+        self._bytes += len(payload) - (old[0] if old else 0)
+        self._db.execute("INSERT OR REPLACE INTO blobs (hash, path, size) VALUES (?, ?, ?)",
+                         (digest, str(path), len(payload)))
+        return str(path)
+
+    def find(self, key: str, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Everything captured for one key, newest first."""
+        sql = ("SELECT a.id, a.key, a.kind, a.name, a.created, b.path, b.size FROM artifacts a "
+               "JOIN blobs b ON b.hash = a.blob WHERE a.key = ?")
+        args: list = [key]
+        if kind:
+            sql += " AND a.kind = ?"
+            args.append(kind)
+        with self._lock:
+            rows = self._db.execute(sql + " ORDER BY a.created DESC", args).fetchall()
+        cols = ("id", "key", "kind", "name", "created", "path", "size")
+        return [dict(zip(cols, r)) for r in rows]
+
+    @staticmethod
+    def read(path: str) -> bytes:
+        data = Path(path).read_bytes()
+        return gzip.decompress(data) if path.endswith(".gz") else data
+
+    # ---------- retention ----------
+
+    def prune(self) -> Dict[str, int]:
+        now = time.time()
+        with self._lock:
+            before = self._db.execute("SELECT COUNT(*) FROM artifacts").fetchone()[0]
+            kinds = [r[0] for r in self._db.execute("SELECT DISTINCT kind FROM artifacts")]
+            for kind in kinds:
+                age = self.max_age_s.get(kind, self.default_max_age_s)
+                self._db.execute("DELETE FROM artifacts WHERE kind = ? AND created < ?", (kind, now - age))
+            removed = self._drop_orphans()
+            # over budget: oldest captures go first
+            while self._bytes > self.max_bytes:
+                left = self._db.execute("SELECT COUNT(*) FROM artifacts").fetchone()[0]
+                if not left:
+                    break
+                self._db.execute("DELETE FROM artifacts WHERE id IN "
+                                 "(SELECT id FROM artifacts ORDER BY created LIMIT ?)", (max(1, left // 20),))
+                removed += self._drop_orphans()
+            after = self._db.execute("SELECT COUNT(*) FROM artifacts").fetchone()[0]
+            self._db.commit()
+            self.counters["pruned"] += before - after
+            self.counters["files_removed"] += removed
+        return {"artifacts_removed": before - after, "files_removed": removed, "bytes": self._bytes}
+
+    def _drop_orphans(self) -> int:
+        rows = self._db.execute(
+            "SELECT hash, path, size FROM blobs WHERE hash NOT IN (SELECT DISTINCT blob FROM artifacts)").fetchall()
+        for digest, path, size in rows:
+            try:
+                Path(path).unlink()
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue
+            self._db.execute("DELETE FROM blobs WHERE hash = ?", (digest,))
+            self._bytes -= size
+        return len(rows)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            n = self._db.execute("SELECT COUNT(*) FROM artifacts").fetchone()[0]
+            files = self._db.execute("SELECT COUNT(*) FROM blobs").fetchone()[0]
+            return {"artifacts": n, "files": files, "bytes": self._bytes, "max_bytes": self.max_bytes,
+                    **self.counters}
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,125 @@
+# utils/artifacts.py
+# Debug artifact policy shared by both scrapers: decides which runs are captured
+# (off / failure / sample / always) and writes the captures from a background thread.
+import itertools, queue, threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from utils.artifact_store import ArtifactStore
+
+MODES = ("off", "failure", "sample", "always")
+
+
+class ArtifactPolicy:
+    """One per scraper. wants(failed) is asked once per run, after its outcome is known,
+    so runs that are not kept never pay for a capture. "sample" keeps every failure plus
+    one in `sample_every` successful runs. Captures are viewport-only JPEG by default.
+
+    save() queues the write and returns the path at once; wait=True writes in the calling
+    thread, for captures the caller is about to hand to a user. With a `store`, captures go
+    into that ArtifactStore under `key` instead of loose files in `directory`."""
+
+    def __init__(self, directory, mode: str = "failure", sample_every: int = 20,
+                 image_format: str = "jpeg", jpeg_quality: int = 60, full_page: bool = False,
+                 max_pending: int = 64, store: Optional[ArtifactStore] = None):
+        if mode not in MODES:
+            raise ValueError(f"artifact mode must be one of {MODES}, got {mode!r}")
+        self.directory = Path(directory)
+        self.store = store
+        self.mode = mode
+        self.sample_every = max(1, int(sample_every))
+        self.image_format = "png" if image_format == "png" else "jpeg"
+        self.jpeg_quality = jpeg_quality
+        self.full_page = full_page
+        self._successes = itertools.count(1)
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.counters = {"kept": 0, "skipped": 0, "written": 0, "dropped": 0, "errors": 0, "bytes": 0}
+
+    @property
+    def image_ext(self) -> str:
+        return "jpg" if self.image_format == "jpeg" else "png"
+
+    def screenshot_options(self) -> Dict[str, Any]:
+        """Keyword arguments for Playwright's page.screenshot()."""
+        opts: Dict[str, Any] = {"type": self.image_format, "full_page": self.full_page}
+        if self.image_format == "jpeg":
+            opts["quality"] = self.jpeg_quality
+        return opts
+
+    def wants(self, failed: bool) -> bool:
+        if self.mode == "off":
+            keep = False
+        elif self.mode == "always" or failed:
+            keep = True
+        elif self.mode == "sample":
+            keep = next(self._successes) % self.sample_every == 0
+        else:
+            keep = False
+        with self._lock:
+            self.counters["kept" if keep else "skipped"] += 1
+        return keep
+
+    def save(self, name: str, ext: str, data: Union[bytes, str], wait: bool = False, key: str = "") -> str:
+        if self.store is not None:
+            path = self.store.path_for(ext, data)
+            item = (key, name, ext)
+        else:
+            path = item = self.directory / f"{name}.{ext}"
+        if wait:
+            self._write(item, data)
+            return str(path)
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait((item, data))
+        except queue.Full:
+            with self._lock:
+                self.counters["dropped"] += 1
+        return str(path)
+
+    def flush(self, timeout: float = 5.0):
+        """Wait (up to timeout) for queued writes to land."""
+        done = threading.Event()
+        try:
+            self._queue.put((None, done), timeout=timeout)
+        except queue.Full:
+            return
+        self._ensure_thread()
+        done.wait(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"mode": self.mode, "pending": self._queue.qsize(), **self.counters}
+
+    # ---------- writer ----------
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="artifact-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            item, data = self._queue.get()
+            if item is None:
+                data.set()
+            else:
+                self._write(item, data)
+
+    def _write(self, item, data: Union[bytes, str]):
+        try:
+            raw = data.encode("utf-8") if isinstance(data, str) else data
+            if self.store is not None:
+                key, name, ext = item
+                self.store.put(key, name, ext, raw)
+            else:
+                item.parent.mkdir(parents=True, exist_ok=True)
+                item.write_bytes(raw)
+            with self._lock:
+                self.counters["written"] += 1
+                self.counters["bytes"] += len(raw)
+        except Exception:
+            with self._lock:
+                self.counters["errors"] += 1
@@ -0,0 +1,160 @@
+# utils/breaker.py
+# Circuit breaker per upstream site: after repeated "site is down" failures, lookups are
+# answered at once instead of each waiting out a full page-load timeout.
+import threading, time, urllib.error, urllib.request
+from typing import Any, Callable, Dict, Optional
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+def http_probe(url: str, timeout_s: float = 8.0) -> Callable[[], bool]:
+    """A probe that passes when `url` answers with anything below 500."""
+    def probe() -> bool:
+        req = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0"})
+        try:
+            with urllib.request.urlopen(req, timeout=timeout_s) as r:
+                return r.status < 500
+        except urllib.error.HTTPError as e:
+            return e.code < 500
+        except Exception:
+            return False
+    return probe
+
+
+class CircuitBreaker:
+    """closed: calls pass; `failure_threshold` failures in a row open it. open: allow()
+    is False and a background thread runs `probe` every `probe_interval_s`; the first
+    passing probe after `open_s` moves it to half_open. half_open: `half_open_max` real
+    calls go through; a success closes it, a failure opens it again with open_s doubled
+    (up to `max_open_s`).
+
+    Thread-safe; the probe runs in its own daemon thread so it works the same for the
+    asyncio scraper and the Selenium one."""
+
+    def __init__(self, name: str, probe: Optional[Callable[[], bool]] = None, failure_threshold: int = 5,
+                 open_s: float = 30.0, max_open_s: float = 600.0, probe_interval_s: float = 15.0,
+                 half_open_max: int = 1):
+        self.name = name
+        self.probe = probe
+        self.failure_threshold = max(1, failure_threshold)
+        self.base_open_s = open_s
+        self.max_open_s = max_open_s
+        self.probe_interval_s = probe_interval_s
+        self.half_open_max = max(1, half_open_max)
+        self.state = CLOSED
+        self._open_s = open_s
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trials = 0
+        self._probe_thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.counters = {"opened": 0, "rejected": 0, "probes": 0, "probe_failures": 0}
+        self.last_error = ""
+
+    # ---------- calls ----------
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and self.probe is None and time.monotonic() - self._opened_at >= self._open_s:
+                self.state = HALF_OPEN  # nothing to probe with: the next real call is the probe
+                self._trials = 0
+                self._opened_at = time.monotonic()
+            if self.state == HALF_OPEN and time.monotonic() - self._opened_at >= self.base_open_s:
+                self._trials = 0  # trial calls that never reported back (cancelled, other errors)
+                self._opened_at = time.monotonic()
+            if self.state == HALF_OPEN and self._trials < self.half_open_max:
+                self._trials += 1
+                return True
+            self.counters["rejected"] += 1
+            return False
+
+    def success(self):
+        with self._lock:
+            self._failures = 0
+            if self.state != CLOSED:
+                self.state = CLOSED
+                self._open_s = self.base_open_s
+
+    def failure(self, error: str = ""):
+        with self._lock:
+            self.last_error = error[:200]
+            self._failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self._failures >= self.failure_threshold):
+                if self.state == HALF_OPEN:
+                    self._open_s = min(self.max_open_s, self._open_s * 2)
+                self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._trials = 0
+        self.counters["opened"] += 1
+        if self.probe is not None and (self._probe_thread is None or not self._probe_thread.is_alive()):
+            self._probe_thread = threading.Thread(target=self._probe_loop, name=f"breaker-{self.name}",
+                                                  daemon=True)
+            self._probe_thread.start()
+
+    # ---------- probing ----------
+
+    def _probe_loop(self):
+        while True:
+            time.sleep(self.probe_interval_s)
+            with self._lock:
+                if self.state != OPEN:
+                    return
+                ready = time.monotonic() - self._opened_at >= self._open_s
+            if not ready:
+                continue
+            ok = self.probe()
+            with self._lock:
+                self.counters["probes"] += 1
+                if self.state != OPEN:
+                    return
+                if ok:
+                    self.state = HALF_OPEN
+                    self._trials = 0
+                    self._opened_at = time.monotonic()
+                    return
+                self.counters["probe_failures"] += 1
+                self._open_s = min(self.max_open_s, self._open_s * 2)
+                self._opened_at = time.monotonic()
+
+    def retry_after(self) -> float:
+        """Estimated seconds until calls are let through again (0 when they are now)."""
+        with self._lock:
+            if self.state == CLOSED:
+                return 0.0
+            if self.state == HALF_OPEN:
+                if self._trials < self.half_open_max:
+                    return 0.0
+                # trial calls in flight: their outcome decides, or the slots reopen after base_open_s
+                return max(self._opened_at + self.base_open_s - time.monotonic(), 1.0)
+            left = self._opened_at + self._open_s - time.monotonic()
+            return max(left, 0.0) + (self.probe_interval_s if self.probe is not None else 0.0)
+
+    def stats(self) -> Dict[str, Any]:
+        retry = self.retry_after()
+        with self._lock:
+            return {"state": self.state, "failures": self._failures, "open_s": self._open_s,
+                    "retry_after_s": round(retry), "last_error": self.last_error, **self.counters}
+
+
+# ---------- registry ----------
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+
+
+def configure(name: str, **options) -> CircuitBreaker:
+    breaker = CircuitBreaker(name, **options)
+    with _registry_lock:
+        _breakers[name] = breaker
+    return breaker
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    with _registry_lock:
+        breakers = dict(_breakers)
+    return {name: b.stats() for name, b in breakers.items()}
@@ -0,0 +1,456 @@
+# utils/browser_pool.py
+# Long-lived Chromium pool: N pre-launched browsers, each holding reusable contexts.
+# Callers check a context out, use it, and hand it back instead of launching Chromium per request.
+# PagePool sits on top and keeps pages parked on one URL with the form already loaded.
+import asyncio, time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+
+from playwright.async_api import async_playwright, Error as PWError, TimeoutError as PWTimeout
+
+
+class PoolExhausted(Exception):
+    """Raised when the wait queue is full or a checkout times out."""
+
+
+# JS used to tell whether a page is back in its freshly-loaded state
+_FINGERPRINT_JS = "() => document.body ? document.body.innerText : ''"
+
+
+async def _bounded_get(owner, queue: asyncio.Queue, timeout: Optional[float], what: str):
+    """queue.get() that fails fast once `owner.max_waiters` callers are already waiting."""
+    try:
+        return queue.get_nowait()
+    except asyncio.QueueEmpty:
+        pass
+    if owner._waiting >= owner.max_waiters:
+        owner.counters["rejected"] += 1
+        raise PoolExhausted(f"{what} wait queue full ({owner._waiting} waiting)")
+    owner._waiting += 1
+    owner.counters["waited"] += 1
+    try:
+        return await asyncio.wait_for(queue.get(), timeout)
+    except asyncio.TimeoutError:
+        owner.counters["timeouts"] += 1
+        raise PoolExhausted(f"no {what} free after {timeout}s")
+    finally:
+        owner._waiting -= 1
+
+
+def _pct(values, p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * p))], 1)
+
+
+class _Slot:
+    """One reusable browser context living inside browser number `browser_idx`."""
+
+    def __init__(self, browser_idx: int):
+        self.browser_idx = browser_idx
+        self.context = None
+        self.uses = 0
+
+
+class Lease:
+    """A checked-out context. Hand it back with BrowserPool.checkin()."""
+
+    def __init__(self, slot: _Slot, waited_ms: float):
+        self.slot = slot
+        self.context = slot.context
+        self.waited_ms = waited_ms
+        self.started = time.monotonic()
+
+
+class BrowserPool:
+    def __init__(self, size: int = 2, contexts_per_browser: int = 2, max_waiters: int = 20,
+                 headless: bool = True, launch_args: Optional[List[str]] = None,
+                 context_options: Optional[Dict[str, Any]] = None, max_context_uses: int = 50,
+                 context_setup=None):
+        self.size = max(1, size)
+        self.contexts_per_browser = max(1, contexts_per_browser)
+        self.capacity = self.size * self.contexts_per_browser
+        self.max_waiters = max_waiters
+        self.headless = headless
+        self.launch_args = launch_args or ["--no-sandbox"]
+        self.context_options = context_options or {}
+        self.max_context_uses = max_context_uses
+        self.context_setup = context_setup  # async fn(context), e.g. request routing
+
+        self._pw = None
+        self._browsers: List[Any] = []
+        self._relaunch_locks: List[asyncio.Lock] = []
+        self._idle: Optional[asyncio.Queue] = None
+        self._started = False
+        self._start_lock = asyncio.Lock()
+
+        # counters
+        self._waiting = 0
+        self._in_use = 0
+        self._created_at = time.monotonic()
+        self._busy_s = 0.0
+        self._latency_ms = deque(maxlen=256)
+        self.counters = {
+            "checkouts": 0, "checkins": 0, "waited": 0, "rejected": 0, "timeouts": 0,
+            "browser_launches": 0, "context_creates": 0, "context_discards": 0, "one_off_contexts": 0,
+        }
+
+    # ---------- lifecycle ----------
+
+    async def start(self):
+        async with self._start_lock:
+            if self._started:
+                return
+            self._pw = await async_playwright().start()
+            self._idle = asyncio.Queue()
+            for i in range(self.size):
+                self._browsers.append(await self._launch())
+                self._relaunch_locks.append(asyncio.Lock())
+            for i in range(self.size):
+                for _ in range(self.contexts_per_browser):
+                    slot = _Slot(i)
+                    await self._ensure_context(slot)
+                    self._idle.put_nowait(slot)
+            self._created_at = time.monotonic()
+            self._started = True
+
+    async def close(self):
+        if not self._started:
+            return
+        self._started = False
+        for b in self._browsers:
+            try:
+                await b.close()
+            except Exception:
+                pass
+        self._browsers = []
+        try:
+            await self._pw.stop()
+        except Exception:
+            pass
+        self._pw = None
+
+    async def _launch(self):
+        self.counters["browser_launches"] += 1
+        return await self._pw.chromium.launch(headless=self.headless, args=self.launch_args)
+
+    async def _browser(self, idx: int):
+        """The browser at `idx`, relaunched if it has died."""
+        browser = self._browsers[idx]
+        if not browser.is_connected():
+            async with self._relaunch_locks[idx]:
+                browser = self._browsers[idx]
+                if not browser.is_connected():
+                    browser = await self._launch()
+                    self._browsers[idx] = browser
+        return browser
+
+    async def _ensure_context(self, slot: _Slot):
+        browser = self._browsers[slot.browser_idx]
+        if not browser.is_connected():
+            browser = await self._browser(slot.browser_idx)
+            slot.context = None
+        if slot.context is None:
+            slot.context = await browser.new_context(**self.context_options)
+            if self.context_setup is not None:
+                await self.context_setup(slot.context)
+            slot.uses = 0
+            self.counters["context_creates"] += 1
+
+    async def _drop_context(self, slot: _Slot):
+        if slot.context is not None:
+            try:
+                await slot.context.close()
+            except Exception:
+                pass
+        slot.context = None
+        self.counters["context_discards"] += 1
+
+    # ---------- checkout / checkin ----------
+
+    async def checkout(self, timeout: Optional[float] = None) -> Lease:
+        """Take a warm context. Waits up to `timeout` seconds; raises PoolExhausted
+        immediately if `max_waiters` callers are already queued."""
+        if not self._started:
+            await self.start()
+        t0 = time.monotonic()
+        slot = await _bounded_get(self, self._idle, timeout, "browser context")
+        try:
+            await self._ensure_context(slot)
+        except Exception:
+            slot.context = None
+            self._idle.put_nowait(slot)
+            raise
+
+        waited_ms = (time.monotonic() - t0) * 1000
+        self._latency_ms.append(waited_ms)
+        self._in_use += 1
+        self.counters["checkouts"] += 1
+        return Lease(slot, waited_ms)
+
+    async def checkin(self, lease: Lease, discard: bool = False, uses: int = 1):
+        """Return a lease. Open pages are closed; the context itself is kept for the
+        next caller unless `discard` is set or it has served `max_context_uses`.
+        `uses` is how many lookups the lease served (a PagePool lease serves many)."""
+        slot = lease.slot
+        self._in_use -= 1
+        self._busy_s += time.monotonic() - lease.started
+        self.counters["checkins"] += 1
+        slot.uses += uses
+        try:
+            if discard or slot.uses >= self.max_context_uses:
+                await self._drop_context(slot)
+            elif slot.context is not None:
+                for p in list(slot.context.pages):
+                    try:
+                        await p.close()
+                    except PWError:
+                        pass
+        except Exception:
+            await self._drop_context(slot)
+        finally:
+            self._idle.put_nowait(slot)
+
+    @asynccontextmanager
+    async def lease(self, timeout: Optional[float] = None):
+        lease = await self.checkout(timeout)
+        discard = False
+        try:
+            yield lease
+        except PWError as e:
+            # a timeout leaves the context usable; anything else may mean a dead page/browser
+            discard = not isinstance(e, PWTimeout)
+            raise
+        finally:
+            await self.checkin(lease, discard=discard)
+
+    @asynccontextmanager
+    async def one_off_context(self, **options):
+        """A fresh context on one of the pooled browsers, for sessions that need options the
+        reusable contexts cannot carry (record_har_path, HAR routing). Gets the pool's
+        context_options and context_setup, is closed on exit (which writes a recorded HAR)
+        and does not take a slot: callers bound their own concurrency."""
+        if not self._started:
+            await self.start()
+        browser = await self._browser(self.counters["one_off_contexts"] % self.size)
+        self.counters["one_off_contexts"] += 1
+        context = await browser.new_context(**{**self.context_options, **options})
+        try:
+            if self.context_setup is not None:
+                await self.context_setup(context)
+            yield context
+        finally:
+            try:
+                await context.close()
+            except Exception:
+                pass
+
+    # ---------- metrics ----------
+
+    def stats(self) -> Dict[str, Any]:
+        lat = list(self._latency_ms)
+        uptime = max(time.monotonic() - self._created_at, 1e-6)
+        return {
+            "size": self.size,
+            "capacity": self.capacity,
+            "in_use": self._in_use,
+            "idle": self._idle.qsize() if self._idle else 0,
+            "waiting": self._waiting,
+            "utilization": round(self._in_use / self.capacity, 3),
+            "utilization_avg": round(self._busy_s / (self.capacity * uptime), 3),
+            "checkout_ms_p50": _pct(lat, 0.50),
+            "checkout_ms_p95": _pct(lat, 0.95),
+            "checkout_ms_max": round(max(lat), 1) if lat else 0.0,
+            **self.counters,
+        }
+
+
+class _PageSlot:
+    """One parked page plus the context lease that backs it."""
+
+    def __init__(self):
+        self.lease: Optional[Lease] = None
+        self.page = None
+        self.ready = False      # sitting on the pool URL with the form loaded
+        self.pristine = None    # body text right after load, used to verify fast resets
+        self.uses = 0           # queries since the last navigation
+        self.lease_uses = 0     # queries on the current context lease
+
+
+class PageLease:
+    """A checked-out page. `ready` is False when warm-up failed and the caller must navigate itself."""
+
+    def __init__(self, slot: _PageSlot, waited_ms: float):
+        self.slot = slot
+        self.page = slot.page
+        self.ready = slot.ready
+        self.waited_ms = waited_ms
+
+
+class PagePool:
+    """Pages pre-navigated to `url` with `ready_selector` present.
+
+    After each use the page goes back through a reset before re-entering the pool:
+    `reset_js` is evaluated and the page is reused only if its body text matches the
+    freshly-loaded state again; otherwise it is re-navigated in the background. Either
+    way the next caller starts at the fill step instead of a page load.
+
+    Each slot holds its context lease across uses; after the browser pool's
+    `max_context_uses` queries the lease is checked in (which closes the context) and
+    the slot warms up on a fresh one."""
+
+    def __init__(self, browser_pool: BrowserPool, url: str, ready_selector: str,
+                 size: Optional[int] = None, reset_js: Optional[str] = None,
+                 max_page_uses: int = 25, nav_timeout_ms: int = 30000):
+        self.browser_pool = browser_pool
+        self.url = url
+        self.ready_selector = ready_selector
+        self.size = min(size or browser_pool.capacity, browser_pool.capacity)
+        self.reset_js = reset_js
+        self.max_page_uses = max_page_uses
+        self.nav_timeout_ms = nav_timeout_ms
+        self.max_waiters = browser_pool.max_waiters
+
+        self._idle: Optional[asyncio.Queue] = None
+        self._slots: List[_PageSlot] = []
+        self._tasks = set()
+        self._started = False
+        self._start_lock = asyncio.Lock()
+        self._waiting = 0
+        self._in_use = 0
+        self._latency_ms = deque(maxlen=256)
+        self.counters = {
+            "acquires": 0, "warm_acquires": 0, "waited": 0, "rejected": 0, "timeouts": 0,
+            "navigations": 0, "warm_failures": 0, "fast_resets": 0, "renavigations": 0, "broken": 0,
+            "context_recycles": 0,
+        }
+
+    async def start(self):
+        async with self._start_lock:
+            if self._started:
+                return
+            await self.browser_pool.start()
+            self._idle = asyncio.Queue()
+            self._slots = [_PageSlot() for _ in range(self.size)]
+            await asyncio.gather(*(self._warm(s) for s in self._slots))
+            for s in self._slots:
+                self._idle.put_nowait(s)
+            self._started = True
+
+    async def close(self):
+        for t in list(self._tasks):
+            t.cancel()
+        self._started = False
+        await self.browser_pool.close()
+
+    async def _warm(self, slot: _PageSlot):
+        """(Re)load the slot's page on `url` and wait for the form. Never raises."""
+        slot.ready = False
+        try:
+            if slot.lease is None:
+                slot.lease = await self.browser_pool.checkout()
+                slot.lease_uses = 0
+            if slot.page is None or slot.page.is_closed():
+                slot.page = await slot.lease.context.new_page()
+            await slot.page.goto(self.url, wait_until="domcontentloaded", timeout=self.nav_timeout_ms)
+            await slot.page.wait_for_selector(self.ready_selector, timeout=self.nav_timeout_ms)
+            slot.pristine = await slot.page.evaluate(_FINGERPRINT_JS)
+            slot.uses = 0
+            slot.ready = True
+            self.counters["navigations"] += 1
+        except Exception:
+            self.counters["warm_failures"] += 1
+
+    async def _fast_reset(self, slot: _PageSlot) -> bool:
+        if not self.reset_js or slot.pristine is None or slot.uses >= self.max_page_uses:
+            return False
+        try:
+            if slot.page.url.split("?")[0] != self.url.split("?")[0]:
+                return False
+            await slot.page.evaluate(self.reset_js)
+            return await slot.page.evaluate(_FINGERPRINT_JS) == slot.pristine
+        except Exception:
+            return False
+
+    async def _recycle(self, slot: _PageSlot, broken: bool):
+        try:
+            if broken or slot.lease_uses >= self.browser_pool.max_context_uses:
+                if broken:
+                    self.counters["broken"] += 1
+                else:
+                    self.counters["context_recycles"] += 1
+                if slot.lease is not None:
+                    await self.browser_pool.checkin(slot.lease, discard=broken, uses=slot.lease_uses)
+                slot.lease, slot.page, slot.pristine = None, None, None
+                await self._warm(slot)
+            elif await self._fast_reset(slot):
+                slot.ready = True
+                self.counters["fast_resets"] += 1
+            else:
+                self.counters["renavigations"] += 1
+                await self._warm(slot)
+        finally:
+            self._idle.put_nowait(slot)
+
+    async def acquire(self, timeout: Optional[float] = None) -> PageLease:
+        if not self._started:
+            await self.start()
+        t0 = time.monotonic()
+        slot = await _bounded_get(self, self._idle, timeout, "warm page")
+        if slot.lease is None or slot.page is None or slot.page.is_closed():
+            # the background refill failed; attach a fresh page on the caller's time
+            try:
+                if slot.lease is None:
+                    slot.lease = await self.browser_pool.checkout(timeout)
+                    slot.lease_uses = 0
+                slot.page = await slot.lease.context.new_page()
+                slot.ready = False
+            except Exception:
+                self._idle.put_nowait(slot)
+                raise
+        waited_ms = (time.monotonic() - t0) * 1000
+        self._latency_ms.append(waited_ms)
+        self._in_use += 1
+        self.counters["acquires"] += 1
+        if slot.ready:
+            self.counters["warm_acquires"] += 1
+        return PageLease(slot, waited_ms)
+
+    def release(self, lease: PageLease, broken: bool = False):
+        """Hand a page back. Reset / re-navigation happens in a background task."""
+        self._in_use -= 1
+        slot = lease.slot
+        slot.uses += 1
+        slot.lease_uses += 1
+        slot.ready = False
+        task = asyncio.get_running_loop().create_task(self._recycle(slot, broken))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    @asynccontextmanager
+    async def page(self, timeout: Optional[float] = None):
+        lease = await self.acquire(timeout)
+        broken = False
+        try:
+            yield lease
+        except PWError as e:
+            broken = not isinstance(e, PWTimeout)
+            raise
+        finally:
+            self.release(lease, broken=broken)
+
+    def stats(self) -> Dict[str, Any]:
+        lat = list(self._latency_ms)
+        return {
+            "pages": self.size,
+            "pages_in_use": self._in_use,
+            "pages_idle": self._idle.qsize() if self._idle else 0,
+            "pages_ready": sum(1 for s in self._slots if s.ready),
+            "page_waiting": self._waiting,
+            "page_wait_ms_p50": _pct(lat, 0.50),
+            "page_wait_ms_p95": _pct(lat, 0.95),
+            **{f"page_{k}" if k in ("waited", "rejected", "timeouts") else k: v for k, v in self.counters.items()},
+            "browser": self.browser_pool.stats(),
+        }
@@ -0,0 +1,69 @@
+# utils/bulk.py
+# Bulk status checks for operators: application numbers in (CSV or plain text), one CSV row
+# per number out. Used by the admin upload in bot.py and by test_scrape.py --csv.
+import asyncio, csv, io, re, time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from utils.tnega_status import FIELDS
+
+COLUMNS = ("input", "status", *FIELDS, "error", "elapsed_s")
+_APP_NO = re.compile(r"\bTN-[0-9A-Za-z]{3,}", re.I)
+
+CheckFn = Callable[[str], Awaitable[Dict[str, Any]]]
+ProgressFn = Callable[[int, int, Counter], Awaitable[None]]
+
+
+def read_app_numbers(text: str) -> List[str]:
+    """Every TN-... number in a CSV or text file, in order, without repeats."""
+    seen = {}
+    for m in _APP_NO.finditer(text or ""):
+        seen.setdefault(m.group(0).upper(), None)
+    return list(seen)
+
+
+async def check_many(app_nos: Iterable[str], check: CheckFn, concurrency: int = 4,
+                     on_progress: Optional[ProgressFn] = None) -> List[Dict[str, Any]]:
+    """Run `check` over the numbers with at most `concurrency` in flight; rows come back
+    in input order. The scraper's own rate limiter and breaker still apply per lookup."""
+    app_nos = list(app_nos)
+    sem = asyncio.Semaphore(max(1, concurrency))
+    rows: List[Optional[Dict[str, Any]]] = [None] * len(app_nos)
+    counts: Counter = Counter()
+
+    async def one(i: int, app_no: str):
+        async with sem:
+            t0 = time.monotonic()
+            try:
+                rows[i] = result_row(app_no, await check(app_no))
+            except Exception as e:
+                rows[i] = result_row(app_no, {"status": "error", "raw_text": f"Exception: {e}"})
+            rows[i]["elapsed_s"] = round(time.monotonic() - t0, 2)
+        counts[rows[i]["status"]] += 1
+        if on_progress is not None:
+            await on_progress(sum(counts.values()), len(app_nos), counts)
+
+    await asyncio.gather(*(one(i, a) for i, a in enumerate(app_nos)))
+    return rows  # type: ignore[return-value]
+
+
+def result_row(app_no: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    row = dict.fromkeys(COLUMNS, "")
+    row["input"] = app_no
+    row["status"] = result.get("status") or "error"
+    row.update({k: v for k, v in (result.get("data") or {}).items() if k in FIELDS})
+    if row["status"] in ("error", "unavailable"):
+        row["error"] = (result.get("raw_text") or "").splitlines()[0][:200] if result.get("raw_text") else ""
+    return row
+
+
+def to_csv(rows: List[Dict[str, Any]]) -> str:
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+    writer.writerows(rows)
+    return buf.getvalue()
+
+
+def summary(counts: Counter) -> str:
+    return ", ".join(f"{status} {n}" for status, n in counts.most_common())
@@ -0,0 +1,143 @@
+# utils/cert_archive.py
+# Certificates already delivered, by application number: the Telegram file_id, the local
+# copy (if archived) and who / when fetched it, so a repeat request for the same number is
+# answered at once instead of going through an operator again.
+import logging, os, sqlite3, threading, time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS certificates (
+    app_no TEXT PRIMARY KEY,
+    file_id TEXT NOT NULL,
+    file_unique_id TEXT NOT NULL DEFAULT '',
+    path TEXT,
+    size INTEGER NOT NULL DEFAULT 0,
+    service TEXT NOT NULL DEFAULT '',
+    name TEXT NOT NULL DEFAULT '',
+    job_id TEXT NOT NULL DEFAULT '',
+    operator_id INTEGER,
+    fetched_at REAL NOT NULL,
+    last_delivered REAL,
+    deliveries INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS certificates_fetched ON certificates(fetched_at);
+CREATE INDEX IF NOT EXISTS certificates_used ON certificates(path, last_delivered);
+"""
+_COLUMNS = ("app_no", "file_id", "file_unique_id", "path", "size", "service", "name", "job_id", "operator_id",
+            "fetched_at", "last_delivered", "deliveries")
+
+
+def normalize(app_no: str) -> str:
+    return (app_no or "").strip().upper()
+
+
+class CertArchive:
+    """Entries older than `max_age_s` are dropped with their file. Local copies are kept
+    within `max_bytes`, least recently delivered removed first; the entry stays, since the
+    file_id alone is enough to deliver."""
+
+    def __init__(self, db_path, max_age_s: float = 90 * 24 * 3600, max_bytes: int = 500 * 1024 * 1024):
+        self.max_age_s = max_age_s
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self.counters = {"hits": 0, "misses": 0, "stored": 0}
+
+    def put(self, app_no: str, file_id: str, file_unique_id: str = "", path: Optional[str] = None, size: int = 0,
+            **meta) -> None:
+        """Store (or replace) the certificate for `app_no`. meta: service, name, job_id, operator_id."""
+        row = {"app_no": normalize(app_no), "file_id": file_id, "file_unique_id": file_unique_id or "",
+               "path": path, "size": int(size or 0), "fetched_at": time.time(),
+               "service": meta.get("service") or "", "name": meta.get("name") or "",
+               "job_id": meta.get("job_id") or "", "operator_id": meta.get("operator_id")}
+        with self._lock:
+            self._db.execute(f"INSERT OR REPLACE INTO certificates ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})",
+                             tuple(row.values()))
+            self._db.commit()
+        self.counters["stored"] += 1
+
+    def get(self, app_no: str) -> Optional[Dict[str, Any]]:
+        """The entry for `app_no` if one is within max_age_s; a local path that no longer
+        exists is reported as None."""
+        with self._lock:
+            row = self._db.execute(f"SELECT {', '.join(_COLUMNS)} FROM certificates WHERE app_no = ? AND fetched_at >= ?",
+                                   (normalize(app_no), time.time() - self.max_age_s)).fetchone()
+        if row is None:
+            self.counters["misses"] += 1
+            return None
+        self.counters["hits"] += 1
+        entry = dict(zip(_COLUMNS, row))
+        if entry["path"] and not os.path.exists(entry["path"]):
+            entry["path"] = None
+        return entry
+
+    def delivered(self, app_no: str) -> None:
+        with self._lock:
+            self._db.execute("UPDATE certificates SET deliveries = deliveries + 1, last_delivered = ? WHERE app_no = ?",
+                             (time.time(), normalize(app_no)))
+            self._db.commit()
+
+    def set_path(self, app_no: str, path: Optional[str], size: int = 0) -> None:
+        with self._lock:
+            self._db.execute("UPDATE certificates SET path = ?, size = ? WHERE app_no = ?", (path, int(size), normalize(app_no)))
+            self._db.commit()
+
+    def forget(self, app_no: str) -> bool:
+        """Drop an entry (e.g. its file_id was rejected and there is no local copy)."""
+        with self._lock:
+            cur = self._db.execute("DELETE FROM certificates WHERE app_no = ?", (normalize(app_no),))
+            self._db.commit()
+        return cur.rowcount > 0
+
+    # ---------- retention ----------
+
+    @staticmethod
+    def _unlink(path: Optional[str]) -> int:
+        if not path:
+            return 0
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+            return size
+        except OSError:
+            return 0
+
+    def prune(self) -> Dict[str, int]:
+        """Apply max_age_s and max_bytes; returns what was removed."""
+        out = {"entries_removed": 0, "files_removed": 0, "bytes": 0}
+        cutoff = time.time() - self.max_age_s
+        with self._lock:
+            old = self._db.execute("SELECT app_no, path FROM certificates WHERE fetched_at < ?", (cutoff,)).fetchall()
+            self._db.execute("DELETE FROM certificates WHERE fetched_at < ?", (cutoff,))
+            self._db.commit()
+            files = self._db.execute(
+                "SELECT app_no, path, size FROM certificates WHERE path IS NOT NULL "
+                "ORDER BY COALESCE(last_delivered, fetched_at) DESC").fetchall()
+        out["entries_removed"] = len(old)
+        for _, path in old:
+            freed = self._unlink(path)
+            out["files_removed"] += bool(freed)
+            out["bytes"] += freed
+        # keep the most recently used copies within the budget
+        total, drop = 0, []
+        for app_no, path, size in files:
+            total += size
+            if total > self.max_bytes:
+                drop.append((app_no, path))
+        for app_no, path in drop:
+            freed = self._unlink(path)
+            self.set_path(app_no, None)
+            out["files_removed"] += bool(freed)
+            out["bytes"] += freed
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            n, files, size, deliveries = self._db.execute(
+                "SELECT COUNT(*), COUNT(path), COALESCE(SUM(CASE WHEN path IS NOT NULL THEN size END), 0), "
+                "COALESCE(SUM(deliveries), 0) FROM certificates").fetchone()
+        return {"certificates": n, "local_files": files, "bytes": size, "redeliveries": deliveries, **self.counters}
@@ -0,0 +1,147 @@
+# utils/delivery.py
+# Send documents by Telegram file_id instead of re-uploading bytes: a file already on
+# Telegram's servers (an operator's upload, or any local file we sent once) is delivered by
+# reference. Local files are uploaded only on a cache miss; archiving a received document
+# to disk is a background download that never delays the user.
+import asyncio, logging, sqlite3, threading, time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Set
+
+from telegram import InputFile, Message
+from telegram.error import BadRequest
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS file_ids (
+    bot_id INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    file_id TEXT NOT NULL,
+    file_unique_id TEXT NOT NULL DEFAULT '',
+    created REAL NOT NULL,
+    uses INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (bot_id, path)
+);
+"""
+
+
+class Delivery:
+    """file_ids are per bot, so the cache is keyed by (bot id, absolute path) and is only
+    trusted while the file's size and mtime are unchanged (a regenerated e-card is uploaded
+    again). A file_id Telegram rejects is dropped and the file re-uploaded."""
+
+    def __init__(self, db_path):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self._archives: Set[asyncio.Task] = set()
+        self.counters = {"by_file_id": 0, "cache_hits": 0, "uploads": 0, "stale": 0,
+                         "archived": 0, "archive_failed": 0}
+
+    # ---------- file_id cache ----------
+
+    def cached(self, bot_id: int, path) -> Optional[str]:
+        p = Path(path).resolve()
+        try:
+            st = p.stat()
+        except OSError:
+            return None
+        with self._lock:
+            row = self._db.execute("SELECT file_id FROM file_ids WHERE bot_id = ? AND path = ? AND size = ? AND mtime_ns = ?",
+                                   (bot_id, str(p), st.st_size, st.st_mtime_ns)).fetchone()
+        return row[0] if row else None
+
+    def remember(self, bot_id: int, path, file_id: str, file_unique_id: str = ""):
+        p = Path(path).resolve()
+        try:
+            st = p.stat()
+        except OSError:
+            return
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO file_ids (bot_id, path, size, mtime_ns, file_id, file_unique_id, created) "
+                             "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             (bot_id, str(p), st.st_size, st.st_mtime_ns, file_id, file_unique_id, time.time()))
+            self._db.commit()
+
+    def _forget(self, bot_id: int, path):
+        with self._lock:
+            self._db.execute("DELETE FROM file_ids WHERE bot_id = ? AND path = ?", (bot_id, str(Path(path).resolve())))
+            self._db.commit()
+
+    def _used(self, bot_id: int, path):
+        with self._lock:
+            self._db.execute("UPDATE file_ids SET uses = uses + 1 WHERE bot_id = ? AND path = ?",
+                             (bot_id, str(Path(path).resolve())))
+            self._db.commit()
+
+    # ---------- sending ----------
+
+    async def send_document(self, bot, chat_id: int, path=None, *, file_id: Optional[str] = None,
+                            filename: Optional[str] = None, **kwargs) -> Message:
+        """Send `file_id` if given, else the local file at `path` (by its cached file_id when
+        we have one). Extra kwargs (caption, parse_mode, reply_markup...) go to send_document."""
+        if file_id:
+            self.counters["by_file_id"] += 1
+            return await bot.send_document(chat_id=chat_id, document=file_id, **kwargs)
+
+        cached = self.cached(bot.id, path)
+        if cached:
+            try:
+                msg = await bot.send_document(chat_id=chat_id, document=cached, **kwargs)
+                self.counters["cache_hits"] += 1
+                self._used(bot.id, path)
+                return msg
+            except BadRequest as e:
+                logger.warning("Cached file_id for %s rejected (%s); uploading", path, e)
+                self.counters["stale"] += 1
+                self._forget(bot.id, path)
+
+        with open(path, "rb") as f:
+            msg = await bot.send_document(chat_id=chat_id, document=InputFile(f, filename=filename or Path(path).name),
+                                          **kwargs)
+        self.counters["uploads"] += 1
+        if msg.document:
+            self.remember(bot.id, path, msg.document.file_id, msg.document.file_unique_id)
+        return msg
+
+    # ---------- archive ----------
+
+    def archive(self, bot, file_id: str, dest_path,
+                on_saved: Optional[Callable[[str, int], None]] = None) -> asyncio.Task:
+        """Download `file_id` to `dest_path` in the background; the saved file is linked to
+        the same file_id, so sending it later costs no upload. on_saved(path, size) runs
+        only once the file is complete on disk."""
+        task = asyncio.get_running_loop().create_task(self._archive(bot, file_id, Path(dest_path), on_saved))
+        self._archives.add(task)
+        task.add_done_callback(self._archives.discard)
+        return task
+
+    async def _archive(self, bot, file_id: str, dest: Path, on_saved=None):
+        try:
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            f = await bot.get_file(file_id)
+            await f.download_to_drive(dest)
+            self.remember(bot.id, dest, file_id, f.file_unique_id)
+            self.counters["archived"] += 1
+        except Exception as e:
+            self.counters["archive_failed"] += 1
+            logger.error("Archiving %s to %s failed: %s", file_id, dest, e)
+            return
+        if on_saved is not None:
+            try:
+                on_saved(str(dest), dest.stat().st_size)
+            except Exception as e:
+                logger.error("Recording archived %s failed: %s", dest, e)
+
+    async def drain(self, timeout: float = 30.0):
+        """Wait for archive downloads still running (call on shutdown)."""
+        if self._archives:
+            await asyncio.wait(set(self._archives), timeout=timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            files, uses = self._db.execute("SELECT COUNT(*), COALESCE(SUM(uses), 0) FROM file_ids").fetchone()
+        return {"cached_files": files, "cached_sends": uses, "archiving": len(self._archives), **self.counters}
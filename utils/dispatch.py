@@ -0,0 +1,110 @@
+# utils/dispatch.py
+# Spreads certificate jobs over a pool of operators: each new job goes to the least-loaded
+# online operator, a claim is a lease that returns the job to the queue when it runs out, and
+# a background sweep re-routes expired and orphaned jobs.
+import asyncio, logging
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from utils.jobs import JobStore
+
+logger = logging.getLogger(__name__)
+
+# (operator chat id, job, reason) reason: "new" | "expired" | "rerouted"
+OfferFn = Callable[[int, Dict[str, Any], str], Awaitable[None]]
+
+
+class Dispatcher:
+    """`operators` are chat IDs allowed to take and deliver jobs; they start online and
+    toggle with set_online(). Jobs nobody could be assigned (everyone offline) wait in the
+    queue and are offered on the next sweep after someone comes back."""
+
+    def __init__(self, store: JobStore, operators: Iterable[int], offer: OfferFn, lease_s: float = 1800,
+                 sweep_s: float = 60.0):
+        self.store = store
+        self.operators = [int(c) for c in operators]
+        self.offer = offer
+        self.lease_s = lease_s
+        self.sweep_s = sweep_s
+        self.store.sync_operators(self.operators)
+        self._task: Optional[asyncio.Task] = None
+        self.counters = {"routed": 0, "unrouted": 0, "expired": 0, "rerouted": 0}
+
+    def is_operator(self, chat_id: int) -> bool:
+        return chat_id in self.operators
+
+    def set_online(self, operator_id: int, online: bool):
+        self.store.set_online(operator_id, online)
+
+    # ---------- jobs ----------
+
+    async def route(self, job: Dict[str, Any], reason: str = "new") -> Optional[int]:
+        """Assign `job` and offer it to the chosen operator; None if nobody is online."""
+        operator_id = self.store.assign(job["job_id"], self.operators)
+        if operator_id is None:
+            self.counters["unrouted"] += 1
+            logger.warning("No operator online for %s; queued", job["job_id"])
+            return None
+        self.counters["routed"] += 1
+        try:
+            await self.offer(operator_id, job, reason)
+        except Exception as e:
+            logger.error("Offering %s to operator %s failed: %s", job["job_id"], operator_id, e)
+        return operator_id
+
+    def take(self, job_id: str, operator_id: int) -> Tuple[Optional[Dict[str, Any]], str]:
+        """(job, "") on success (taking your own job again renews the lease), else
+        (None, "missing" | "done" | "taken")."""
+        job = self.store.take(job_id, operator_id, self.lease_s)
+        return (job, "") if job else (None, self._refusal(job_id))
+
+    def complete(self, job_id: str, operator_id: int) -> Tuple[Optional[Dict[str, Any]], str]:
+        """(job, "") once marked done, else (None, "missing" | "done" | "taken") as take()."""
+        job = self.store.complete(job_id, operator_id)
+        return (job, "") if job else (None, self._refusal(job_id))
+
+    def _refusal(self, job_id: str) -> str:
+        current = self.store.get(job_id)
+        if current is None:
+            return "missing"
+        return "done" if current["state"] == "done" else "taken"
+
+    # ---------- leases ----------
+
+    async def sweep_once(self) -> int:
+        """Expire overdue leases, then offer every waiting job that has no online operator."""
+        expired = self.store.expire_leases(self.lease_s)
+        self.counters["expired"] += len(expired)
+        for job in expired:
+            logger.info("Lease on %s expired; back in the queue", job["job_id"])
+        expired_ids = {j["job_id"] for j in expired}
+        routed = 0
+        for job in self.store.unrouted(self.operators):
+            reason = "expired" if job["job_id"] in expired_ids else "rerouted"
+            if await self.route(job, reason) is None:
+                break  # nobody online; the rest wait too
+            routed += 1
+            self.counters["rerouted"] += reason == "rerouted"
+        return routed
+
+    def stats(self, window_s: float = 3600) -> List[Dict[str, Any]]:
+        return self.store.operator_stats(self.operators, window_s)
+
+    # ---------- lifecycle ----------
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sweep_once()
+            except Exception as e:
+                logger.error("Job sweep failed: %s", e)
+            await asyncio.sleep(self.sweep_s)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
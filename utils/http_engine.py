@@ -0,0 +1,191 @@
+# utils/http_engine.py
+# Browserless fast path for TN e-District VerifyCerti.xhtml.
+# The page is a JSF form: GET it for the ViewState + session cookie, then POST the search
+# as a JSF partial (AJAX) request and read the rendered fragment. Callers escalate to the
+# Playwright engine when this returns ok=False (captcha, unexpected markup, HTTP errors).
+import asyncio, re, time
+from html.parser import HTMLParser
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import Any, Dict, List
+
+import httpx
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
+ACK_FIELD = "form1:acknumber"
+DEFAULT_SEARCH_SOURCE = "form1:acksearch"
+
+_UPDATE_RE = re.compile(r'<update id="([^"]*)">\s*<!\[CDATA\[(.*?)\]\]>', re.S)
+_BLOCK_TAGS = {"p", "div", "br", "li", "h1", "h2", "h3", "h4", "h5", "table", "form", "section"}
+
+
+class _PageParser(HTMLParser):
+    """Collects forms with their inputs, element ids, captcha markers and inner_text-like text
+    (cells separated by tabs, rows by newlines, the same shape parse_tnega_status expects)."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.forms: List[Dict[str, Any]] = []
+        self.ids: List[str] = []
+        self.captcha = False
+        self._form = None
+        self._skip = 0
+        self._text: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        a = {k: (v or "") for k, v in attrs}
+        if a.get("id"):
+            self.ids.append(a["id"])
+        if tag in ("script", "style"):
+            self._skip += 1
+        elif tag == "form":
+            self._form = {"id": a.get("id", ""), "action": a.get("action", ""), "inputs": {}}
+            self.forms.append(self._form)
+        elif tag == "input":
+            if self._form is not None and a.get("name"):
+                self._form["inputs"][a["name"]] = {"type": a.get("type", "text").lower(), "value": a.get("value", "")}
+            if "captcha" in (a.get("id", "") + a.get("name", "")).lower():
+                self.captcha = True
+        elif tag in ("img", "iframe", "div"):
+            marker = (a.get("src", "") + " " + a.get("id", "") + " " + a.get("class", "")).lower()
+            if "captcha" in marker:
+                self.captcha = True
+        if tag in _BLOCK_TAGS:
+            self._text.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style"):
+            self._skip = max(0, self._skip - 1)
+        elif tag == "form":
+            self._form = None
+        elif tag in ("td", "th"):
+            self._text.append("\t")
+        elif tag == "tr" or tag in _BLOCK_TAGS:
+            self._text.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip:
+            self._text.append(data)
+
+    def text(self) -> str:
+        lines = []
+        for ln in "".join(self._text).split("\n"):
+            cells = [" ".join(c.split()) for c in ln.split("\t")]
+            ln = "\t".join(c for c in cells if c)
+            if ln:
+                lines.append(ln)
+        return "\n".join(lines)
+
+
+def _parse(html: str) -> _PageParser:
+    p = _PageParser()
+    try:
+        p.feed(html)
+        p.close()
+    except Exception:
+        pass
+    return p
+
+
+# ---------- Pooled keep-alive client (one per event loop) ----------
+
+_clients: Dict[Any, httpx.AsyncClient] = {}
+
+
+def _get_client(timeout_s: float, max_connections: int) -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = httpx.AsyncClient(
+            headers={"User-Agent": USER_AGENT},
+            # the shared jar accepts nothing; each lookup carries its own session cookie
+            cookies=CookieJar(policy=DefaultCookiePolicy(allowed_domains=[])),
+            timeout=timeout_s,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections,
+                                keepalive_expiry=60),
+        )
+    return client
+
+
+async def close_client():
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+# ---------- Lookup ----------
+
+async def fetch_status(app_no: str, url: str, timeout_s: float = 15.0, max_connections: int = 20) -> Dict[str, Any]:
+    """Two round trips: GET the form, POST the search. Returns
+    {ok, reason, text, captcha, page_url, timings, bytes}. ok=False means "use the browser"."""
+    res: Dict[str, Any] = {"ok": False, "reason": "", "text": "", "captcha": False, "page_url": url,
+                           "timings": {}, "bytes": 0}
+    client = _get_client(timeout_s, max_connections)
+    t0 = time.monotonic()
+    try:
+        r = await client.get(url)
+        res["timings"]["get"] = round((time.monotonic() - t0) * 1000, 1)
+        res["bytes"] += len(r.content)
+        if r.status_code != 200:
+            res["reason"] = f"GET {r.status_code}"
+            return res
+        page = _parse(r.text)
+        form = next((f for f in page.forms if ACK_FIELD in f["inputs"]), None)
+        if form is None:
+            res["reason"] = "ack form not found"
+            return res
+        fields = {k: v["value"] for k, v in form["inputs"].items() if v["type"] == "hidden"}
+        if not any(k.endswith("ViewState") for k in fields):
+            res["reason"] = "no ViewState"
+            return res
+        source = next((i for i in page.ids if "acksearch" in i.lower()), DEFAULT_SEARCH_SOURCE)
+        form_id = form["id"] or "form1"
+        fields.update({
+            form_id: form_id,
+            ACK_FIELD: app_no,
+            source: source,
+            "javax.faces.partial.ajax": "true",
+            "javax.faces.source": source,
+            "javax.faces.partial.execute": "@all",
+            "javax.faces.partial.render": "@all",
+        })
+        action = str(r.url.join(form["action"])) if form["action"] else str(r.url)
+        # the session cookie may come on a redirect hop (e.g. JSESSIONID set before a 302)
+        jar = {}
+        for hop in (*r.history, r):
+            jar.update(hop.cookies.items())
+        cookie = "; ".join(f"{k}={v}" for k, v in jar.items())
+        headers = {"Faces-Request": "partial/ajax", "X-Requested-With": "XMLHttpRequest", "Referer": str(r.url)}
+        if cookie:
+            headers["Cookie"] = cookie
+
+        t1 = time.monotonic()
+        p = await client.post(action, data=fields, headers=headers)
+        res["timings"]["post"] = round((time.monotonic() - t1) * 1000, 1)
+        res["page_url"] = str(p.url)
+        res["bytes"] += len(p.content)
+        if p.status_code != 200:
+            res["reason"] = f"POST {p.status_code}"
+            return res
+        body = p.text
+        if "<partial-response" in body:
+            if "<redirect" in body or "<error>" in body:
+                res["reason"] = "partial-response redirect/error"
+                return res
+            body = "\n".join(html for uid, html in _UPDATE_RE.findall(body) if "ViewState" not in uid)
+        result = _parse(body)
+        res["text"] = result.text()
+        res["captcha"] = result.captcha
+        if result.captcha:
+            res["reason"] = "captcha"
+            return res
+        if not res["text"]:
+            res["reason"] = "empty response"
+            return res
+        res["ok"] = True
+        return res
+    except httpx.HTTPError as e:
+        res["reason"] = f"{type(e).__name__}: {e}"
+        return res
+    finally:
+        res["timings"]["total"] = round((time.monotonic() - t0) * 1000, 1)
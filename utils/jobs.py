@@ -0,0 +1,276 @@
+# utils/jobs.py
+# Certificate fulfilment jobs in SQLite (WAL): each create / take / complete is one small
+# transaction instead of a rewrite of the whole tasks.json.
+#
+#   python -m utils.jobs import tasks.json [jobs.sqlite3]     one-shot migration
+import json, logging, os, sqlite3, sys, threading, time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+STATES = ("pending_admin", "in_progress", "done")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    app_no TEXT NOT NULL,
+    name TEXT NOT NULL DEFAULT '',
+    father_name TEXT NOT NULL DEFAULT '',
+    service TEXT NOT NULL DEFAULT '',
+    status_text TEXT NOT NULL DEFAULT '',
+    remarks TEXT NOT NULL DEFAULT '',
+    gender TEXT NOT NULL DEFAULT '',
+    date_of_request TEXT NOT NULL DEFAULT '',
+    user_chat_id INTEGER NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending_admin',
+    created_at INTEGER NOT NULL,
+    taken_at INTEGER,
+    done_at INTEGER,
+    extra TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs(state, created_at);
+CREATE INDEX IF NOT EXISTS jobs_user ON jobs(user_chat_id, created_at);
+CREATE TABLE IF NOT EXISTS operators (
+    chat_id INTEGER PRIMARY KEY,
+    online INTEGER NOT NULL DEFAULT 1,
+    last_assigned REAL NOT NULL DEFAULT 0,
+    expired INTEGER NOT NULL DEFAULT 0
+);
+"""
+# added after the first release; created on open if missing
+_LATER_COLUMNS = {"operator_id": "INTEGER", "lease_until": "INTEGER"}
+_COLUMNS = ("job_id", "app_no", "name", "father_name", "service", "status_text", "remarks", "gender",
+            "date_of_request", "user_chat_id", "state", "created_at", "taken_at", "done_at",
+            "operator_id", "lease_until")
+# /check fields copied onto a new job: job column -> parsed key
+_FROM_PARSED = {"name": "applicant_name", "father_name": "father_name", "service": "request_for",
+                "status_text": "status_text", "remarks": "remarks", "gender": "gender",
+                "date_of_request": "date_of_request"}
+
+
+class JobStore:
+    """Jobs as dicts with the same keys tasks.json had. Safe to share between handlers and
+    between processes on one host: writes take the database lock (BEGIN IMMEDIATE).
+
+    Job IDs stay "JOB-<unix seconds>"; a second job in the same second gets "-001", "-002",
+    ... appended, allocated inside the insert transaction, so IDs never collide and sort by
+    creation time."""
+
+    def __init__(self, db_path):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        have = {r[1] for r in self._db.execute("PRAGMA table_info(jobs)")}
+        for col, decl in _LATER_COLUMNS.items():
+            if col not in have:
+                self._db.execute(f"ALTER TABLE jobs ADD COLUMN {col} {decl}")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_operator ON jobs(operator_id, state)")
+
+    @contextmanager
+    def _tx(self):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    @staticmethod
+    def _job(row) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        return {**json.loads(row[-1] or "{}"), **dict(zip(_COLUMNS, row[:-1]))}
+
+    def _select(self, where: str, args: tuple = (), suffix: str = "") -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute(f"SELECT {', '.join(_COLUMNS)}, extra FROM jobs WHERE {where} {suffix}",
+                                    args).fetchall()
+        return [self._job(r) for r in rows]
+
+    # ---------- jobs ----------
+
+    def _next_id(self, db, ts: int) -> str:
+        base = f"JOB-{ts}"
+        last = db.execute("SELECT job_id FROM jobs WHERE job_id = ? OR job_id LIKE ? ORDER BY job_id DESC LIMIT 1",
+                          (base, base + "-%")).fetchone()
+        if last is None:
+            return base
+        seq = int(last[0][len(base) + 1:] or 0)
+        return f"{base}-{seq + 1:03d}"
+
+    def create(self, app_no: str, parsed: Dict[str, Any], user_chat_id: int) -> Dict[str, Any]:
+        ts = int(time.time())
+        job = {"app_no": app_no, **{col: parsed.get(key) or "" for col, key in _FROM_PARSED.items()},
+               "user_chat_id": user_chat_id, "state": "pending_admin", "created_at": ts}
+        with self._tx() as db:
+            job = {"job_id": self._next_id(db, ts), **job}
+            db.execute(f"INSERT INTO jobs ({', '.join(job)}) VALUES ({', '.join('?' * len(job))})",
+                       tuple(job.values()))
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        jobs = self._select("job_id = ?", (job_id,))
+        return jobs[0] if jobs else None
+
+    def take(self, job_id: str, operator_id: Optional[int] = None,
+             lease_s: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Claim a job for `operator_id` until now + `lease_s` (no expiry without lease_s).
+        Succeeds for a waiting job, the operator's own claim (renewing it) or an expired
+        lease; None if the job is missing, done or leased to someone else."""
+        now = int(time.time())
+        lease_until = now + int(lease_s) if lease_s else None
+        with self._tx() as db:
+            cur = db.execute(
+                "UPDATE jobs SET state = 'in_progress', taken_at = ?, operator_id = ?, lease_until = ? "
+                "WHERE job_id = ? AND (state = 'pending_admin' OR (state = 'in_progress' AND "
+                "(operator_id IS ? OR operator_id IS NULL OR lease_until IS NULL OR lease_until < ?)))",
+                (now, operator_id, lease_until, job_id, operator_id, now))
+        return self.get(job_id) if cur.rowcount else None
+
+    def complete(self, job_id: str, operator_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Mark done, crediting `operator_id` when given. Only an open job completes, and
+        with an operator only one that operator could take() now (waiting, their own claim,
+        or an expired lease); None otherwise."""
+        now = int(time.time())
+        with self._tx() as db:
+            cur = db.execute(
+                "UPDATE jobs SET state = 'done', done_at = ?, lease_until = NULL, operator_id = COALESCE(?, operator_id) "
+                "WHERE job_id = ? AND state != 'done' AND (? IS NULL OR state = 'pending_admin' OR operator_id IS ? "
+                "OR operator_id IS NULL OR lease_until IS NULL OR lease_until < ?)",
+                (now, operator_id, job_id, operator_id, operator_id, now))
+        return self.get(job_id) if cur.rowcount else None
+
+    def open_jobs(self) -> List[Dict[str, Any]]:
+        """pending_admin and in_progress jobs, oldest first."""
+        return self._select("state IN ('pending_admin', 'in_progress')", suffix="ORDER BY created_at, job_id")
+
+    def for_user(self, user_chat_id: int, limit: int = 20) -> List[Dict[str, Any]]:
+        return self._select("user_chat_id = ?", (user_chat_id,), f"ORDER BY created_at DESC, job_id DESC LIMIT {int(limit)}")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._db.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall()
+        return {**{s: 0 for s in STATES}, **dict(rows)}
+
+    # ---------- operators ----------
+
+    def sync_operators(self, chat_ids) -> None:
+        """Register operators (new ones start online); others keep their state and history."""
+        with self._tx() as db:
+            db.executemany("INSERT OR IGNORE INTO operators (chat_id) VALUES (?)", [(int(c),) for c in chat_ids])
+
+    def set_online(self, operator_id: int, online: bool) -> None:
+        with self._tx() as db:
+            db.execute("UPDATE operators SET online = ? WHERE chat_id = ?", (int(online), operator_id))
+
+    def assign(self, job_id: str, operators) -> Optional[int]:
+        """Give a waiting job to the online operator (among `operators`) with the fewest open
+        jobs, the one assigned longest ago on a tie. None when nobody is online."""
+        ids = [int(c) for c in operators]
+        if not ids:
+            return None
+        with self._tx() as db:
+            row = db.execute(
+                "SELECT o.chat_id FROM operators o LEFT JOIN jobs j ON j.operator_id = o.chat_id "
+                f"AND j.state != 'done' WHERE o.online = 1 AND o.chat_id IN ({', '.join('?' * len(ids))}) "
+                "GROUP BY o.chat_id ORDER BY COUNT(j.job_id), o.last_assigned LIMIT 1", ids).fetchone()
+            if row is None:
+                return None
+            cur = db.execute("UPDATE jobs SET operator_id = ? WHERE job_id = ? AND state = 'pending_admin'",
+                             (row[0], job_id))
+            if not cur.rowcount:
+                return None
+            db.execute("UPDATE operators SET last_assigned = ? WHERE chat_id = ?", (time.time(), row[0]))
+        return row[0]
+
+    def expire_leases(self, default_lease_s: float) -> List[Dict[str, Any]]:
+        """Claims past their lease go back to the queue (unassigned); returns those jobs.
+        Claims made before leases existed expire `default_lease_s` after they were taken."""
+        now = int(time.time())
+        with self._tx() as db:
+            rows = db.execute("SELECT job_id, operator_id FROM jobs WHERE state = 'in_progress' "
+                              "AND COALESCE(lease_until, taken_at + ?, 0) < ?", (int(default_lease_s), now)).fetchall()
+            for job_id, operator_id in rows:
+                db.execute("UPDATE jobs SET state = 'pending_admin', operator_id = NULL, lease_until = NULL "
+                           "WHERE job_id = ?", (job_id,))
+                if operator_id is not None:
+                    db.execute("UPDATE operators SET expired = expired + 1 WHERE chat_id = ?", (operator_id,))
+        return [self.get(job_id) for job_id, _ in rows]
+
+    def unrouted(self, operators) -> List[Dict[str, Any]]:
+        """Waiting jobs with no operator, or one who is offline / no longer configured."""
+        ids = [int(c) for c in operators] or [0]
+        return self._select(
+            "state = 'pending_admin' AND (operator_id IS NULL OR operator_id NOT IN "
+            f"(SELECT chat_id FROM operators WHERE online = 1 AND chat_id IN ({', '.join('?' * len(ids))})))",
+            tuple(ids), "ORDER BY created_at, job_id")
+
+    def operator_stats(self, operators, window_s: float = 3600) -> List[Dict[str, Any]]:
+        """Per operator: online, open (assigned + claimed) jobs, completions in the last
+        `window_s` and overall, mean minutes from claim to delivery, expired leases."""
+        since = int(time.time() - window_s)
+        out = []
+        with self._lock:
+            for chat_id in operators:
+                online, expired = self._db.execute("SELECT online, expired FROM operators WHERE chat_id = ?",
+                                                   (chat_id,)).fetchone() or (0, 0)
+                open_, recent, done, avg_s = self._db.execute(
+                    "SELECT SUM(state != 'done'), SUM(state = 'done' AND done_at >= ?), SUM(state = 'done'), "
+                    "AVG(CASE WHEN state = 'done' AND taken_at IS NOT NULL THEN done_at - taken_at END) "
+                    "FROM jobs WHERE operator_id = ?", (since, chat_id)).fetchone()
+                out.append({"operator_id": chat_id, "online": bool(online), "open": open_ or 0,
+                            "done_recent": recent or 0, "done_total": done or 0,
+                            "avg_handle_min": round(avg_s / 60, 1) if avg_s is not None else None,
+                            "expired": expired})
+        return out
+
+    # ---------- migration ----------
+
+    def import_json(self, path) -> int:
+        """Copy jobs from a tasks.json ({"jobs": [...]}); IDs already present are skipped.
+        Keys without a column (anything added by hand) are kept in `extra`."""
+        with open(path, "r", encoding="utf-8") as f:
+            jobs = json.load(f).get("jobs", [])
+        added = 0
+        with self._tx() as db:
+            for j in jobs:
+                if not j.get("job_id"):
+                    continue
+                row = {c: j.get(c) for c in _COLUMNS}
+                for col in _FROM_PARSED:
+                    row[col] = row[col] or ""
+                row["state"] = row["state"] or "pending_admin"
+                row["created_at"] = int(row["created_at"] or 0)
+                row["user_chat_id"] = int(row["user_chat_id"] or 0)
+                extra = {k: v for k, v in j.items() if k not in _COLUMNS}
+                cur = db.execute(f"INSERT OR IGNORE INTO jobs ({', '.join(_COLUMNS)}, extra) "
+                                 f"VALUES ({', '.join('?' * (len(_COLUMNS) + 1))})",
+                                 (*row.values(), json.dumps(extra, ensure_ascii=False)))
+                added += cur.rowcount
+        return added
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def migrate_tasks_json(store: JobStore, path) -> int:
+    """One-shot: import `path` and rename it to <path>.imported so it is not read again."""
+    if not os.path.exists(path):
+        return 0
+    added = store.import_json(path)
+    os.replace(path, f"{path}.imported")
+    logger.info("Imported %d jobs from %s into the job store", added, path)
+    return added
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] != "import":
+        sys.exit("usage: python -m utils.jobs import tasks.json [jobs.sqlite3]")
+    logging.basicConfig(level=logging.INFO)
+    print(f"{migrate_tasks_json(JobStore(sys.argv[3] if len(sys.argv) > 3 else 'jobs.sqlite3'), sys.argv[2])} jobs imported")
@@ -0,0 +1,165 @@
+# utils/ratelimit.py
+# Per-host token buckets for the government sites both scrapers hit. One bucket per host
+# per process, usable from asyncio (Playwright) and from worker threads (Selenium).
+import asyncio, threading, time
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+DEFAULT_LIMIT = {"rate": 0.5, "burst": 2}
+
+
+class RateLimited(Exception):
+    """The wait for a token would exceed the caller's max_wait."""
+
+
+class TokenBucket:
+    """`rate` requests per second on average, up to `burst` back to back. Tokens are
+    reserved up front, so each caller learns its wait immediately and later callers queue
+    behind it; expected_wait() is what a new caller would wait now.
+
+    penalize() (timeout, 5xx, captcha) multiplies the rate by `backoff`, at most once per
+    `backoff_gap_s` so one incident seen by many requests counts once, never below
+    `min_rate`. success() adds back `recover` x the configured rate per good response,
+    once `cooldown_s` has passed since the last penalty."""
+
+    def __init__(self, rate: float, burst: int = 1, min_rate: Optional[float] = None, backoff: float = 0.5,
+                 recover: float = 0.1, cooldown_s: float = 30.0, backoff_gap_s: float = 5.0):
+        self.base_rate = float(rate)
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self.min_rate = float(min_rate) if min_rate else self.base_rate / 8
+        self.backoff = backoff
+        self.recover = recover
+        self.cooldown_s = cooldown_s
+        self.backoff_gap_s = backoff_gap_s
+        self._tokens = float(self.burst)
+        self._stamp = time.monotonic()
+        self._penalized_at = float("-inf")
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.counters = {"acquired": 0, "waited": 0, "wait_s": 0.0, "rejected": 0, "penalties": 0, "successes": 0}
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    # ---------- tokens ----------
+
+    def reserve(self, max_wait: Optional[float] = None) -> float:
+        """Take a token; returns how long to wait before using it."""
+        with self._lock:
+            self._refill(time.monotonic())
+            wait = max(0.0, (1 - self._tokens) / self.rate)
+            if max_wait is not None and wait > max_wait:
+                self.counters["rejected"] += 1
+                raise RateLimited(f"~{wait:.0f}s wait for a request slot")
+            self._tokens -= 1
+            self.counters["acquired"] += 1
+            if wait > 0:
+                self.counters["waited"] += 1
+                self.counters["wait_s"] += wait
+            return wait
+
+    def cancel(self):
+        """Give back a reserved token that will not be used."""
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + 1)
+
+    def acquire(self, max_wait: Optional[float] = None) -> float:
+        """Blocking acquire for worker threads; returns the time waited."""
+        wait = self.reserve(max_wait)
+        if wait > 0:
+            with self._lock:
+                self.waiting += 1
+            try:
+                time.sleep(wait)
+            finally:
+                with self._lock:
+                    self.waiting -= 1
+        return wait
+
+    async def acquire_async(self, max_wait: Optional[float] = None) -> float:
+        wait = self.reserve(max_wait)
+        if wait > 0:
+            with self._lock:
+                self.waiting += 1
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self.cancel()
+                raise
+            finally:
+                with self._lock:
+                    self.waiting -= 1
+        return wait
+
+    def expected_wait(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            return max(0.0, (1 - self._tokens) / self.rate)
+
+    # ---------- feedback ----------
+
+    def penalize(self):
+        with self._lock:
+            now = time.monotonic()
+            if now - self._penalized_at < self.backoff_gap_s:
+                return
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate * self.backoff)
+            self._penalized_at = now
+            self.counters["penalties"] += 1
+
+    def success(self):
+        with self._lock:
+            self.counters["successes"] += 1
+            now = time.monotonic()
+            if self.rate >= self.base_rate or now - self._penalized_at < self.cooldown_s:
+                return
+            self._refill(now)
+            self.rate = min(self.base_rate, self.rate + self.base_rate * self.recover)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refill(time.monotonic())
+            return {"rate": round(self.rate, 3), "base_rate": self.base_rate, "burst": self.burst,
+                    "tokens": round(self._tokens, 2), "waiting": self.waiting,
+                    "expected_wait_s": round(max(0.0, (1 - self._tokens) / self.rate), 1), **self.counters}
+
+
+# ---------- registry ----------
+
+_buckets: Dict[str, TokenBucket] = {}
+_registry_lock = threading.Lock()
+
+
+def host_of(url_or_host: str) -> str:
+    """host[:port] of a URL (a non-default port is a different upstream, e.g. local mocks)."""
+    if "//" not in url_or_host:
+        return url_or_host.lower()
+    parts = urlsplit(url_or_host)
+    return f"{parts.hostname}:{parts.port}" if parts.port else (parts.hostname or "")
+
+
+def configure(url_or_host: str, **limits) -> TokenBucket:
+    """Set the limits for one host (replaces its bucket); unset keys use DEFAULT_LIMIT."""
+    bucket = TokenBucket(**{**DEFAULT_LIMIT, **limits})
+    with _registry_lock:
+        _buckets[host_of(url_or_host)] = bucket
+    return bucket
+
+
+def limiter(url_or_host: str) -> TokenBucket:
+    """The shared bucket for this host, created with DEFAULT_LIMIT on first use."""
+    host = host_of(url_or_host)
+    with _registry_lock:
+        bucket = _buckets.get(host)
+        if bucket is None:
+            bucket = _buckets[host] = TokenBucket(**DEFAULT_LIMIT)
+        return bucket
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    with _registry_lock:
+        buckets = dict(_buckets)
+    return {host: b.stats() for host, b in buckets.items()}
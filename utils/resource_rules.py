@@ -0,0 +1,136 @@
+# utils/resource_rules.py
+# Per-site request blocking for scraper page loads: drop resource types and third-party
+# hosts that never affect the text we read. Used by the Playwright engine (route
+# interception) and the CMCHIS Selenium scraper (CDP Network.setBlockedURLs).
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+try:
+    import config
+    _OVERRIDES = getattr(config, "SCRAPER_BLOCK_RULES", {}) or {}
+except ImportError:  # the CMCHIS bot runs without the root config module
+    _OVERRIDES = {}
+
+KNOWN_THIRD_PARTY_HOSTS = [
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net", "googlesyndication.com",
+    "fonts.googleapis.com", "fonts.gstatic.com", "facebook.net", "facebook.com", "hotjar.com",
+    "clarity.ms", "addthis.com", "sharethis.com", "twitter.com", "youtube.com",
+]
+
+# block_types: Playwright resource types to abort.
+# first_party: hosts always allowed (suffix match); block_third_party drops every other host.
+# block_hosts: extra hosts dropped even when third-party traffic is otherwise allowed.
+SITE_RULES: Dict[str, Dict[str, Any]] = {
+    "tnedistrict.tn.gov.in": {
+        "block_types": ["image", "media", "font", "stylesheet"],
+        "first_party": ["tnedistrict.tn.gov.in"],
+        "block_third_party": True,
+        "block_hosts": KNOWN_THIRD_PARTY_HOSTS,
+    },
+    # e-card PDF and preview screenshot are rendered from this page: keep images and CSS
+    "claim.cmchistn.com": {
+        "block_types": ["media"],
+        "first_party": ["cmchistn.com"],
+        "block_third_party": False,
+        "block_hosts": KNOWN_THIRD_PARTY_HOSTS,
+    },
+}
+DEFAULT_RULES = {"block_types": ["media"], "first_party": [], "block_third_party": False,
+                 "block_hosts": KNOWN_THIRD_PARTY_HOSTS}
+
+# URL patterns standing in for resource types where only URLs can be matched (CDP)
+_TYPE_PATTERNS = {
+    "image": ["*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.svg*", "*.ico*", "*.webp*"],
+    "font": ["*.woff*", "*.ttf*", "*.otf*", "*.eot*"],
+    "stylesheet": ["*.css*"],
+    "media": ["*.mp4*", "*.webm*", "*.mp3*", "*.ogg*"],
+}
+
+
+def rules_for(url_or_host: str) -> Dict[str, Any]:
+    host = urlsplit(url_or_host).hostname if "://" in url_or_host else url_or_host
+    host = (host or "").lower()
+    for site, rules in list(SITE_RULES.items()) + list(_OVERRIDES.items()):
+        if host == site or host.endswith("." + site):
+            merged = dict(SITE_RULES.get(site, DEFAULT_RULES))
+            merged.update(_OVERRIDES.get(site, {}))
+            return merged
+    return dict(DEFAULT_RULES)
+
+
+def _host_in(host: str, hosts: List[str]) -> bool:
+    return any(host == h or host.endswith("." + h) for h in hosts)
+
+
+def block_reason(rules: Dict[str, Any], url: str, resource_type: str) -> Optional[str]:
+    """Why a request should be dropped, or None to let it through."""
+    host = (urlsplit(url).hostname or "").lower()
+    if not host:  # data:, blob:, about:
+        return None
+    if resource_type == "document" and _host_in(host, rules["first_party"]):
+        return None
+    if resource_type in rules["block_types"]:
+        return f"type:{resource_type}"
+    if _host_in(host, rules["block_hosts"]):
+        return "host"
+    if rules["block_third_party"] and rules["first_party"] and not _host_in(host, rules["first_party"]):
+        return "third_party"
+    return None
+
+
+def blocked_url_patterns(rules: Dict[str, Any]) -> List[str]:
+    """Wildcard patterns for Chrome's Network.setBlockedURLs."""
+    pats = [f"*{h}*" for h in rules["block_hosts"]]
+    for t in rules["block_types"]:
+        pats.extend(_TYPE_PATTERNS.get(t, []))
+    return pats
+
+
+class RequestBlocker:
+    """Playwright route handler for one site. install() once per context; begin()/end()
+    around each scrape collect requests, blocked requests and bytes for that page."""
+
+    def __init__(self, rules: Dict[str, Any]):
+        self.rules = rules
+        self._pages: Dict[Any, Dict[str, Any]] = {}
+
+    async def install(self, context):
+        await context.route("**/*", self._route)
+        context.on("requestfinished", self._finished)
+
+    def _stats_for(self, request) -> Optional[Dict[str, Any]]:
+        try:
+            return self._pages.get(request.frame.page)
+        except Exception:
+            return None
+
+    async def _route(self, route):
+        req = route.request
+        reason = block_reason(self.rules, req.url, req.resource_type)
+        st = self._stats_for(req)
+        if st is not None:
+            st["requests"] += 1
+        if reason:
+            if st is not None:
+                st["blocked"] += 1
+                st["blocked_by"][reason] = st["blocked_by"].get(reason, 0) + 1
+            await route.abort("blockedbyclient")
+        else:
+            await route.continue_()
+
+    async def _finished(self, request):
+        st = self._stats_for(request)
+        if st is None:
+            return
+        try:
+            sizes = await request.sizes()
+            st["bytes"] += sizes.get("responseBodySize", 0) + sizes.get("responseHeadersSize", 0)
+            st["bytes"] += sizes.get("requestBodySize", 0) + sizes.get("requestHeadersSize", 0)
+        except Exception:
+            pass
+
+    def begin(self, page):
+        self._pages[page] = {"requests": 0, "blocked": 0, "bytes": 0, "blocked_by": {}}
+
+    def end(self, page) -> Dict[str, Any]:
+        return self._pages.pop(page, None) or {}
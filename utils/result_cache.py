@@ -0,0 +1,145 @@
+# utils/result_cache.py
+# Status-aware cache in front of the eDistrict lookup: final answers live long, pending
+# ones briefly, no_record is negatively cached, captcha/error are never stored.
+import copy, json, sqlite3, threading, time
+from typing import Any, Dict, Optional
+
+DEFAULT_TTL_S = {
+    "approved": 7 * 24 * 3600,
+    "rejected": 7 * 24 * 3600,
+    "pending": 30 * 60,
+    "no_record": 10 * 60,
+}
+# only these keys are kept; screenshots and debug output belong to the original lookup
+_KEEP = ("status", "data", "raw_text", "page_url")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    result TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    cached_at REAL NOT NULL,
+    expires REAL NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_used ON results(used);
+CREATE INDEX IF NOT EXISTS results_expires ON results(expires);
+"""
+
+
+def cache_key(app_no: str) -> str:
+    return (app_no or "").strip().upper()
+
+
+class ResultCache:
+    """LRU bounded by entry count and approximate bytes, with per-status TTLs, in SQLite
+    (WAL) so every process on the host (webhook workers, scripts) sees the same entries
+    and an invalidation reaches all of them. `path` None keeps it in memory, private to
+    this instance. Hit / miss counters are per process."""
+
+    def __init__(self, ttl_s: Optional[Dict[str, int]] = None, max_entries: int = 5000,
+                 max_bytes: int = 8 * 1024 * 1024, path=None):
+        self.ttl_s = dict(DEFAULT_TTL_S if ttl_s is None else ttl_s)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.counters = {"hits": 0, "misses": 0, "expired": 0, "stores": 0, "evictions": 0,
+                         "skipped": 0, "invalidations": 0}
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        """Opened on first use (callers hold the lock), so creating a cache touches no files."""
+        if self._conn is None:
+            db = sqlite3.connect(str(self.path) if self.path else ":memory:", check_same_thread=False,
+                                 isolation_level=None, timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(_SCHEMA)
+            self._conn = db
+        return self._conn
+
+    # ---------- public ----------
+
+    def get(self, app_no: str) -> Optional[Dict[str, Any]]:
+        key = cache_key(app_no)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT result, cached_at, expires FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.counters["misses"] += 1
+                return None
+            if row[2] <= now:
+                self._db.execute("DELETE FROM results WHERE key = ? AND expires <= ?", (key, now))
+                self.counters["expired"] += 1
+                self.counters["misses"] += 1
+                return None
+            self._db.execute("UPDATE results SET used = ? WHERE key = ?", (now, key))
+            self.counters["hits"] += 1
+        result = json.loads(row[0])
+        result["screenshot"] = ""
+        result["debug"] = {"cache": {"hit": True, "age_s": int(now - row[1]), "expires_in_s": int(row[2] - now)}}
+        return result
+
+    def put(self, app_no: str, result: Dict[str, Any]) -> bool:
+        ttl = self.ttl_s.get(result.get("status"))
+        if not ttl:
+            self.counters["skipped"] += 1
+            return False
+        slim = json.dumps({k: copy.deepcopy(result.get(k)) for k in _KEEP}, ensure_ascii=False, default=str)
+        size = len(slim)
+        if size > self.max_bytes:
+            self.counters["skipped"] += 1
+            return False
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute("INSERT OR REPLACE INTO results (key, result, size, cached_at, expires, used) "
+                                 "VALUES (?, ?, ?, ?, ?, ?)", (cache_key(app_no), slim, size, now, now + ttl, now))
+                self._evict(now)
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+            self.counters["stores"] += 1
+        return True
+
+    def invalidate(self, app_no: str) -> bool:
+        with self._lock:
+            cur = self._db.execute("DELETE FROM results WHERE key = ?", (cache_key(app_no),))
+            found = cur.rowcount > 0
+            if found:
+                self.counters["invalidations"] += 1
+        return found
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results "
+                                             "WHERE expires > ?", (time.time(),)).fetchone()
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                "entries": entries,
+                "bytes": size,
+                "hit_rate": round(self.counters["hits"] / lookups, 3) if lookups else 0.0,
+                **self.counters,
+            }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # ---------- internals (caller holds the lock, inside a transaction) ----------
+
+    def _evict(self, now: float):
+        self._db.execute("DELETE FROM results WHERE expires <= ?", (now,))
+        # least recently used beyond max_entries, then beyond max_bytes
+        cur = self._db.execute("DELETE FROM results WHERE key IN "
+                               "(SELECT key FROM results ORDER BY used DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+        evicted = cur.rowcount
+        cur = self._db.execute("DELETE FROM results WHERE key IN (SELECT key FROM "
+                               "(SELECT key, SUM(size) OVER (ORDER BY used DESC, key) AS running FROM results) "
+                               "WHERE running > ?)", (self.max_bytes,))
+        self.counters["evictions"] += evicted + cur.rowcount
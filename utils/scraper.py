@@ -1,124 +1,722 @@
 ﻿# utils/scraper.py
 # Stable Playwright scraper for TN e-District VerifyCerti.xhtml
-from playwright.sync_api import sync_playwright, TimeoutError as PWTimeout, Error as PWError
+# A browserless JSF form post (utils/http_engine.py) is tried first; the Playwright flow
+# below only runs when that meets a captcha or markup it does not understand.
+# Lookups run on a warm BrowserPool (utils/browser_pool.py). Async callers (the bots) use
+# query_tnedistrict_status_async() on their own loop; query_tnedistrict_status() is the
+# blocking wrapper for scripts and runs the same coroutine on a background loop.
+from playwright.async_api import TimeoutError as PWTimeout, Error as PWError
 from pathlib import Path
-import time, traceback
+import asyncio, atexit, gzip, itertools, json, os, tempfile, threading, time, traceback
+from urllib.parse import parse_qs
+from typing import Any, Dict, TypedDict
+
+import config
+from utils.browser_pool import BrowserPool, PagePool, PoolExhausted
+from utils.strategy_cache import StrategyCache
+from utils import http_engine
+from utils.resource_rules import RequestBlocker, rules_for
+from utils.result_cache import ResultCache, cache_key
+from utils.singleflight import SingleFlight
+from utils import ratelimit, breaker
+from utils.artifacts import ArtifactPolicy
+from utils.artifact_store import ArtifactStore
+from utils import tnega_status
+from utils.tnega_status import StatusData
 
 ROOT = Path(__file__).resolve().parents[1]
-SCREENSHOT_DIR = ROOT / "screenshots"
-SCREENSHOT_DIR.mkdir(exist_ok=True)
 
-VERIFY_PAGE = "https://tnedistrict.tn.gov.in/tneda/VerifyCerti.xhtml"
 
-def query_tnedistrict_status(app_no: str, headless: bool = True, timeout_ms: int = 60000):
-    out = {"status":"error","data":{},"debug":{},"raw_text":"","screenshot":"","page_url":""}
+class ScrapeResult(TypedDict):
+    """What every lookup returns (cache hits and errors included)."""
+    status: str          # approved | pending | rejected | no_record | captcha_required | filled_but_unknown | error
+                         # | unavailable (site down, breaker open; debug["retry_after_s"] estimates recovery)
+    data: StatusData     # parsed fields, "" where the page had none
+    debug: Dict[str, Any]
+    raw_text: str        # page text, only with keep_raw=True, for unparsed pages, or an error message
+    screenshot: str
+    page_url: str
+
+SCREENSHOT_DIR = ROOT / getattr(config, "SCRAPER_ARTIFACT_DIR", "screenshots")
+
+VERIFY_PAGE = getattr(config, "VERIFY_URL", "https://tnedistrict.tn.gov.in/tneda/VerifyCerti.xhtml")
+
+POOL_SIZE = getattr(config, "SCRAPER_POOL_SIZE", 2)
+CONTEXTS_PER_BROWSER = getattr(config, "SCRAPER_CONTEXTS_PER_BROWSER", 2)
+POOL_MAX_WAITERS = getattr(config, "SCRAPER_POOL_MAX_WAITERS", 20)
+MAX_CONCURRENCY = getattr(config, "SCRAPER_MAX_CONCURRENCY", 8)
+PAGE_POOL_SIZE = getattr(config, "SCRAPER_PAGE_POOL_SIZE", None)  # None = one page per context
+PAGE_MAX_USES = getattr(config, "SCRAPER_PAGE_MAX_USES", 25)
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
+HTTP_FAST_PATH = getattr(config, "SCRAPER_HTTP_FAST_PATH", True)  # try utils/http_engine.py before the browser
+HTTP_TIMEOUT_S = getattr(config, "SCRAPER_HTTP_TIMEOUT_S", 15)
+HTTP_MAX_CONNECTIONS = getattr(config, "SCRAPER_HTTP_MAX_CONNECTIONS", 20)
+
+# Stage budgets for the event-driven flow; each stage ends as soon as its signal fires.
+FORM_TIMEOUT_MS = getattr(config, "SCRAPER_FORM_TIMEOUT_MS", 10000)      # input present after load
+CLICK_CONFIRM_MS = getattr(config, "SCRAPER_CLICK_CONFIRM_MS", 3000)     # search must react to a click
+RESULT_TIMEOUT_MS = getattr(config, "SCRAPER_RESULT_TIMEOUT_MS", 20000)  # result / captcha rendered
+RESULT_SETTLE_MS = getattr(config, "SCRAPER_RESULT_SETTLE_MS", 2000)     # render after search XHR
+
+ACK_INPUT = "#form1\\:acknumber"
+# Fill / click candidates; StrategyCache decides the order they are tried in.
+ACK_SELECTORS = [
+    ACK_INPUT,
+    "input[id*='ack']",
+    "input[name*='ack']",
+    "input[placeholder*='ack']",
+    "input[type='text']",
+]
+CLICK_METHODS = [
+    "coord_click",  # 18px right of the filled input, where the search icon sits
+    "#form1\\:acksearch",
+    "a#form1\\:acksearch",
+    "img#form1\\:acksearch",
+    "button#form1\\:acksearch",
+    "input[type='submit']",
+]
+# drops images/fonts/CSS/third-party hosts on every pooled context (rules in utils/resource_rules.py)
+_blocker = RequestBlocker(rules_for(VERIFY_PAGE)) if getattr(config, "SCRAPER_BLOCK_RESOURCES", True) else None
+_strategies = StrategyCache(ROOT / getattr(config, "SCRAPER_STRATEGY_CACHE", "strategy_cache.sqlite3"))
+_cache = ResultCache(
+    ttl_s=getattr(config, "RESULT_CACHE_TTL_S", None),
+    max_entries=getattr(config, "RESULT_CACHE_MAX_ENTRIES", 5000),
+    max_bytes=getattr(config, "RESULT_CACHE_MAX_BYTES", 8 * 1024 * 1024),
+    path=ROOT / config.RESULT_CACHE_FILE if getattr(config, "RESULT_CACHE_FILE", None) else None,
+) if getattr(config, "RESULT_CACHE_ENABLED", True) else None
+# concurrent lookups for the same number share one scrape
+_flights = SingleFlight()
+# upstream request budget for tnedistrict (utils/ratelimit.py); one token per engine attempt
+_limit = ratelimit.configure(VERIFY_PAGE, **getattr(config, "SCRAPER_RATE_LIMIT", {"rate": 1.0, "burst": 4}))
+RATE_MAX_WAIT_S = getattr(config, "SCRAPER_RATE_MAX_WAIT_S", 120)
+# fail fast while tnedistrict is down (utils/breaker.py); a cheap GET probes for recovery
+_breaker = breaker.configure(
+    "tnedistrict",
+    probe=breaker.http_probe(VERIFY_PAGE),
+    **getattr(config, "SCRAPER_BREAKER", {}),
+)
+# which runs leave a screenshot (utils/artifacts.py), kept in a bounded store under screenshots/
+_store = ArtifactStore(
+    SCREENSHOT_DIR,
+    max_bytes=getattr(config, "SCRAPER_ARTIFACT_MAX_BYTES", 200 * 1024 * 1024),
+    max_age_s=getattr(config, "SCRAPER_ARTIFACT_MAX_AGE_S", None),
+)
+_artifacts = ArtifactPolicy(
+    SCREENSHOT_DIR,
+    store=_store,
+    mode=getattr(config, "SCRAPER_ARTIFACTS", "failure"),
+    sample_every=getattr(config, "SCRAPER_ARTIFACT_SAMPLE_EVERY", 20),
+    image_format=getattr(config, "SCRAPER_ARTIFACT_FORMAT", "jpeg"),
+    jpeg_quality=getattr(config, "SCRAPER_ARTIFACT_QUALITY", 60),
+    full_page=getattr(config, "SCRAPER_ARTIFACT_FULL_PAGE", False),
+)
+# HAR capture of whole browser sessions (off | failure | always); recorded lookups skip the
+# HTTP fast path and run in a one-off context, so keep the sample rate low in production
+HAR_MODE = getattr(config, "SCRAPER_HAR", "off")
+HAR_SAMPLE_EVERY = max(1, getattr(config, "SCRAPER_HAR_SAMPLE_EVERY", 1))
+_har_turns = itertools.count(1)
+# Fast reset for a parked VerifyCerti page: clear the number and drop rendered results.
+# PagePool only reuses the page if its text then matches a fresh load, so guesses here are safe.
+VERIFY_RESET_JS = """() => {
+    const input = document.getElementById('form1:acknumber');
+    if (input) input.value = '';
+    document.querySelectorAll("[id$='resultPanel'], [id*='result'], .ui-messages, .ui-message")
+        .forEach(n => n.remove());
+}"""
+
+_CAPTCHA_SEL = "img[src*='aptcha'], img[id*='aptcha'], input[id*='aptcha'], div.g-recaptcha, iframe[src*='recaptcha']"
+_RESULT_WORDS = "/application number|applicant name|no record|record not found|not found|captcha/gi"
+_BASELINE_JS = """() => {
+    const text = document.body ? document.body.innerText : '';
+    return {captcha: !!document.querySelector("%s"), hits: (text.match(%s) || []).length};
+}""" % (_CAPTCHA_SEL, _RESULT_WORDS)
+# Truthy once a captcha element appears or result wording shows up that was not there before.
+_RESULT_READY_JS = """(before) => {
+    if (!before.captcha && document.querySelector("%s")) return 'captcha';
+    const text = document.body ? document.body.innerText : '';
+    return (text.match(%s) || []).length > before.hits ? 'result' : false;
+}""" % (_CAPTCHA_SEL, _RESULT_WORDS)
+# One round trip for the whole result: innermost table rows with 2+ non-empty cells (the
+# label/value grid), tab-free body lines carrying status wording (messages outside the
+# grid), and whether the page asks for a captcha. Body text only crosses the bridge when
+# no rows were found (unknown layout) or the caller asked for it.
+_NOTICE_WORDS = "/%s/i" % "|".join(
+    w for k, words in tnega_status.MARKERS.items() if k != "context" for w in words)
+_EXTRACT_JS = """([maxRows, wantText]) => {
+    const clean = s => (s || '').replace(/\\s+/g, ' ').trim();
+    const rows = [];
+    for (const tr of document.querySelectorAll('tr')) {
+        if (tr.querySelector('tr')) continue;
+        const cells = [...tr.children].filter(c => c.tagName === 'TD' || c.tagName === 'TH')
+            .map(c => clean(c.innerText)).filter(Boolean);
+        if (cells.length >= 2) rows.push(cells);
+        if (rows.length >= maxRows) break;
+    }
+    const body = document.body ? document.body.innerText : '';
+    const notice = body.split('\\n').filter(l => l.length < 300 && !l.includes('\\t') && %s.test(l))
+        .slice(0, 20).join('\\n');
+    return {rows, notice, captcha: /captcha/i.test(body),
+            text: (wantText || !rows.length) ? body.slice(0, 4000) : ''};
+}""" % _NOTICE_WORDS
+EXTRACT_MAX_ROWS = 60
+
+# ---------- Pool plumbing ----------
+
+_loop = None
+_loop_lock = threading.Lock()
+_pools = {}  # (event loop, headless flag) -> PagePool
+_sems = {}   # event loop -> concurrency semaphore
+_in_flight = {}  # event loop -> lookups currently holding the semaphore
+
+
+def _pool_loop():
+    """Background event loop used by the blocking query_tnedistrict_status() wrapper."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="scraper-pool", daemon=True).start()
+    return _loop
+
+
+def _get_pool(headless: bool) -> PagePool:
+    # Playwright objects are bound to the loop that created them, so each loop gets its own pool.
+    key = (asyncio.get_running_loop(), headless)
+    pool = _pools.get(key)
+    if pool is None:
+        browsers = BrowserPool(
+            size=POOL_SIZE,
+            contexts_per_browser=CONTEXTS_PER_BROWSER,
+            max_waiters=POOL_MAX_WAITERS,
+            headless=headless,
+            context_options={"user_agent": USER_AGENT},
+            context_setup=_blocker.install if _blocker else None,
+        )
+        pool = PagePool(
+            browsers, VERIFY_PAGE, ACK_INPUT,
+            size=PAGE_POOL_SIZE, reset_js=VERIFY_RESET_JS, max_page_uses=PAGE_MAX_USES,
+        )
+        _pools[key] = pool
+    return pool
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    sem = _sems.get(loop)
+    if sem is None:
+        sem = _sems[loop] = asyncio.Semaphore(MAX_CONCURRENCY)
+    return sem
+
+
+def pool_stats():
+    """Checkout latency / utilization counters for every pool started so far."""
+    stats = {}
+    for (loop, h), p in list(_pools.items()):
+        name = f"{'background' if loop is _loop else 'app'}:{'headless' if h else 'headed'}"
+        stats[name] = p.stats()
+        stats[name]["scrapes_in_flight"] = _in_flight.get(loop, 0)
+    return stats
+
+
+def cache_stats():
+    return _cache.stats() if _cache is not None else {}
+
+
+def invalidate_cached(app_no: str) -> bool:
+    """Forget the cached answer for one application number (admin force refresh)."""
+    return _cache.invalidate(app_no) if _cache is not None else False
+
+
+def flight_stats():
+    """Lookups started vs. joined to an identical one already in flight."""
+    return _flights.stats()
+
+
+def artifact_stats():
+    return {**_artifacts.stats(), "store": _store.stats()}
+
+
+def find_artifacts(app_no: str):
+    """Captures kept for one application number, newest first."""
+    return _store.find(cache_key(app_no))
+
+
+def prune_artifacts():
+    """Apply the artifact store's age limits and byte budget (blocking; run in a thread)."""
+    return _store.prune()
+
+
+def rate_stats():
+    return _limit.stats()
+
+
+def upstream_health():
+    """Breaker state per upstream site."""
+    return breaker.stats()
+
+
+def upstream_failed(result: dict) -> bool:
+    """True when an "error" result came from the site being down (timeout, refused
+    connection, 5xx) on either engine; retrying it at once only doubles the wait."""
+    http = (result.get("debug") or {}).get("http") or {}
+    return _site_down(http.get("reason") or "") or _site_down((result.get("raw_text") or "").split("\n", 1)[0])
+
+
+def expected_wait():
+    """What a new lookup would wait for an upstream slot now: {wait_s, position}."""
+    return {"wait_s": _limit.expected_wait(), "position": _limit.waiting + 1}
+
+
+def strategy_stats():
+    """Hit / miss counts of the fill and click strategy cache."""
+    return _strategies.stats()
+
+
+async def close_scraper(*_):
+    """Close the pools owned by the running loop (use as Application.post_shutdown)."""
+    loop = asyncio.get_running_loop()
+    for key in [k for k in _pools if k[0] is loop]:
+        await _pools.pop(key).close()
+    await http_engine.close_client()
+    await asyncio.to_thread(_artifacts.flush)
+    _sems.pop(loop, None)
+    _in_flight.pop(loop, None)
+
+
+def close_pools():
+    if _loop is None:
+        return
     try:
-        with sync_playwright() as pw:
-            browser = pw.chromium.launch(headless=headless, args=["--no-sandbox"])
-            ctx = browser.new_context(user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64)")
-            page = ctx.new_page()
-            page.set_default_navigation_timeout(timeout_ms)
+        asyncio.run_coroutine_threadsafe(close_scraper(), _loop).result(timeout=15)
+    except Exception:
+        pass
 
-            page.goto(VERIFY_PAGE, wait_until="load", timeout=timeout_ms)
-            out["page_url"] = page.url
-            page.wait_for_timeout(900)
 
-            out["debug"]["frames"] = [{"url": f.url, "name": f.name} for f in page.frames]
+atexit.register(close_pools)
 
-            # Try precise selectors first, then fallbacks
-            ack_selectors = [
-                "#form1\\:acknumber",
-                "input[id*='ack']",
-                "input[name*='ack']",
-                "input[placeholder*='ack']",
-                "input[type='text']"
-            ]
+# ---------- Scrape flow ----------
 
-            filled_sel = None
-            out["debug"]["fill_attempts"] = []
-            for sel in ack_selectors:
-                try:
-                    page.wait_for_selector(sel, timeout=2500)
-                    page.fill(sel, app_no, timeout=2000)
-                    out["debug"]["fill_attempts"].append({"selector": sel, "ok": True})
-                    filled_sel = sel
-                    break
-                except Exception as e:
-                    out["debug"]["fill_attempts"].append({"selector": sel, "ok": False, "error": str(e)})
-
-            if not filled_sel:
-                ss = SCREENSHOT_DIR / f"no_fill_{app_no}_{int(time.time())}.png"
-                page.screenshot(path=str(ss), full_page=True)
-                out.update({"screenshot": str(ss), "raw_text": (page.content()[:2000] if page else "")})
-                out["status"] = "error"
-                page.close(); browser.close()
-                return out
-
-            # Compute bounding box and click to the right (search icon)
-            out["debug"]["click_attempts"] = []
-            try:
-                handle = page.query_selector(filled_sel)
-                box = handle.bounding_box()
-                if not box:
-                    raise Exception("bounding_box() returned None")
-                click_x = box["x"] + box["width"] + 18  # 18px right of input
-                click_y = box["y"] + box["height"] / 2
-                page.wait_for_timeout(300)
-                page.mouse.click(click_x, click_y)
-                out["debug"]["click_attempts"].append({"method":"coord_click","x":click_x,"y":click_y,"ok":True})
-                page.wait_for_timeout(1500)
-            except Exception as e_coord:
-                out["debug"]["click_attempts"].append({"method":"coord_click","ok":False,"error":str(e_coord)})
-                # fallback selectors (try clickable elements near form)
-                fallback = ["#form1\\:acksearch", "a#form1\\:acksearch", "img#form1\\:acksearch", "button#form1\\:acksearch", "input[type='submit']"]
-                clicked = None
-                for fsel in fallback:
-                    try:
-                        page.wait_for_selector(fsel, timeout=1500)
-                        page.click(fsel, timeout=2000)
-                        out["debug"]["click_attempts"].append({"method":"fallback_selector","selector":fsel,"ok":True})
-                        clicked = fsel
-                        page.wait_for_timeout(1200)
-                        break
-                    except Exception as efs:
-                        out["debug"]["click_attempts"].append({"method":"fallback_selector","selector":fsel,"ok":False,"error":str(efs)})
-                if not clicked:
-                    ss = SCREENSHOT_DIR / f"click_fail_{app_no}_{int(time.time())}.png"
-                    page.screenshot(path=str(ss), full_page=True)
-                    out.update({"screenshot": str(ss), "raw_text": page.content()[:2000]})
-                    out["status"] = "error"
-                    page.close(); browser.close()
-                    return out
-
-            ss = SCREENSHOT_DIR / f"afterclick_{app_no}_{int(time.time())}.png"
-            page.screenshot(path=str(ss), full_page=True)
-            out["screenshot"] = str(ss)
+def _classify(body: str, out: dict) -> str:
+    """Status plus parsed fields (into out["data"]) from one pass over the page text."""
+    status, out["data"] = tnega_status.extract(body)
+    return status
+
+
+def _classify_page(found: dict, out: dict, keep_raw: bool) -> str:
+    """Status plus fields from the _EXTRACT_JS result; page text only when asked for or
+    when the grid was not found."""
+    rows = found.get("rows") or []
+    out["debug"]["extract"] = {"rows": len(rows), "captcha": found.get("captcha", False)}
+    if found.get("error"):
+        out["debug"]["extract"]["error"] = found["error"]
+    if rows:
+        status, out["data"] = tnega_status.extract_rows(rows, found.get("notice", ""), found.get("captcha", False))
+    else:
+        status = _classify(found.get("text", ""), out)
+    if keep_raw or not rows:
+        out["raw_text"] = found.get("text", "")
+    elif status == "filled_but_unknown":
+        # nothing recognisable: hand the grid back for the handlers' debug replies
+        out["raw_text"] = "\n".join(["\t".join(r) for r in rows] + [found.get("notice", "")])[:4000]
+    return status
+
+
+async def _first_signal(tasks, timeout_s: float):
+    """Wait up to timeout_s for any readiness task; returns the finished ones."""
+    pending = [t for t in tasks if not t.done()]
+    if pending and len(pending) == len(tasks):
+        await asyncio.wait(pending, timeout=max(timeout_s, 0), return_when=asyncio.FIRST_COMPLETED)
+    return [t for t in tasks if t.done()]
+
+
+async def _capture(page, name: str, app_no: str, failed: bool, out: dict):
+    """Screenshot the page if the artifact policy keeps this run. Failure captures are
+    written before returning (handlers may send them); others are written in the background."""
+    if not _artifacts.wants(failed):
+        return
+    data = await page.screenshot(**_artifacts.screenshot_options())
+    name = f"{name}_{app_no}_{int(time.time())}"
+    key = cache_key(app_no)
+    if failed:
+        out["screenshot"] = await asyncio.to_thread(_artifacts.save, name, _artifacts.image_ext, data, True, key)
+    else:
+        out["screenshot"] = _artifacts.save(name, _artifacts.image_ext, data, key=key)
 
+
+async def _scrape(page, app_no: str, timeout_ms: int, out: dict, warm: bool = False, keep_raw: bool = False):
+    timings = out["debug"]["timings"] = {}
+    t_start = time.monotonic()
+
+    def mark(stage, t0):
+        timings[stage] = round((time.monotonic() - t0) * 1000, 1)
+
+    # last winning selector first, then the rest by success rate
+    ack_selectors = _strategies.order("fill", ACK_SELECTORS)
+
+    # warm pages come from the PagePool already sitting on VerifyCerti with the form loaded
+    out["debug"]["warm_page"] = warm
+    t0 = time.monotonic()
+    if not warm:
+        await page.goto(VERIFY_PAGE, wait_until="domcontentloaded", timeout=timeout_ms)
+    # form ready = any candidate input attached (returns at once on a warm page)
+    await page.wait_for_selector(", ".join(ack_selectors), timeout=FORM_TIMEOUT_MS)
+    mark("form_ready", t0)
+    out["page_url"] = page.url
+
+    out["debug"]["frames"] = [{"url": f.url, "name": f.name} for f in page.frames]
+
+    t0 = time.monotonic()
+    filled_sel = None
+    out["debug"]["fill_attempts"] = []
+    for sel in ack_selectors:
+        try:
+            if not await page.query_selector(sel):
+                raise Exception("not present")
+            await page.fill(sel, app_no, timeout=2000)
+            out["debug"]["fill_attempts"].append({"selector": sel, "ok": True})
+            _strategies.record("fill", sel, True)
+            filled_sel = sel
+            break
+        except Exception as e:
+            out["debug"]["fill_attempts"].append({"selector": sel, "ok": False, "error": str(e)})
+            _strategies.record("fill", sel, False)
+    _strategies.outcome("fill", filled_sel is not None and filled_sel == ack_selectors[0])
+    mark("fill", t0)
+
+    if not filled_sel:
+        await _capture(page, "no_fill", app_no, True, out)
+        out["raw_text"] = (await page.content())[:2000]
+        out["status"] = "error"
+        return out
+
+    # Readiness signals, armed before the click: the search POST (JSF XHR) and the DOM
+    # growing result text or a new captcha element.
+    baseline = await page.evaluate(_BASELINE_JS)
+    deadline = time.monotonic() + RESULT_TIMEOUT_MS / 1000
+    xhr_task = asyncio.ensure_future(page.wait_for_event(
+        "response", predicate=lambda r: r.request.method == "POST", timeout=RESULT_TIMEOUT_MS))
+    dom_task = asyncio.ensure_future(page.wait_for_function(
+        _RESULT_READY_JS, arg=baseline, timeout=RESULT_TIMEOUT_MS))
+    signals = [dom_task, xhr_task]
+
+    try:
+        t0 = time.monotonic()
+        out["debug"]["click_attempts"] = []
+        clicked = None
+        confirmed = []
+        # A click counts as confirmed (and as a success for the cache) once a readiness signal fires.
+        click_methods = _strategies.order("click", CLICK_METHODS)
+        for method in click_methods:
+            attempt = {"method": "coord_click"} if method == "coord_click" else {"method": "fallback_selector", "selector": method}
             try:
-                body = page.inner_text("body", timeout=3000)
-            except Exception:
-                body = ""
-            out["raw_text"] = (body or "")[:4000]
-            lower = (body or "").lower()
-            if "captcha" in lower or "enter captcha" in lower or "recaptcha" in lower:
-                out["status"] = "captcha_required"
-            elif "approved" in lower and ("application" in lower or "certificate" in lower):
-                out["status"] = "approved"
-            elif "rejected" in lower:
-                out["status"] = "rejected"
-            elif "pending" in lower or "in progress" in lower:
-                out["status"] = "pending"
-            elif "no record" in lower or "record not found" in lower:
-                out["status"] = "no_record"
-            else:
-                out["status"] = "filled_but_unknown"
-
-            page.close(); browser.close()
+                if method == "coord_click":
+                    handle = await page.query_selector(filled_sel)
+                    box = await handle.bounding_box()
+                    if not box:
+                        raise Exception("bounding_box() returned None")
+                    attempt["x"] = box["x"] + box["width"] + 18  # 18px right of input
+                    attempt["y"] = box["y"] + box["height"] / 2
+                    await page.mouse.click(attempt["x"], attempt["y"])
+                else:
+                    if not await page.query_selector(method):
+                        raise Exception("not present")
+                    await page.click(method, timeout=2000)
+            except Exception as e:
+                attempt.update({"ok": False, "error": str(e)})
+                out["debug"]["click_attempts"].append(attempt)
+                _strategies.record("click", method, False)
+                continue
+            clicked = method
+            confirmed = await _first_signal(signals, CLICK_CONFIRM_MS / 1000)
+            attempt.update({"ok": True, "confirmed": bool(confirmed)})
+            out["debug"]["click_attempts"].append(attempt)
+            _strategies.record("click", method, bool(confirmed))
+            if confirmed:
+                break
+        _strategies.outcome("click", bool(confirmed) and clicked == click_methods[0])
+        out["debug"]["strategy_hit"] = {
+            "fill": filled_sel == ack_selectors[0],
+            "click": bool(confirmed) and clicked == click_methods[0],
+        }
+        mark("click", t0)
+
+        if not clicked:
+            await _capture(page, "click_fail", app_no, True, out)
+            out["raw_text"] = (await page.content())[:2000]
+            out["status"] = "error"
             return out
 
+        # Wait for the result: the DOM signal ends the stage; if only the XHR has
+        # arrived, give the partial render RESULT_SETTLE_MS to land.
+        t0 = time.monotonic()
+        await _first_signal(signals, deadline - time.monotonic())
+        if not dom_task.done() and xhr_task.done():
+            await _first_signal([dom_task], RESULT_SETTLE_MS / 1000)
+        xhr_ok = xhr_task.done() and not xhr_task.cancelled() and not xhr_task.exception()
+        if xhr_ok:
+            out["debug"]["search_response"] = {"url": xhr_task.result().url, "status": xhr_task.result().status}
+        signal = "xhr_only" if xhr_ok else "timeout"
+        if dom_task.done() and not dom_task.cancelled():
+            err = dom_task.exception()
+            if err is None:
+                signal = await dom_task.result().json_value()
+            elif not isinstance(err, PWTimeout):
+                # a full-page POST replaces the document and kills the DOM watcher
+                await page.wait_for_load_state("domcontentloaded", timeout=timeout_ms)
+                signal = "navigated"
+        out["debug"]["result_signal"] = signal
+        mark("result_wait", t0)
+    finally:
+        for t in signals:
+            if not t.done():
+                t.cancel()
+        await asyncio.gather(*signals, return_exceptions=True)
+
+    t0 = time.monotonic()
+    try:
+        found = await page.evaluate(_EXTRACT_JS, [EXTRACT_MAX_ROWS, keep_raw])
+    except Exception as e:
+        found = {"rows": [], "notice": "", "captcha": False, "text": "", "error": str(e)}
+    mark("extract", t0)
+    out["status"] = _classify_page(found, out, keep_raw)
+
+    t0 = time.monotonic()
+    await _capture(page, "afterclick", app_no, out["status"] in ("captcha_required", "filled_but_unknown"), out)
+    mark("screenshot", t0)
+    mark("total", t_start)
+    return out
+
+
+async def _query_http(app_no: str, out: dict, keep_raw: bool = False):
+    """Browserless lookup; returns the result dict, or None to escalate to the browser."""
+    res = await http_engine.fetch_status(app_no, VERIFY_PAGE, timeout_s=HTTP_TIMEOUT_S,
+                                         max_connections=HTTP_MAX_CONNECTIONS)
+    out["debug"]["http"] = {k: res[k] for k in ("ok", "reason", "timings", "bytes")}
+    reason = res["reason"]
+    if reason == "captcha" or "Timeout" in reason or reason.startswith(("GET 5", "POST 5")):
+        _limit.penalize()
+    elif res["ok"]:
+        _limit.success()
+    if _site_down(reason):
+        _breaker.failure(reason)
+    else:
+        _breaker.success()  # the site answered, even if not in a way the fast path handles
+    if not res["ok"]:
+        out["debug"]["engine"] = "browser"
+        return None
+    status = _classify(res["text"], out)
+    if status in ("captcha_required", "filled_but_unknown"):
+        out["debug"]["http"]["reason"] = f"escalate: {status}"
+        out["debug"]["engine"] = "browser"
+        return None
+    out["debug"]["engine"] = "http"
+    out.update({"status": status, "raw_text": res["text"][:4000] if keep_raw else "", "page_url": res["page_url"]})
+    return out
+
+
+async def query_tnedistrict_status_async(app_no: str, headless: bool = True, timeout_ms: int = 60000,
+                                         refresh: bool = False, keep_raw: bool = False) -> ScrapeResult:
+    """Look up one application number. Returns the same dict as query_tnedistrict_status().
+    result["data"] holds the parsed fields; result["raw_text"] (page text) is only filled
+    when keep_raw=True or the page could not be parsed into fields.
+    Answers come from the result cache when fresh (refresh=True skips it). At most
+    SCRAPER_MAX_CONCURRENCY lookups run at once per event loop, and callers asking for a
+    number that is already being looked up wait for that lookup instead of starting
+    another. Cancelling a caller does not abort a lookup other callers are waiting on;
+    cancelling the last one does."""
+    if _cache is not None and not refresh:
+        hit = _cache.get(app_no)
+        if hit is not None and (hit["raw_text"] or not keep_raw):
+            return hit
+    return await _flights.do((cache_key(app_no), headless, keep_raw),
+                             lambda: _lookup_and_store(app_no, headless, timeout_ms, keep_raw))
+
+
+async def _lookup_and_store(app_no: str, headless: bool, timeout_ms: int, keep_raw: bool):
+    out = await _lookup(app_no, headless, timeout_ms, keep_raw)
+    if _cache is not None:
+        _cache.put(app_no, out)
+        out["debug"]["cache"] = {"hit": False}
+    return out
+
+
+def _site_down(error: str) -> bool:
+    """Timeouts, refused connections and 5xx mean the site is down, not that the page was odd."""
+    return ("Timeout" in error or "ConnectError" in error or "net::ERR_" in error
+            or error.startswith(("GET 5", "POST 5")))
+
+
+def _unavailable(out: dict) -> dict:
+    out["status"] = "unavailable"
+    out["raw_text"] = f"{_breaker.name} is down: {_breaker.last_error}"
+    out["debug"]["retry_after_s"] = round(_breaker.retry_after())
+    return out
+
+
+async def _take_slot(out: dict) -> bool:
+    """Wait for an upstream request slot; False (out set to an error) when the queue is too long."""
+    try:
+        waited = await _limit.acquire_async(RATE_MAX_WAIT_S)
+    except ratelimit.RateLimited as e:
+        out["status"] = "error"; out["raw_text"] = f"Scraper busy: {e}"
+        return False
+    out["debug"]["rate_wait_ms"] = round(out["debug"].get("rate_wait_ms", 0) + waited * 1000, 1)
+    return True
+
+
+async def _lookup(app_no: str, headless: bool, timeout_ms: int, keep_raw: bool = False) -> ScrapeResult:
+    out = {"status":"error","data":{},"debug":{},"raw_text":"","screenshot":"","page_url":""}
+    if not _breaker.allow():
+        return _unavailable(out)
+    record_har = HAR_MODE != "off" and next(_har_turns) % HAR_SAMPLE_EVERY == 0
+    if HTTP_FAST_PATH and not record_har:
+        if not await _take_slot(out):
+            return out
+        # same per-loop limit as the browser path, released before any escalation takes it again
+        loop = asyncio.get_running_loop()
+        t0 = time.monotonic()
+        async with _get_semaphore():
+            out["debug"]["queue_wait_ms"] = round((time.monotonic() - t0) * 1000, 1)
+            _in_flight[loop] = _in_flight.get(loop, 0) + 1
+            try:
+                fast = await _query_http(app_no, out, keep_raw)
+            finally:
+                _in_flight[loop] = _in_flight.get(loop, 1) - 1
+        if fast is not None:
+            return fast
+        if _breaker.state == breaker.OPEN:
+            return _unavailable(out)
+    if not await _take_slot(out):
+        return out
+    out = await _lookup_browser(app_no, headless, timeout_ms, out, keep_raw, record_har=record_har)
+    # captchas and timeouts mean the site wants us slower; answered pages let the rate recover
+    if out["status"] == "captcha_required" or out["raw_text"].startswith("Timeout"):
+        _limit.penalize()
+    elif out["status"] in ("approved", "pending", "rejected", "no_record"):
+        _limit.success()
+    if out["status"] == "error" and _site_down(out["raw_text"]):
+        _breaker.failure(out["raw_text"].splitlines()[0])
+    elif out["status"] != "error":
+        _breaker.success()
+    return out
+
+
+async def _lookup_browser(app_no: str, headless: bool, timeout_ms: int, out: dict, keep_raw: bool,
+                          record_har: bool = False) -> ScrapeResult:
+    loop = asyncio.get_running_loop()
+    t0 = time.monotonic()
+    try:
+        async with _get_semaphore():
+            out["debug"]["queue_wait_ms"] = round(out["debug"].get("queue_wait_ms", 0)
+                                                  + (time.monotonic() - t0) * 1000, 1)
+            _in_flight[loop] = _in_flight.get(loop, 0) + 1
+            try:
+                pool = _get_pool(headless)
+                if record_har:
+                    return await _scrape_recorded(pool.browser_pool, app_no, timeout_ms, out, keep_raw)
+                async with pool.page(timeout=timeout_ms / 1000) as lease:
+                    out["debug"]["pool_wait_ms"] = round(lease.waited_ms, 1)
+                    page = lease.page
+                    page.set_default_navigation_timeout(timeout_ms)
+                    if _blocker:
+                        _blocker.begin(page)
+                    try:
+                        return await _scrape(page, app_no, timeout_ms, out, warm=lease.ready, keep_raw=keep_raw)
+                    finally:
+                        if _blocker:
+                            out["debug"]["network"] = _blocker.end(page)
+            finally:
+                _in_flight[loop] = _in_flight.get(loop, 1) - 1
+    except PoolExhausted as e:
+        out["status"] = "error"; out["raw_text"] = f"Scraper busy: {e}"; return out
     except PWTimeout as t:
         out["status"] = "error"; out["raw_text"] = f"Timeout: {t}"; return out
     except PWError as e:
         out["status"] = "error"; out["raw_text"] = f"Playwright error: {e}"; return out
     except Exception as e:
         out["status"] = "error"; out["raw_text"] = f"Exception: {e}\\n{traceback.format_exc()}"; return out
+
+
+# ---------- HAR record / replay ----------
+
+async def _scrape_recorded(browsers: BrowserPool, app_no: str, timeout_ms: int, out: dict, keep_raw: bool):
+    """One lookup in a fresh context that records a HAR; the HAR goes into the artifact
+    store (kind "har", key = application number) when the run failed or HAR_MODE is always."""
+    fd, har_path = tempfile.mkstemp(suffix=".har")
+    os.close(fd)
+    try:
+        try:
+            async with browsers.one_off_context(record_har_path=har_path, record_har_content="embed") as ctx:
+                page = await ctx.new_page()
+                page.set_default_navigation_timeout(timeout_ms)
+                if _blocker:
+                    _blocker.begin(page)
+                try:
+                    return await _scrape(page, app_no, timeout_ms, out, keep_raw=keep_raw)
+                finally:
+                    if _blocker:
+                        out["debug"]["network"] = _blocker.end(page)
+        finally:
+            # the context is closed by now, so the HAR is complete
+            if HAR_MODE == "always" or out["status"] not in ("approved", "pending", "rejected", "no_record"):
+                out["debug"]["har"] = await asyncio.to_thread(_keep_har, har_path, app_no)
+    finally:
+        try:
+            os.unlink(har_path)
+        except OSError:
+            pass
+
+
+def _keep_har(har_path: str, app_no: str) -> str:
+    data = Path(har_path).read_bytes()
+    if not data:
+        return ""
+    key = cache_key(app_no)
+    return _store.put(key, f"session_{key}_{int(time.time())}", "har", data)
+
+
+def har_app_no(har_path) -> str:
+    """The application number searched in a recorded session (from the search POST)."""
+    raw = Path(har_path).read_bytes()
+    har = json.loads(gzip.decompress(raw) if str(har_path).endswith(".gz") else raw)
+    for entry in har["log"]["entries"]:
+        text = (entry["request"].get("postData") or {}).get("text", "")
+        value = parse_qs(text).get(http_engine.ACK_FIELD)
+        if value:
+            return value[0]
+    return ""
+
+
+async def replay_har(har_path, app_no: str = "", headless: bool = True, timeout_ms: int = 60000,
+                     keep_raw: bool = False) -> ScrapeResult:
+    """Run the browser flow against a recorded session with the network cut off: every
+    request is answered from the HAR, anything it does not hold is aborted. The same HAR
+    gives identical input across runs and engine versions. `har_path` may be a .har or the
+    store's .har.gz; app_no defaults to the number searched in the recording."""
+    path = Path(har_path)
+    app_no = app_no or har_app_no(path)
+    out = {"status":"error","data":{},"debug":{"replay": str(path)},"raw_text":"","screenshot":"","page_url":""}
+    tmp = None
+    if path.suffix == ".gz":
+        fd, tmp = tempfile.mkstemp(suffix=".har")
+        os.close(fd)
+        Path(tmp).write_bytes(gzip.decompress(path.read_bytes()))
+    try:
+        async with _get_pool(headless).browser_pool.one_off_context() as ctx:
+            await ctx.route_from_har(tmp or str(path), not_found="abort")
+            page = await ctx.new_page()
+            page.set_default_navigation_timeout(timeout_ms)
+            return await _scrape(page, app_no, timeout_ms, out, keep_raw=keep_raw)
+    except (PWTimeout, PWError) as e:
+        out["raw_text"] = f"Replay error: {e}"
+        return out
+    finally:
+        if tmp:
+            os.unlink(tmp)
+
+
+def query_tnedistrict_status(app_no: str, headless: bool = True, timeout_ms: int = 60000, refresh: bool = False,
+                             keep_raw: bool = False) -> ScrapeResult:
+    # Blocking call for scripts; do not use from a running event loop.
+    coro = query_tnedistrict_status_async(app_no, headless, timeout_ms, refresh, keep_raw)
+    return asyncio.run_coroutine_threadsafe(coro, _pool_loop()).result()
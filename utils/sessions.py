@@ -0,0 +1,81 @@
+# utils/sessions.py
+# Per-chat conversation state in SQLite instead of process memory (context.user_data, the
+# CMCHIS SESSION dict), so any webhook worker can handle a chat's next update.
+import json, sqlite3, threading, time
+from typing import Any, Dict, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    namespace TEXT NOT NULL,
+    chat_id INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (namespace, chat_id)
+);
+CREATE INDEX IF NOT EXISTS sessions_updated ON sessions(updated);
+"""
+
+
+class SessionStore:
+    """A dict of JSON-serialisable values per chat, in `namespace` (one per bot). Behaves
+    like the dict it replaces for get / [] / del, but a session read with get() is a copy:
+    write it back (store[chat_id] = s, or update()) after changing it. Sessions untouched
+    for `ttl_s` are gone."""
+
+    def __init__(self, db_path, namespace: str, ttl_s: float = 7 * 24 * 3600):
+        self.namespace = namespace
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    def _read(self, chat_id: int) -> Optional[Dict[str, Any]]:
+        row = self._db.execute("SELECT data FROM sessions WHERE namespace = ? AND chat_id = ? AND updated >= ?",
+                               (self.namespace, int(chat_id), time.time() - self.ttl_s)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _write(self, chat_id: int, data: Dict[str, Any]):
+        self._db.execute("INSERT OR REPLACE INTO sessions (namespace, chat_id, data, updated) VALUES (?, ?, ?, ?)",
+                         (self.namespace, int(chat_id), json.dumps(data, ensure_ascii=False, default=str), time.time()))
+
+    def get(self, chat_id: int, default: Any = None) -> Any:
+        with self._lock:
+            data = self._read(chat_id)
+        return default if data is None else data
+
+    def __getitem__(self, chat_id: int) -> Dict[str, Any]:
+        data = self.get(chat_id)
+        if data is None:
+            raise KeyError(chat_id)
+        return data
+
+    def __setitem__(self, chat_id: int, data: Dict[str, Any]):
+        with self._lock:
+            self._write(chat_id, data)
+
+    def __delitem__(self, chat_id: int):
+        with self._lock:
+            self._db.execute("DELETE FROM sessions WHERE namespace = ? AND chat_id = ?", (self.namespace, int(chat_id)))
+
+    def __contains__(self, chat_id: int) -> bool:
+        return self.get(chat_id) is not None
+
+    def update(self, chat_id: int, **values) -> Dict[str, Any]:
+        """Merge `values` into the session atomically (safe against another worker's write)."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                data = {**(self._read(chat_id) or {}), **values}
+                self._write(chat_id, data)
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+        return data
+
+    def prune(self) -> int:
+        """Delete expired sessions (every namespace); returns how many."""
+        with self._lock:
+            cur = self._db.execute("DELETE FROM sessions WHERE updated < ?", (time.time() - self.ttl_s,))
+        return cur.rowcount
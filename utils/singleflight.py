@@ -0,0 +1,54 @@
+# utils/singleflight.py
+# In-flight deduplication: concurrent callers asking for the same key share one run.
+import asyncio, copy
+from typing import Any, Awaitable, Callable, Dict, Hashable, List
+
+
+class SingleFlight:
+    """The first do(key, fn) starts fn() as its own task; callers arriving while it runs
+    await the same task. Every caller gets its own deep copy of the result, so callers may
+    mutate what they get. Cancelling one caller leaves the shared run to the others; when
+    the last caller goes away the run is cancelled too. `coalesced` counts the runs that
+    were saved."""
+
+    def __init__(self):
+        self._calls: Dict[Any, List] = {}  # (loop, key) -> [task, callers waiting]
+        self.counters = {"calls": 0, "executions": 0, "coalesced": 0, "abandoned": 0}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        k = (asyncio.get_running_loop(), key)  # tasks are bound to their loop
+        self.counters["calls"] += 1
+        call = self._calls.get(k)
+        if call is None:
+            task = asyncio.ensure_future(fn())
+            call = self._calls[k] = [task, 0]
+            task.add_done_callback(lambda t: self._done(k, t))
+            self.counters["executions"] += 1
+        else:
+            self.counters["coalesced"] += 1
+        task = call[0]
+        call[1] += 1
+        try:
+            result = await asyncio.shield(task)
+        finally:
+            call[1] -= 1
+            if call[1] == 0 and not task.done():
+                # nobody is waiting any more: stop the run, and let the next caller start afresh
+                if self._calls.get(k) is call:
+                    del self._calls[k]
+                task.cancel()
+                self.counters["abandoned"] += 1
+        return copy.deepcopy(result)
+
+    def _done(self, k, task: asyncio.Task):
+        call = self._calls.get(k)
+        if call is not None and call[0] is task:
+            del self._calls[k]
+        if not task.cancelled():
+            task.exception()  # mark retrieved even if every caller went away
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"in_flight": len(self._calls), **self.counters}
@@ -0,0 +1,97 @@
+# utils/strategy_cache.py
+# Remembers which fill / click strategy worked so the scraper tries it first next time.
+import sqlite3, threading
+from typing import Any, Dict, List, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS strategies (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    ok INTEGER NOT NULL DEFAULT 0,
+    fail INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (kind, key)
+);
+CREATE TABLE IF NOT EXISTS kinds (
+    kind TEXT PRIMARY KEY,
+    last TEXT,
+    hits INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+class StrategyCache:
+    """Per-kind success counts plus the last winner, in SQLite (WAL) so every process on
+    the host learns from the others' lookups; each update is a single increment, so
+    concurrent writers never lose counts.
+
+    order() puts the last successful strategy first and the rest by smoothed success
+    rate (ties keep the caller's order), so the full cascade only runs when the cached
+    winner fails. A lookup is a hit when the first strategy tried is the one that works."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        """Opened on first use (callers hold the lock), so creating the cache touches no files."""
+        if self._conn is None:
+            db = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None, timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(_SCHEMA)
+            self._conn = db
+        return self._conn
+
+    def order(self, kind: str, candidates: List[str]) -> List[str]:
+        with self._lock:
+            stats = {key: (ok, fail) for key, ok, fail in
+                     self._db.execute("SELECT key, ok, fail FROM strategies WHERE kind = ?", (kind,))}
+            row = self._db.execute("SELECT last FROM kinds WHERE kind = ?", (kind,)).fetchone()
+
+        def rate(c):
+            ok, fail = stats.get(c, (0, 0))
+            return (ok + 1) / (ok + fail + 2)
+
+        ranked = sorted(candidates, key=lambda c: (-rate(c), candidates.index(c)))
+        last = row[0] if row else None
+        if last in candidates:
+            ranked.remove(last)
+            ranked.insert(0, last)
+        return ranked
+
+    def record(self, kind: str, key: str, ok: bool):
+        col = "ok" if ok else "fail"
+        with self._lock:
+            self._db.execute(f"INSERT INTO strategies (kind, key, {col}) VALUES (?, ?, 1) "
+                             f"ON CONFLICT(kind, key) DO UPDATE SET {col} = {col} + 1", (kind, key))
+            if ok:
+                self._db.execute("INSERT INTO kinds (kind, last) VALUES (?, ?) "
+                                 "ON CONFLICT(kind) DO UPDATE SET last = excluded.last", (kind, key))
+
+    def outcome(self, kind: str, hit: bool):
+        col = "hits" if hit else "misses"
+        with self._lock:
+            self._db.execute(f"INSERT INTO kinds (kind, {col}) VALUES (?, 1) "
+                             f"ON CONFLICT(kind) DO UPDATE SET {col} = {col} + 1", (kind,))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            rows = self._db.execute("SELECT kind, last, hits, misses FROM kinds ORDER BY kind").fetchall()
+        out = {}
+        for kind, last, hits, misses in rows:
+            total = hits + misses
+            out[kind] = {
+                "last": last,
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": round(hits / total, 3) if total else 0.0,
+            }
+        return out
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,156 @@
+# utils/tnega_status.py
+# One-pass status classifier + field extractor for TN e-District result text
+# (Playwright inner_text or the http_engine fragment: cells split by tabs, rows by newlines).
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, TypedDict
+
+FIELDS = ("app_no", "applicant_name", "father_name", "gender", "request_for",
+          "date_of_request", "status_text", "remarks")
+
+
+class StatusData(TypedDict):
+    """Fields of one application, "" when the page did not show them."""
+    app_no: str
+    applicant_name: str
+    father_name: str
+    gender: str
+    request_for: str
+    date_of_request: str
+    status_text: str
+    remarks: str
+
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]")
+
+
+def _norm(label: str) -> str:
+    return _NON_ALNUM.sub("", label.lower())
+
+
+# normalised label -> field; the cell after a label cell is its value
+LABELS: Dict[str, str] = {_norm(k): v for k, v in {
+    "Application Number": "app_no",
+    "Application No": "app_no",
+    "Acknowledgement Number": "app_no",
+    "Applicant Name": "applicant_name",
+    "Father/ Husband / Guardian / Mother Name": "father_name",
+    "Father Name": "father_name",
+    "Father's Name": "father_name",
+    "Gender": "gender",
+    "Request For": "request_for",
+    "Service Name": "request_for",
+    "Date of Request": "date_of_request",
+    "Applied Date": "date_of_request",
+    "Status": "status_text",
+    "Application Status": "status_text",
+    "Current Status": "status_text",
+    "Remarks": "remarks",
+    "Remark": "remarks",
+}.items()}
+
+# Status column wording, first match wins (a refusal beats "approved" in "Not Approved").
+STATUS_TEXT_RULES = [
+    (re.compile(r"reject|return|not\s+approved|cancel", re.I), "rejected"),
+    (re.compile(r"\bapproved\b|issued|signed|generated|completed|delivered", re.I), "approved"),
+    (re.compile(r"pending|in\s+progress|under\s+process|processing|forwarded|submitted|verification", re.I), "pending"),
+]
+
+# Page-level markers (lower-case substrings), counted over the whole text minus the
+# status and remarks values.
+MARKERS: Dict[str, Tuple[str, ...]] = {
+    "no_record": ("no record", "record not found"),
+    "captcha": ("captcha",),
+    "rejected": ("rejected",),
+    "approved": ("approved",),
+    "pending": ("pending", "in progress"),
+    "context": ("application", "certificate"),
+}
+_APP_NO = re.compile(r"\bTN-[0-9A-Za-z]{3,}")
+_MAX_LABEL = 2 * max(len(k) for k in LABELS)  # normalised lengths; raw labels carry spaces and punctuation
+
+
+@lru_cache(maxsize=4096)
+def _label(cell: str) -> Optional[str]:
+    if len(cell) > _MAX_LABEL:  # values are usually longer than any label
+        return None
+    return LABELS.get(_norm(cell))
+
+
+def extract(text: str) -> Tuple[str, StatusData]:
+    """Return (status, fields) from one pass over the text.
+
+    Precedence: the Status field when its wording is recognised; then a "no record"
+    message; then a captcha; then the old page-wide keywords (approved needs an
+    application/certificate mention); else "filled_but_unknown". Remarks never
+    decide the status. For repeated labels the first value wins."""
+    text = text or ""
+    rows = []
+    for line in text.splitlines():
+        if "\t" not in line and ":" not in line:
+            continue  # a lone cell cannot hold a label/value pair
+        rows.append([c for c in (c.strip() for c in line.split("\t")) if c])
+    return _decide(_fields(rows), text.lower())
+
+
+def extract_rows(rows: List[List[str]], notice: str = "", captcha: bool = False) -> Tuple[str, StatusData]:
+    """extract() for table cells read straight from the DOM (see scraper._EXTRACT_JS):
+    `rows` are label/value rows, `notice` any message lines outside the table."""
+    fields = _fields(rows)
+    lower = "\n".join(" ".join(r) for r in rows).lower() + "\n" + notice.lower()
+    return _decide(fields, lower + ("\ncaptcha" if captcha else ""))
+
+
+def _fields(rows) -> StatusData:
+    fields = dict.fromkeys(FIELDS, "")
+    for cells in rows:
+        i, n = 0, len(cells)
+        while i < n:
+            cell = cells[i]
+            field = _label(cell)
+            if field and i + 1 < n:
+                if not fields[field] and _plausible(field, cells[i + 1]):
+                    fields[field] = cells[i + 1]
+                i += 2
+                continue
+            i += 1
+            if field is None and ":" in cell:
+                label, _, rest = cell.partition(":")
+                field = _label(label)
+                if field and not fields[field] and _plausible(field, rest.strip()):
+                    fields[field] = rest.strip()
+    return fields  # type: ignore[return-value]
+
+
+def _plausible(field: str, value: str) -> bool:
+    # the search form sits in the same kind of grid: "Application Number | Search"
+    return bool(value) and (field != "app_no" or any(ch.isdigit() for ch in value))
+
+
+def _decide(fields: StatusData, lower: str) -> Tuple[str, StatusData]:
+    if not fields["app_no"]:
+        m = _APP_NO.search(lower.upper())
+        if m:
+            fields["app_no"] = m.group(0).rstrip(".,")
+
+    for rx, status in STATUS_TEXT_RULES:
+        if fields["status_text"] and rx.search(fields["status_text"]):
+            return status, fields
+
+    # page-wide markers, minus the ones that only occur inside the status / remarks values
+    excluded = (fields["status_text"] + "\n" + fields["remarks"]).lower()
+    seen = {k: sum(lower.count(w) - excluded.count(w) for w in words) for k, words in MARKERS.items()}
+    if seen["no_record"] > 0:
+        return "no_record", fields
+    if seen["captcha"] > 0:
+        return "captcha_required", fields
+    if seen["approved"] > 0 and seen["context"] > 0:
+        return "approved", fields
+    for status in ("rejected", "pending"):
+        if seen[status] > 0:
+            return status, fields
+    return "filled_but_unknown", fields
+
+
+def classify(text: str) -> str:
+    return extract(text)[0]
@@ -0,0 +1,232 @@
+# utils/watcher.py
+# /watch subscriptions: a persistent scheduler that re-checks pending applications in small
+# batches and tells the user only when the status or remarks change.
+import asyncio, logging, random, sqlite3, threading, time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+FINAL_STATUSES = ("approved", "rejected", "no_record")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS watches (
+    app_no TEXT NOT NULL,
+    chat_id INTEGER NOT NULL,
+    created REAL NOT NULL,
+    pending_since REAL,
+    last_status TEXT NOT NULL DEFAULT '',
+    last_status_text TEXT NOT NULL DEFAULT '',
+    last_remarks TEXT NOT NULL DEFAULT '',
+    last_checked REAL,
+    next_check REAL NOT NULL,
+    checks INTEGER NOT NULL DEFAULT 0,
+    failures INTEGER NOT NULL DEFAULT 0,
+    active INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (app_no, chat_id)
+);
+CREATE INDEX IF NOT EXISTS watches_due ON watches(active, next_check);
+"""
+
+CheckFn = Callable[[str], Awaitable[Dict[str, Any]]]
+NotifyFn = Callable[[int, str, Dict[str, Any], Dict[str, Any]], Awaitable[None]]
+
+
+class WatchScheduler:
+    """Every `tick_s`, checks at most `batch_size` due watches, never more than
+    `budget_per_hour` upstream checks in any rolling hour. One check serves every chat
+    watching the same number.
+
+    The next check of a number comes `base_interval_s` after the last one, doubled for every
+    `backoff_step_s` the application has been pending (capped at `max_interval_s`), with
+    +/- `jitter` spread so batches do not line up. Failed checks back off the same way by
+    failure count. Watches end on a final status or after `max_age_s`."""
+
+    def __init__(self, db_path, check: CheckFn, notify: NotifyFn, batch_size: int = 10,
+                 tick_s: float = 60.0, base_interval_s: float = 6 * 3600, max_interval_s: float = 48 * 3600,
+                 backoff_step_s: float = 24 * 3600, jitter: float = 0.2, budget_per_hour: int = 60,
+                 max_per_chat: int = 5, max_age_s: float = 30 * 24 * 3600):
+        self.check = check
+        self.notify = notify
+        self.batch_size = batch_size
+        self.tick_s = tick_s
+        self.base_interval_s = base_interval_s
+        self.max_interval_s = max_interval_s
+        self.backoff_step_s = backoff_step_s
+        self.jitter = jitter
+        self.budget_per_hour = budget_per_hour
+        self.max_per_chat = max_per_chat
+        self.max_age_s = max_age_s
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self._spent = deque()  # monotonic times of upstream checks in the last hour
+        self._task: Optional[asyncio.Task] = None
+        self.counters = {"checks": 0, "failures": 0, "notifications": 0, "budget_waits": 0, "expired": 0}
+
+    # ---------- subscriptions ----------
+
+    def add(self, app_no: str, chat_id: int, snapshot: Optional[Dict[str, Any]] = None) -> str:
+        """Returns "added", "exists", "limit" or "final". `snapshot` (a /check result) seeds
+        the diff; a final one adds nothing, since the watch would end at its first check."""
+        now = time.time()
+        snap = snapshot or {}
+        data = snap.get("data") or {}
+        status = snap.get("status") or ""
+        if status in FINAL_STATUSES:
+            return "final"
+        with self._lock:
+            row = self._db.execute("SELECT active FROM watches WHERE app_no = ? AND chat_id = ?",
+                                   (app_no, chat_id)).fetchone()
+            if row and row[0]:
+                return "exists"
+            n = self._db.execute("SELECT COUNT(*) FROM watches WHERE chat_id = ? AND active = 1",
+                                 (chat_id,)).fetchone()[0]
+            if n >= self.max_per_chat:
+                return "limit"
+            self._db.execute(
+                "INSERT OR REPLACE INTO watches (app_no, chat_id, created, pending_since, last_status, "
+                "last_status_text, last_remarks, last_checked, next_check) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (app_no, chat_id, now, now if status == "pending" else None, status,
+                 data.get("status_text", ""), data.get("remarks", ""), now if status else None,
+                 now + self._interval(0.0) if status else now))
+            self._db.commit()
+        return "added"
+
+    def remove(self, app_no: str, chat_id: int) -> bool:
+        with self._lock:
+            cur = self._db.execute("UPDATE watches SET active = 0 WHERE app_no = ? AND chat_id = ? AND active = 1",
+                                   (app_no, chat_id))
+            self._db.commit()
+            return cur.rowcount > 0
+
+    def list_for(self, chat_id: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT app_no, last_status, last_checked, next_check FROM watches "
+                "WHERE chat_id = ? AND active = 1 ORDER BY created", (chat_id,)).fetchall()
+        return [dict(zip(("app_no", "last_status", "last_checked", "next_check"), r)) for r in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            active, numbers = self._db.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT app_no) FROM watches WHERE active = 1").fetchone()
+            due = self._db.execute("SELECT COUNT(DISTINCT app_no) FROM watches WHERE active = 1 AND next_check <= ?",
+                                   (time.time(),)).fetchone()[0]
+        self._trim_budget()
+        return {"watches": active, "numbers": numbers, "due": due,
+                "budget_used_last_hour": len(self._spent), "budget_per_hour": self.budget_per_hour, **self.counters}
+
+    # ---------- scheduling ----------
+
+    def _interval(self, pending_for_s: float, failures: int = 0) -> float:
+        steps = max(pending_for_s / self.backoff_step_s, 0) + failures
+        base = min(self.base_interval_s * (2 ** min(steps, 16)), self.max_interval_s)
+        return base * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _trim_budget(self):
+        cutoff = time.monotonic() - 3600
+        while self._spent and self._spent[0] < cutoff:
+            self._spent.popleft()
+
+    def _budget_left(self) -> int:
+        self._trim_budget()
+        return self.budget_per_hour - len(self._spent)
+
+    def _due(self, limit: int) -> List[str]:
+        now = time.time()
+        with self._lock:
+            expired = self._db.execute("UPDATE watches SET active = 0 WHERE active = 1 AND created < ?",
+                                       (now - self.max_age_s,)).rowcount
+            self._db.commit()
+            rows = self._db.execute(
+                "SELECT app_no FROM watches WHERE active = 1 AND next_check <= ? "
+                "GROUP BY app_no ORDER BY MIN(next_check) LIMIT ?", (now, limit)).fetchall()
+        self.counters["expired"] += expired
+        return [r[0] for r in rows]
+
+    async def run_once(self) -> int:
+        """Check one batch of due numbers; returns how many were checked."""
+        limit = min(self.batch_size, self._budget_left())
+        if limit <= 0:
+            self.counters["budget_waits"] += 1
+            return 0
+        batch = self._due(limit)
+        for app_no in batch:
+            self._spent.append(time.monotonic())
+            try:
+                result = await self.check(app_no)
+            except Exception as e:
+                logger.error("Watch check failed for %s: %s", app_no, e)
+                result = {"status": "error", "data": {}}
+            await self._apply(app_no, result)
+        return len(batch)
+
+    async def _apply(self, app_no: str, result: Dict[str, Any]):
+        now = time.time()
+        status = result.get("status") or "error"
+        data = result.get("data") or {}
+        self.counters["checks"] += 1
+        failed = status not in FINAL_STATUSES and status != "pending"
+        if failed:
+            self.counters["failures"] += 1
+        with self._lock:
+            watchers = self._db.execute(
+                "SELECT chat_id, last_status, last_status_text, last_remarks, pending_since, failures "
+                "FROM watches WHERE app_no = ? AND active = 1", (app_no,)).fetchall()
+        changed_for = []
+        for chat_id, last_status, last_text, last_remarks, pending_since, failures in watchers:
+            if failed:
+                # error / captcha / unknown: keep the snapshot, retry later
+                nxt = now + self._interval(now - (pending_since or now), failures + 1)
+                self._update(app_no, chat_id, "failures = failures + 1, next_check = ?", (nxt,))
+                continue
+            changed = (status != last_status or data.get("status_text", "") != last_text
+                       or data.get("remarks", "") != last_remarks)
+            if status == "pending":
+                pending_since = pending_since or now
+            nxt = now + self._interval(now - pending_since if status == "pending" else 0.0)
+            self._update(app_no, chat_id,
+                         "last_status = ?, last_status_text = ?, last_remarks = ?, last_checked = ?, next_check = ?, "
+                         "pending_since = ?, checks = checks + 1, failures = 0, active = ?",
+                         (status, data.get("status_text", ""), data.get("remarks", ""), now, nxt,
+                          pending_since if status == "pending" else None, 0 if status in FINAL_STATUSES else 1))
+            # the first snapshot is not news, unless it also ends the watch
+            if (changed and last_status) or (not last_status and status in FINAL_STATUSES):
+                changed_for.append((chat_id, {"status": last_status, "status_text": last_text,
+                                              "remarks": last_remarks}))
+        for chat_id, old in changed_for:
+            try:
+                await self.notify(chat_id, app_no, old, result)
+                self.counters["notifications"] += 1
+            except Exception as e:
+                logger.error("Watch notify failed for %s -> %s: %s", app_no, chat_id, e)
+
+    def _update(self, app_no: str, chat_id: int, assignments: str, args: tuple):
+        with self._lock:
+            self._db.execute(f"UPDATE watches SET {assignments} WHERE app_no = ? AND chat_id = ?",
+                             (*args, app_no, chat_id))
+            self._db.commit()
+
+    # ---------- lifecycle ----------
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error("Watch scheduler tick failed: %s", e)
+            await asyncio.sleep(self.tick_s * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        with self._lock:
+            self._db.commit()
@@ -0,0 +1,214 @@
+# webhook.py
+# Webhook serving mode: bot.py and handlers/cmcard/cmchis_bot.py behind one FastAPI app
+# (uvicorn), each at its own path, instead of run_polling(). Every request must carry the
+# X-Telegram-Bot-Api-Secret-Token we registered.
+#
+#   python webhook.py set                  register both webhooks with Telegram (once)
+#   python webhook.py serve --workers 4    uvicorn on 127.0.0.1:8080 behind nginx / caddy
+#   python webhook.py delete               back to polling (python bot.py)
+#
+# State that must agree between workers lives in SQLite: sessions, jobs, watches, file_ids,
+# the certificate archive, the /check result cache (so an admin /refresh reaches every
+# worker) and the scraper strategy cache. One worker (whoever holds WEBHOOK_LOCK_FILE) runs
+# the background tasks (watcher, job sweep, cleanup); the upstream rate limits are split
+# between workers.
+#
+# What stays per worker is the Chromium pool: every worker launches its own browsers
+# (roughly 150-250 MB resident each, plus ~50 MB per context), so SCRAPER_POOL_SIZE and
+# SCRAPER_MAX_CONCURRENCY are divided between workers too (at least one browser each).
+# Plan memory as WORKERS x (Python + one pool) and keep --workers small.
+import argparse, asyncio, hmac, logging, os, sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+from fastapi import FastAPI, HTTPException, Request, Response
+from telegram import Update
+
+import config
+
+ROOT = Path(__file__).resolve().parent
+logger = logging.getLogger("webhook")
+
+SECRET = os.getenv("WEBHOOK_SECRET") or config.WEBHOOK_SECRET
+WORKERS = max(1, int(os.getenv("WEBHOOK_WORKERS") or 1))  # set by `serve`; set it yourself with plain uvicorn
+
+
+def _per_worker(name: str, total: int, workers: int) -> int:
+    """`total` split between workers, at least 1 each. When there are more workers than
+    `total` the floor raises the combined value to `workers`; that is logged, since a
+    token bucket or pool cannot run on less than one."""
+    share = max(1, int(total) // workers)
+    if share * workers > total:
+        logger.warning("%s=%s split over %s workers gives %s each (%s in total); use fewer workers "
+                       "to stay within it", name, total, workers, share, share * workers)
+    return share
+
+
+def _share_upstream_limits(workers: int):
+    """Each worker has its own token bucket; give each 1/N of the configured rate so the
+    government sites see the same total. Must run before the scrapers are imported."""
+    if workers <= 1:
+        return
+    lim = dict(config.SCRAPER_RATE_LIMIT)
+    lim["rate"] = lim["rate"] / workers
+    lim["burst"] = _per_worker("SCRAPER_RATE_LIMIT burst", lim.get("burst", 1), workers)
+    if lim.get("min_rate"):
+        lim["min_rate"] = lim["min_rate"] / workers
+    config.SCRAPER_RATE_LIMIT = lim
+    # defaults as in handlers/cmcard/scraper.py
+    os.environ["CMCHIS_RATE_PER_S"] = str(float(os.getenv("CMCHIS_RATE_PER_S", "0.5")) / workers)
+    os.environ["CMCHIS_RATE_BURST"] = str(_per_worker("CMCHIS_RATE_BURST", int(os.getenv("CMCHIS_RATE_BURST", "2")),
+                                                      workers))
+
+
+def _share_browser_pool(workers: int):
+    """Each worker launches its own Chromium pool; split the configured size so N workers
+    use about as many browsers as one process would. Must run before the scrapers are imported."""
+    if workers <= 1:
+        return
+    # defaults as in utils/scraper.py
+    config.SCRAPER_POOL_SIZE = _per_worker("SCRAPER_POOL_SIZE", getattr(config, "SCRAPER_POOL_SIZE", 2), workers)
+    config.SCRAPER_MAX_CONCURRENCY = _per_worker("SCRAPER_MAX_CONCURRENCY",
+                                                 getattr(config, "SCRAPER_MAX_CONCURRENCY", 8), workers)
+
+
+def _build(name: str):
+    """The bot's Application, or None when it cannot run here (no token / missing deps)."""
+    if name == "tnega":
+        import bot
+        return bot.build_application()
+    if name == "cmchis":
+        sys.path.insert(0, str(ROOT / "handlers" / "cmcard"))
+        try:
+            import cmchis_bot
+        except ImportError as e:
+            logger.warning("cmchis bot not mounted: %s", e)
+            return None
+        if not cmchis_bot.TOKEN:
+            logger.warning("cmchis bot not mounted: TELEGRAM_TOKEN not set")
+            return None
+        return cmchis_bot.build_application()
+    raise ValueError(f"unknown bot {name!r}")
+
+
+def _try_lock(path):
+    """Non-blocking exclusive lock held until the process exits; None if another has it."""
+    f = open(path, "a+")
+    try:
+        if os.name == "nt":
+            import msvcrt
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return f
+    except OSError:
+        f.close()
+        return None
+
+
+def create_app(paths=None) -> FastAPI:
+    paths = paths or config.WEBHOOK_PATHS
+    bots = {}  # name -> telegram Application
+
+    @asynccontextmanager
+    async def lifespan(_):
+        if not SECRET:
+            raise RuntimeError("WEBHOOK_SECRET is empty; refusing to accept unauthenticated updates")
+        _share_upstream_limits(WORKERS)
+        _share_browser_pool(WORKERS)
+        lock = _try_lock(config.ROOT / config.WEBHOOK_LOCK_FILE)
+        logger.info("Worker %s: background tasks %s", os.getpid(), "here" if lock else "elsewhere")
+        for name in paths:
+            tg = _build(name)
+            if tg is None:
+                continue
+            tg.bot_data["background"] = lock is not None
+            await tg.initialize()
+            if tg.post_init:
+                await tg.post_init(tg)
+            await tg.start()
+            bots[name] = tg
+        try:
+            yield
+        finally:
+            for tg in bots.values():
+                await tg.stop()
+                if tg.post_shutdown:
+                    await tg.post_shutdown(tg)
+                await tg.shutdown()
+            if lock:
+                lock.close()
+
+    api = FastAPI(lifespan=lifespan, docs_url=None, redoc_url=None, openapi_url=None)
+
+    def endpoint(name):
+        async def receive(request: Request):
+            token = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+            if not hmac.compare_digest(token.encode(), SECRET.encode()):
+                raise HTTPException(status_code=403)
+            tg = bots.get(name)
+            if tg is None:
+                raise HTTPException(status_code=404)
+            # queued, not awaited: a slow scrape must not hold the request until Telegram retries it
+            await tg.update_queue.put(Update.de_json(await request.json(), tg.bot))
+            return Response(status_code=200)
+        return receive
+
+    for name, path in paths.items():
+        api.add_api_route(path, endpoint(name), methods=["POST"], name=f"webhook_{name}")
+
+    @api.get("/healthz")
+    async def healthz():
+        return {"bots": sorted(bots), "pid": os.getpid()}
+
+    return api
+
+
+app = create_app()
+
+
+# ---------- CLI ----------
+
+async def _set_webhooks(delete: bool, drop_pending: bool):
+    for name, path in config.WEBHOOK_PATHS.items():
+        tg = _build(name)
+        if tg is None:
+            continue
+        async with tg.bot as b:
+            if delete:
+                await b.delete_webhook(drop_pending_updates=drop_pending)
+                print(f"{name}: webhook removed")
+                continue
+            url = config.WEBHOOK_BASE_URL.rstrip("/") + path
+            await b.set_webhook(url=url, secret_token=SECRET, allowed_updates=Update.ALL_TYPES,
+                                drop_pending_updates=drop_pending)
+            print(f"{name}: {url}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Run the bots in webhook mode")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    s = sub.add_parser("set", help="register the webhooks (config.WEBHOOK_BASE_URL + WEBHOOK_PATHS)")
+    s.add_argument("--drop-pending", action="store_true")
+    d = sub.add_parser("delete", help="remove the webhooks so polling works again")
+    d.add_argument("--drop-pending", action="store_true")
+    r = sub.add_parser("serve", help="run uvicorn")
+    r.add_argument("--host", default="127.0.0.1")
+    r.add_argument("--port", type=int, default=8080)
+    r.add_argument("--workers", type=int, default=1)
+    args = ap.parse_args()
+
+    if args.cmd in ("set", "delete"):
+        if args.cmd == "set" and not (config.WEBHOOK_BASE_URL and SECRET):
+            ap.error("set config.WEBHOOK_BASE_URL and WEBHOOK_SECRET first")
+        asyncio.run(_set_webhooks(args.cmd == "delete", args.drop_pending))
+        return
+
+    import uvicorn
+    os.environ["WEBHOOK_WORKERS"] = str(args.workers)
+    uvicorn.run("webhook:app", host=args.host, port=args.port, workers=args.workers, proxy_headers=True)
+
+
+if __name__ == "__main__":
+    main()